@@ -0,0 +1,65 @@
+"""
+Server-side Firestore aggregation queries.
+
+Counting or averaging with Firestore's aggregation queries returns a single result
+computed from the index, instead of downloading every matching document. Session
+submission uses it to count violation logs for cheat_score, and the admin dashboard
+uses it for platform-wide totals, so neither slows down as logs and sessions pile up.
+"""
+
+from typing import Any
+
+from backend.app.live_feed import ACTIVE_STATUSES
+from backend.app.trust_score import SEVERITY_INFO
+
+# Session statuses counted separately on the admin dashboard
+DASHBOARD_STATUSES = (*ACTIVE_STATUSES, "Completed", "Terminated")
+
+
+def _results(aggregation_query) -> dict[str, Any]:
+    """Run an aggregation query and map each alias to its value."""
+    return {result.alias: result.value for row in aggregation_query.get() for result in row}
+
+
+def count_documents(query) -> int:
+    """Number of documents matching a query or collection."""
+    return int(_results(query.count(alias="count")).get("count") or 0)
+
+
+def count_session_logs(db, session_id: str) -> int:
+    """
+    Number of violation log entries recorded for a session.
+
+    Informational entries are subtracted rather than filtered out with "!=", which
+    would also drop older entries that have no severity.
+    """
+    logs = db.collection("sessions").document(session_id).collection("logs")
+    return count_documents(logs) - count_documents(logs.where("severity", "==", SEVERITY_INFO))
+
+
+def dashboard_totals(db) -> dict[str, Any]:
+    """
+    Platform-wide admin dashboard metrics from aggregation queries.
+
+    Averages skip sessions without a numeric score or trust score. Student and exam
+    totals count the registered students and published exam papers.
+    """
+    sessions = db.collection("sessions")
+    overall = _results(
+        sessions.count(alias="total").avg("score", alias="avg_score").avg("trust_score", alias="avg_trust")
+    )
+    by_status = {status: count_documents(sessions.where("status", "==", status)) for status in DASHBOARD_STATUSES}
+    avg_score = overall.get("avg_score")
+    avg_trust = overall.get("avg_trust")
+
+    return {
+        "active": by_status["Active"],
+        "flagged": by_status["Flagged"],
+        "completed": by_status["Completed"],
+        "terminated": by_status["Terminated"],
+        "total_sessions": int(overall.get("total") or 0),
+        "total_students": count_documents(db.collection("users").where("role", "==", "student")),
+        "total_exams": count_documents(db.collection("exams")),
+        "avg_score": round(avg_score, 1) if avg_score is not None else 0,
+        "avg_trust": round(avg_trust) if avg_trust is not None else 100,
+    }
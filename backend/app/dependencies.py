@@ -5,7 +5,9 @@ Provides injectable dependencies for Firestore, AI services, and Firebase Auth,
 enabling testability without live service connections.
 """
 
-from backend.app.firebase_setup import get_db
+from fastapi import Depends
+
+from backend.app.firebase_setup import get_async_db, get_db
 from backend.app.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -24,6 +26,22 @@ def get_firestore_db():
     return db
 
 
+def get_async_firestore_db(db=Depends(get_firestore_db)):
+    """
+    FastAPI dependency that provides an asyncio Firestore client (firestore.AsyncClient).
+
+    Used by async route handlers so an in-flight Firestore read does not hold a
+    threadpool worker. It sits behind get_firestore_db: when that yields no client,
+    neither does this one, so routes only need to check the async client.
+    """
+    if not db:
+        return None
+    adb = get_async_db()
+    if not adb:
+        logger.error("Failed to obtain async Firestore client")
+    return adb
+
+
 def get_ai_model():
     """
     FastAPI dependency that provides a configured Gemini AI model name.
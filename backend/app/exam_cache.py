@@ -0,0 +1,131 @@
+"""
+Cached exam paper lookups.
+
+Every candidate loading or submitting an exam needs the same exam paper, and a
+paper does not change once it is published. Papers are kept in an in-process LRU
+cache, and concurrent misses for the same exam (the exam-start thundering herd)
+are coalesced so only one of them reads Firestore while the rest wait for its
+result. Async routes read misses with the async Firestore client. Papers edited
+after publishing must be dropped with invalidate_exam_paper (exposed as
+DELETE /api/admin/exams/{exam_id}/cache).
+
+Configuration (environment variables):
+    EXAM_CACHE_TTL_SECONDS: Lifetime of a cached exam paper (default: 300).
+    EXAM_CACHE_MAX_ENTRIES: Maximum number of cached exam papers (default: 256).
+"""
+
+import asyncio
+import copy
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+from backend.app.cache import TTLCache
+
+EXAM_CACHE_TTL_SECONDS = float(os.getenv("EXAM_CACHE_TTL_SECONDS", "300"))
+EXAM_CACHE_MAX_ENTRIES = int(os.getenv("EXAM_CACHE_MAX_ENTRIES", "256"))
+
+
+class ExamPaperCache:
+    """TTL/LRU cache of exam paper documents with per-exam request coalescing."""
+
+    def __init__(self, ttl_seconds: float = EXAM_CACHE_TTL_SECONDS, max_entries: int = EXAM_CACHE_MAX_ENTRIES):
+        self._papers = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+
+    def get(self, db, exam_id: str) -> dict[str, Any] | None:
+        """
+        Return a copy of an exam paper, reading Firestore at most once per miss.
+
+        Returns:
+            The exam paper fields, or None if the exam does not exist. Missing exams
+            are not cached, so a paper published later is found straight away.
+        """
+        paper = self._papers.get(exam_id)
+        if paper is not None:
+            return copy.deepcopy(paper)
+
+        future, leader = self._claim(exam_id)
+        if not leader:
+            paper = future.result()
+        else:
+            try:
+                paper = self._store(exam_id, future, db.collection("exams").document(exam_id).get())
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                self._release(exam_id)
+        return copy.deepcopy(paper) if paper is not None else None
+
+    async def get_async(self, adb, exam_id: str) -> dict[str, Any] | None:
+        """Like get, for async routes: misses are read with the async client, so no threadpool worker is held."""
+        paper = self._papers.get(exam_id)
+        if paper is not None:
+            return copy.deepcopy(paper)
+
+        future, leader = self._claim(exam_id)
+        if not leader:
+            paper = await asyncio.wrap_future(future)
+        else:
+            try:
+                paper = self._store(exam_id, future, await adb.collection("exams").document(exam_id).get())
+            except BaseException as e:
+                # Cancellation included, so waiters never block on an abandoned read
+                future.set_exception(e)
+                raise
+            finally:
+                self._release(exam_id)
+        return copy.deepcopy(paper) if paper is not None else None
+
+    def _claim(self, exam_id: str) -> tuple[Future, bool]:
+        """Return the in-flight read of an exam and whether the caller has to perform it."""
+        with self._lock:
+            pending = self._in_flight.get(exam_id)
+            if pending is not None:
+                return pending, False
+            future: Future = Future()
+            self._in_flight[exam_id] = future
+            return future, True
+
+    def _store(self, exam_id: str, future: Future, doc) -> dict[str, Any] | None:
+        self.reads += 1
+        paper = doc.to_dict() if doc.exists else None
+        if paper is not None:
+            self._papers.set(exam_id, paper)
+        future.set_result(paper)
+        return paper
+
+    def _release(self, exam_id: str):
+        with self._lock:
+            self._in_flight.pop(exam_id, None)
+
+    def invalidate(self, exam_id: str):
+        """Forget a cached exam paper so the next lookup re-reads Firestore."""
+        self._papers.invalidate(exam_id)
+
+    def clear(self):
+        """Forget every cached exam paper and reset the read counter."""
+        self._papers.clear()
+        self.reads = 0
+
+
+exam_paper_cache = ExamPaperCache()
+
+
+def get_exam_paper(db, exam_id: str) -> dict[str, Any] | None:
+    """Return a copy of the exam paper, from the cache when possible; None if it does not exist."""
+    return exam_paper_cache.get(db, exam_id)
+
+
+async def get_exam_paper_async(adb, exam_id: str) -> dict[str, Any] | None:
+    """Async variant of get_exam_paper; adb is the async Firestore client used on a cache miss."""
+    return await exam_paper_cache.get_async(adb, exam_id)
+
+
+def invalidate_exam_paper(exam_id: str):
+    """Drop an exam paper from the cache after it has been edited."""
+    exam_paper_cache.invalidate(exam_id)
@@ -0,0 +1,283 @@
+"""
+Streaming encoders for session history exports.
+
+Exports are produced row by row from a paged Firestore query, so memory use stays
+flat however many sessions are exported and the first bytes reach the client as
+soon as the first page has been read. Text rows are grouped into chunks of about
+EXPORT_CHUNK_BYTES and can optionally be gzip-compressed on the fly.
+
+The columnar formats (Parquet and Arrow IPC stream) are written one row group of
+EXPORT_ROW_GROUP_SIZE sessions at a time and need the optional pyarrow package
+(`pip install secureeval[analytics]`).
+
+Configuration (environment variables):
+    EXPORT_ROW_GROUP_SIZE: Sessions per Parquet row group / Arrow record batch (default: 5000).
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import os
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "5000"))
+
+# Approximate size of each chunk written to the response
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+TEXT_EXPORT_FORMATS = ("json", "ndjson", "csv")
+COLUMNAR_EXPORT_FORMATS = ("parquet", "arrow")
+EXPORT_FORMATS = TEXT_EXPORT_FORMATS + COLUMNAR_EXPORT_FORMATS
+
+COLUMNAR_EXPORT_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+EXPORT_FILE_EXTENSIONS = {"arrow": "arrows"}
+
+# Session fields read for columnar exports on top of the history table columns
+COLUMNAR_EXTRA_FIELDS = ("exam_id", "cheat_score", "clock_drift_seconds", "performance")
+
+# CSV header and the history row field for each column
+CSV_COLUMNS = (
+    ("Session ID", "id"),
+    ("Student ID", "studentId"),
+    ("Student Name", "student_name"),
+    ("Exam Title", "exam_title"),
+    ("Status", "status"),
+    ("Trust Score", "trust_score"),
+    ("Score", "score"),
+    ("Percentage", "percentage"),
+    ("Created At", "created_at"),
+)
+
+# Defaults for CSV cells whose field is missing or null
+CSV_DEFAULTS = {"trust_score": 100, "score": 0, "percentage": 0}
+
+
+def csv_lines(rows: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as CSV, header first, one line at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values) -> str:
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield line([header for header, _ in CSV_COLUMNS])
+    for row in rows:
+        yield line(
+            [row[field] if row.get(field) is not None else CSV_DEFAULTS.get(field, "") for _, field in CSV_COLUMNS]
+        )
+
+
+def ndjson_lines(rows: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON."""
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def json_document(rows: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as a single {"sessions": [...], "total_count": n} document."""
+    yield '{"sessions": ['
+    count = 0
+    for row in rows:
+        yield ("," if count else "") + json.dumps(row, default=str)
+        count += 1
+    yield f'], "total_count": {count}}}'
+
+
+def encode_rows(rows: Iterable[dict[str, Any]], export_format: str) -> Iterator[str]:
+    """Encode rows in one of EXPORT_FORMATS."""
+    if export_format == "csv":
+        return csv_lines(rows)
+    if export_format == "ndjson":
+        return ndjson_lines(rows)
+    return json_document(rows)
+
+
+def _integer(value: Any) -> int | None:
+    return int(value) if isinstance(value, int | float) and not isinstance(value, bool) else None
+
+
+def _real(value: Any) -> float | None:
+    return float(value) if isinstance(value, int | float) and not isinstance(value, bool) else None
+
+
+def _text(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
+def _timestamp(value: Any) -> datetime | None:
+    """Parse an ISO-8601 created_at; naive values are taken as UTC, unparseable ones become null."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def _question_timings(performance: Any) -> list[int | None] | None:
+    """Per-question durations in question order, from the performance map of question index to milliseconds."""
+    if not isinstance(performance, dict):
+        return None
+    timings: dict[int, int | None] = {}
+    for index, duration in performance.items():
+        try:
+            timings[int(index)] = _integer(duration)
+        except (TypeError, ValueError):
+            continue
+    if not timings:
+        return []
+    return [timings.get(i) for i in range(max(timings) + 1)]
+
+
+# Columnar export columns: output name, Arrow type, converter, and the session row field it reads
+COLUMNAR_COLUMNS = (
+    ("id", "string", _text, "id"),
+    ("student_id", "string", _text, "studentId"),
+    ("student_name", "string", _text, "student_name"),
+    ("exam_id", "string", _text, "exam_id"),
+    ("exam_title", "string", _text, "exam_title"),
+    ("exam_type", "string", _text, "exam_type"),
+    ("status", "string", _text, "status"),
+    ("trust_score", "int64", _integer, "trust_score"),
+    # Graded scores can be fractional (partial credit)
+    ("score", "float64", _real, "score"),
+    ("total", "int64", _integer, "total"),
+    ("percentage", "float64", _real, "percentage"),
+    ("cheat_score", "int64", _integer, "cheat_score"),
+    ("clock_drift_seconds", "float64", _real, "clock_drift_seconds"),
+    ("question_timings_ms", "list<int64>", _question_timings, "performance"),
+    ("created_at", "timestamp", _timestamp, "created_at"),
+)
+
+
+def _arrow_schema(pa):
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "list<int64>": pa.list_(pa.int64()),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name, _, _ in COLUMNAR_COLUMNS])
+
+
+def _record_batches(pa, schema, rows: Iterable[dict[str, Any]], row_group_size: int):
+    """Convert rows into Arrow record batches of at most row_group_size rows."""
+
+    def batch(columns: list[list[Any]]):
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema, strict=True)]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    columns: list[list[Any]] = [[] for _ in COLUMNAR_COLUMNS]
+    for row in rows:
+        for values, (_, _, convert, field) in zip(columns, COLUMNAR_COLUMNS, strict=True):
+            values.append(convert(row.get(field)))
+        if len(columns[0]) >= row_group_size:
+            yield batch(columns)
+            columns = [[] for _ in COLUMNAR_COLUMNS]
+    if columns[0]:
+        yield batch(columns)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller while still reporting the true offset."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def columnar_chunks(
+    rows: Iterable[dict[str, Any]], export_format: str, row_group_size: int = EXPORT_ROW_GROUP_SIZE
+) -> Iterator[bytes]:
+    """
+    Encode rows as Parquet or an Arrow IPC stream, one row group at a time.
+
+    Requires pyarrow; check COLUMNAR_EXPORT_AVAILABLE before starting a response.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+
+    for batch in _record_batches(pa, schema, rows, max(1, row_group_size)):
+        if export_format == "parquet":
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+        else:
+            writer.write_batch(batch)
+        data = sink.take()
+        if data:
+            yield data
+    writer.close()
+    yield sink.take()
+
+
+def export_chunks(rows: Iterable[dict[str, Any]], export_format: str) -> Iterator[bytes]:
+    """Encode rows in one of EXPORT_FORMATS as a stream of byte chunks."""
+    if export_format in COLUMNAR_EXPORT_FORMATS:
+        return columnar_chunks(rows, export_format)
+    return chunked(encode_rows(rows, export_format))
+
+
+def chunked(pieces: Iterable[str], chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Join encoded pieces into byte chunks of roughly chunk_bytes."""
+    chunk: list[bytes] = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,391 @@
+"""
+Face detection engine for webcam proctoring.
+
+Runs Haar-cascade detection in a dedicated process pool so frame throughput scales
+with CPU cores instead of competing for the request threadpool. Each worker loads
+its own CascadeClassifier once at startup; submissions are bounded and rejected
+with a 503 once the pool is saturated, so a backlog of stale frames never builds up.
+
+Configuration (environment variables):
+    FACE_DETECTION_WORKERS: Worker processes (default: CPU count). 0 runs detection
+        on a thread executor inside the API process (used by the test suite).
+    FACE_DETECTION_QUEUE_SIZE: Frames allowed to wait for a free worker (default: 32).
+    FACE_DETECTION_PROFILE: Default detection profile — "fast", "balanced" or
+        "accurate" (default: "accurate"). Callers may override it per frame.
+    FRAME_STATE_IDLE_TTL_SECONDS: How long per-session frame state (tracked face position,
+        duplicate-frame and motion references) is kept after a session's last frame
+        (default: 300).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import cv2
+import numpy as np
+
+from backend.app.errors import InvalidPayloadError, SecureEvalError
+from backend.app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FACE_DETECTION_WORKERS = int(os.getenv("FACE_DETECTION_WORKERS", str(os.cpu_count() or 1)))
+FACE_DETECTION_QUEUE_SIZE = int(os.getenv("FACE_DETECTION_QUEUE_SIZE", "32"))
+FACE_DETECTION_PROFILE = os.getenv("FACE_DETECTION_PROFILE", "accurate")
+FRAME_STATE_IDLE_TTL_SECONDS = float(os.getenv("FRAME_STATE_IDLE_TTL_SECONDS", "300"))
+
+# Smallest window the frontal-face cascade was trained on
+CASCADE_WINDOW_SIZE = 24
+
+# (width, height) of the thumbnail compared between frames in motion-gated mode
+MOTION_THUMBNAIL_SIZE = (32, 24)
+
+# Per-thread cascade cache. Worker processes run jobs on a single thread, so this
+# holds exactly one classifier per process; the thread fallback gets one per thread.
+_local = threading.local()
+
+
+class DetectionOverloadedError(SecureEvalError):
+    """Raised when the detection pool and its submission queue are full."""
+
+    def __init__(self, capacity: int):
+        super().__init__(
+            message="Face detection is at capacity. Retry the frame shortly.",
+            status_code=503,
+            error_code="DETECTION_OVERLOADED",
+            details={"capacity": capacity},
+        )
+
+
+@dataclass(frozen=True)
+class DetectionProfile:
+    """
+    Decode and cascade settings trading detection latency against accuracy.
+
+    Face size bounds are fractions of the decoded frame's shorter side, so they stay
+    meaningful whatever resolution the client sends.
+    """
+
+    name: str
+    imread_flag: int
+    max_dimension: int | None
+    scale_factor: float
+    min_neighbors: int
+    min_face_fraction: float
+    max_face_fraction: float | None
+
+
+DETECTION_PROFILES: dict[str, DetectionProfile] = {
+    # Quarter-resolution decode: cheapest, suited to close-up webcams and large exams.
+    "fast": DetectionProfile(
+        name="fast",
+        imread_flag=cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        max_dimension=320,
+        scale_factor=1.2,
+        min_neighbors=4,
+        min_face_fraction=0.15,
+        max_face_fraction=0.9,
+    ),
+    # Half-resolution decode with bounded face sizes.
+    "balanced": DetectionProfile(
+        name="balanced",
+        imread_flag=cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        max_dimension=640,
+        scale_factor=1.1,
+        min_neighbors=4,
+        min_face_fraction=0.1,
+        max_face_fraction=0.9,
+    ),
+    # Full-resolution scan with no size bounds (the original behaviour).
+    "accurate": DetectionProfile(
+        name="accurate",
+        imread_flag=cv2.IMREAD_GRAYSCALE,
+        max_dimension=None,
+        scale_factor=1.1,
+        min_neighbors=4,
+        min_face_fraction=0.0,
+        max_face_fraction=None,
+    ),
+}
+
+if FACE_DETECTION_PROFILE not in DETECTION_PROFILES:
+    logger.warning("Unknown FACE_DETECTION_PROFILE '%s' — using 'accurate'", FACE_DETECTION_PROFILE)
+    FACE_DETECTION_PROFILE = "accurate"
+
+
+def resolve_profile(name: str | None = None) -> DetectionProfile:
+    """
+    Look up a detection profile by name, falling back to FACE_DETECTION_PROFILE.
+
+    Raises:
+        InvalidPayloadError: If the name does not match a known profile.
+    """
+    profile = DETECTION_PROFILES.get(name or FACE_DETECTION_PROFILE)
+    if profile is None:
+        raise InvalidPayloadError(
+            f"Unknown detection profile '{name}'",
+            details={"profiles": sorted(DETECTION_PROFILES)},
+        )
+    return profile
+
+
+@dataclass(frozen=True)
+class FrameHints:
+    """Per-session context the API process hands to a detection worker alongside a frame."""
+
+    # Region (x, y, w, h) to search first, from temporal face tracking
+    roi: tuple[int, int, int, int] | None = None
+    # dHash of the session's last analysed frame and how close a frame must be to reuse its verdict
+    reference_hash: int | None = None
+    max_hash_distance: int = 0
+    # Motion thumbnail of the session's previous frame and the mean pixel change below which
+    # the frame counts as still (motion-gated mode)
+    reference_thumbnail: bytes | None = None
+    motion_threshold: float = 0.0
+
+
+@dataclass(frozen=True)
+class DetectionResult:
+    """Outcome of analysing a single frame. face_count is None when the frame could not be analysed."""
+
+    face_count: int | None
+    error: str | None = None
+    # Bounding box (x, y, w, h) in decoded-frame pixels when exactly one face was found
+    face_box: tuple[int, int, int, int] | None = None
+    # "roi" when the face was re-found inside the tracking region, "full" for a whole-frame scan,
+    # "skipped" when the cascade did not run because the frame duplicated the reference frame,
+    # "still" when it did not run because the frame showed no motion
+    scan: str = "full"
+    frame_hash: int | None = None
+    duplicate: bool = False
+    thumbnail: bytes | None = None
+    motion_score: float | None = None
+
+
+def load_face_cascade() -> cv2.CascadeClassifier | None:
+    """Load the bundled frontal-face Haar cascade, returning None if it is unavailable."""
+    try:
+        cv2_data = getattr(cv2, "data", None)
+        haarcascade_path = getattr(cv2_data, "haarcascades", "") + "haarcascade_frontalface_default.xml"
+        cascade = cv2.CascadeClassifier(haarcascade_path)
+    except Exception:
+        return None
+    return None if cascade.empty() else cascade
+
+
+def _get_cascade() -> cv2.CascadeClassifier | None:
+    if not hasattr(_local, "cascade"):
+        _local.cascade = load_face_cascade()
+    return _local.cascade
+
+
+def _init_worker():
+    """Process-pool initializer: load the classifier once per worker."""
+    _get_cascade()
+
+
+def decode_grayscale(buffer, profile: DetectionProfile) -> np.ndarray | None:
+    """Decode an encoded frame straight to grayscale at the profile's resolution."""
+    nparr = np.frombuffer(buffer, np.uint8)
+    if nparr.size == 0:
+        return None
+    gray = cv2.imdecode(nparr, profile.imread_flag)
+    if gray is None:
+        return None
+
+    if profile.max_dimension:
+        height, width = gray.shape[:2]
+        longest = max(height, width)
+        if longest > profile.max_dimension:
+            scale = profile.max_dimension / longest
+            gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def _face_size_bounds(gray: np.ndarray, profile: DetectionProfile) -> dict:
+    shorter_side = min(gray.shape[:2])
+    bounds = {}
+    if profile.min_face_fraction > 0:
+        min_side = max(CASCADE_WINDOW_SIZE, int(shorter_side * profile.min_face_fraction))
+        bounds["minSize"] = (min_side, min_side)
+    if profile.max_face_fraction is not None:
+        max_side = max(CASCADE_WINDOW_SIZE, int(shorter_side * profile.max_face_fraction))
+        bounds["maxSize"] = (max_side, max_side)
+    return bounds
+
+
+def difference_hash(gray: np.ndarray) -> int:
+    """64-bit dHash: compares horizontally adjacent pixels of a 9x8 thumbnail."""
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(thumb[:, 1:] > thumb[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+def motion_thumbnail(gray: np.ndarray) -> bytes:
+    """Tiny grayscale thumbnail used for frame differencing."""
+    return cv2.resize(gray, MOTION_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).tobytes()
+
+
+def motion_score(thumbnail: bytes, reference: bytes) -> float:
+    """Mean absolute pixel difference (0-255) between two motion thumbnails."""
+    current = np.frombuffer(thumbnail, np.uint8)
+    previous = np.frombuffer(reference, np.uint8)
+    if current.size != previous.size:
+        return float("inf")
+    return float(cv2.absdiff(current, previous).mean())
+
+
+def _crop_roi(gray: np.ndarray, roi: tuple[int, int, int, int]) -> tuple[np.ndarray, int, int]:
+    height, width = gray.shape[:2]
+    x, y, w, h = roi
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    return gray[y0:y1, x0:x1], x0, y0
+
+
+def detect_faces(
+    buffer: bytes,
+    profile: DetectionProfile | None = None,
+    hints: FrameHints | None = None,
+) -> DetectionResult:
+    """
+    Decode an encoded JPEG/PNG frame and count the faces in it.
+
+    With a reference thumbnail, a frame that barely differs from the previous one is
+    reported as still without running the cascade. With a reference hash, a frame
+    whose dHash is within max_hash_distance of it is reported as a duplicate without
+    running the cascade. With a tracking region, only that region is scanned
+    first; a single face there is accepted as the result, anything else falls back
+    to a full-frame scan. Runs inside a pool worker, so it must stay a module-level
+    function with picklable arguments and return value.
+    """
+    profile = profile or resolve_profile()
+    hints = hints or FrameHints()
+    cascade = _get_cascade()
+    if cascade is None:
+        return DetectionResult(face_count=None, error="Face detection unavailable")
+
+    gray = decode_grayscale(buffer, profile)
+    if gray is None:
+        return DetectionResult(face_count=None, error="Invalid image")
+
+    frame_hash = difference_hash(gray)
+    thumbnail = motion_thumbnail(gray)
+    score = motion_score(thumbnail, hints.reference_thumbnail) if hints.reference_thumbnail is not None else None
+    # Every result carries the frame's fingerprints so the API process can track the session
+    fingerprint = DetectionResult(face_count=None, frame_hash=frame_hash, thumbnail=thumbnail, motion_score=score)
+
+    if score is not None and score < hints.motion_threshold:
+        return replace(fingerprint, scan="still")
+
+    if hints.reference_hash is not None and (
+        hamming_distance(frame_hash, hints.reference_hash) <= hints.max_hash_distance
+    ):
+        return replace(fingerprint, scan="skipped", duplicate=True)
+
+    bounds = _face_size_bounds(gray, profile)
+    min_side = bounds.get("minSize", (CASCADE_WINDOW_SIZE, CASCADE_WINDOW_SIZE))[0]
+
+    if hints.roi is not None:
+        region, x0, y0 = _crop_roi(gray, hints.roi)
+        if min(region.shape[:2]) >= min_side:
+            faces = cascade.detectMultiScale(
+                region, scaleFactor=profile.scale_factor, minNeighbors=profile.min_neighbors, **bounds
+            )
+            if len(faces) == 1:
+                x, y, w, h = (int(v) for v in faces[0])
+                return replace(fingerprint, face_count=1, face_box=(x + x0, y + y0, w, h), scan="roi")
+
+    faces = cascade.detectMultiScale(
+        gray, scaleFactor=profile.scale_factor, minNeighbors=profile.min_neighbors, **bounds
+    )
+    face_box = None
+    if len(faces) == 1:
+        x, y, w, h = (int(v) for v in faces[0])
+        face_box = (x, y, w, h)
+    return replace(fingerprint, face_count=len(faces), face_box=face_box, scan="full")
+
+
+class DetectionEngine:
+    """Bounded, asynchronous front-end to the face detection worker pool."""
+
+    def __init__(self, workers: int = FACE_DETECTION_WORKERS, queue_size: int = FACE_DETECTION_QUEUE_SIZE):
+        self.workers = max(0, workers)
+        self.queue_size = max(0, queue_size)
+        self.capacity = max(1, self.workers) + self.queue_size
+        self.available = load_face_cascade() is not None
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker pool. Safe to call more than once."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self.workers == 0:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-detect")
+            else:
+                # "spawn" keeps workers independent of the server's threads and behaves the same on Windows.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+        logger.info("Face detection engine started (workers=%d, queue=%d)", self.workers, self.queue_size)
+
+    def shutdown(self):
+        """Stop the worker pool, cancelling frames that have not started yet."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise DetectionOverloadedError(self.capacity)
+            self._in_flight += 1
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def detect(
+        self,
+        buffer: bytes,
+        profile: DetectionProfile | None = None,
+        hints: FrameHints | None = None,
+    ) -> DetectionResult:
+        """
+        Run face detection on a frame without blocking the event loop.
+
+        Raises:
+            DetectionOverloadedError: If every worker is busy and the queue is full.
+        """
+        if self._executor is None:
+            self.start()
+
+        self._reserve_slot()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, detect_faces, bytes(buffer), profile or resolve_profile(), hints
+            )
+        finally:
+            self._release_slot()
+
+
+detection_engine = DetectionEngine()
@@ -0,0 +1,87 @@
+"""
+Temporal face tracking for webcam proctoring.
+
+Candidates sit still for most of an exam, so the face found in one frame is almost
+always near the same spot in the next. The tracker remembers each session's last
+face box and hands the detection workers a padded search region around it; the
+worker falls back to a full-frame scan when the region search fails, and the
+tracker forces a full scan every N frames so a second person entering the frame
+is still caught.
+
+Configuration (environment variables):
+    FACE_TRACKING_ENABLED: Set to "false" to always scan the full frame (default: true).
+    FACE_TRACKING_FULL_SCAN_INTERVAL: Force a full-frame scan at least every N frames (default: 5).
+"""
+
+import os
+from dataclasses import dataclass
+
+from backend.app.cache import TTLCache
+from backend.app.face_detection import FRAME_STATE_IDLE_TTL_SECONDS, DetectionProfile, DetectionResult
+
+FACE_TRACKING_ENABLED = os.getenv("FACE_TRACKING_ENABLED", "true").lower() != "false"
+FACE_TRACKING_FULL_SCAN_INTERVAL = int(os.getenv("FACE_TRACKING_FULL_SCAN_INTERVAL", "5"))
+
+# Search region padding on each side, as a fraction of the tracked face's size
+ROI_PADDING = 0.5
+
+
+@dataclass
+class TrackedFace:
+    """Last known face position for a session."""
+
+    profile: str
+    box: tuple[int, int, int, int] | None = None
+    frames_since_full_scan: int = 0
+
+
+class FaceTracker:
+    """Per-session store of last face positions used to seed region-of-interest scans."""
+
+    def __init__(
+        self,
+        enabled: bool = FACE_TRACKING_ENABLED,
+        full_scan_interval: int = FACE_TRACKING_FULL_SCAN_INTERVAL,
+        padding: float = ROI_PADDING,
+    ):
+        self.enabled = enabled
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.padding = padding
+        self._tracks = TTLCache(ttl_seconds=FRAME_STATE_IDLE_TTL_SECONDS)
+
+    def roi_for(self, session_id: str, profile: DetectionProfile) -> tuple[int, int, int, int] | None:
+        """Return the padded search region for the next frame, or None when a full scan is due."""
+        if not self.enabled:
+            return None
+        track = self._tracks.get(session_id)
+        if track is None or track.box is None or track.profile != profile.name:
+            return None
+        if track.frames_since_full_scan + 1 >= self.full_scan_interval:
+            return None
+
+        x, y, w, h = track.box
+        pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+        return (x - pad_x, y - pad_y, w + 2 * pad_x, h + 2 * pad_y)
+
+    def observe(self, session_id: str, profile: DetectionProfile, result: DetectionResult):
+        """Record a frame's detection result for the session."""
+        if not self.enabled or result.face_count is None or result.scan in ("skipped", "still"):
+            return
+        track = self._tracks.get(session_id)
+        if track is None or track.profile != profile.name:
+            track = TrackedFace(profile=profile.name)
+
+        track.box = result.face_box
+        track.frames_since_full_scan = 0 if result.scan == "full" else track.frames_since_full_scan + 1
+        self._tracks.set(session_id, track)
+
+    def forget(self, session_id: str):
+        """Drop a session's tracking state."""
+        self._tracks.invalidate(session_id)
+
+    def clear(self):
+        """Drop all tracking state."""
+        self._tracks.clear()
+
+
+face_tracker = FaceTracker()
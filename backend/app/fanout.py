@@ -0,0 +1,50 @@
+"""
+Concurrent fan-out of independent Firestore reads.
+
+Synchronous routes issue Firestore reads one after another, so a request waits for
+the sum of its round trips. Once a request knows which documents it needs, reads
+that do not depend on each other can be started on the fan-out pool and collected
+only when their result is needed, overlapping them with the request's other reads
+and with slow work such as AI grading.
+
+The pool is separate from the server's request threadpool, so a route running on a
+request thread can wait for its reads without starving other requests.
+
+Configuration (environment variables):
+    FIRESTORE_FANOUT_WORKERS: Threads available for concurrent reads (default: 8).
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+FIRESTORE_FANOUT_WORKERS = int(os.getenv("FIRESTORE_FANOUT_WORKERS", "8"))
+
+
+class ReadFanout:
+    """Lazily started thread pool for running independent Firestore reads concurrently."""
+
+    def __init__(self, workers: int = FIRESTORE_FANOUT_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, read: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Start a read in the background; its result (or exception) is available from the returned future."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="firestore-fanout")
+            executor = self._executor
+        return executor.submit(read, *args, **kwargs)
+
+    def shutdown(self):
+        """Wait for running reads and stop the pool; the next submit starts a new one."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+read_fanout = ReadFanout()
@@ -1,7 +1,7 @@
 import os
 
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 
 # Initialize Firebase Admin
 # Initialize Firebase Admin
@@ -46,3 +46,11 @@ def get_db():
     except Exception as e:
         print(f"Error getting Firestore client: {e}")
         return None
+
+
+def get_async_db():
+    try:
+        return firestore_async.client()
+    except Exception as e:
+        print(f"Error getting async Firestore client: {e}")
+        return None
@@ -0,0 +1,130 @@
+"""
+Near-duplicate frame skipping for webcam proctoring.
+
+A candidate reading a question produces almost identical consecutive frames. Each
+analysed frame's perceptual hash (dHash) is remembered per session; the detection
+worker compares the next frame's hash against it and, when the two are within a
+small Hamming distance, skips the cascade so the previous verdict can be reused.
+Frames are always compared with the last *analysed* frame, so slow drift still
+triggers a fresh scan, and a verdict is reused at most FRAME_DEDUP_MAX_REUSE times
+in a row.
+
+Configuration (environment variables):
+    FRAME_DEDUP_ENABLED: Set to "false" to analyse every frame (default: true).
+    FRAME_DEDUP_MAX_DISTANCE: Maximum differing hash bits (of 64) for a duplicate (default: 4).
+    FRAME_DEDUP_MAX_REUSE: Consecutive frames that may reuse one verdict (default: 10).
+"""
+
+import os
+import threading
+from dataclasses import dataclass, replace
+
+from backend.app.cache import TTLCache
+from backend.app.face_detection import FRAME_STATE_IDLE_TTL_SECONDS, DetectionProfile, DetectionResult
+
+FRAME_DEDUP_ENABLED = os.getenv("FRAME_DEDUP_ENABLED", "true").lower() != "false"
+FRAME_DEDUP_MAX_DISTANCE = int(os.getenv("FRAME_DEDUP_MAX_DISTANCE", "4"))
+FRAME_DEDUP_MAX_REUSE = int(os.getenv("FRAME_DEDUP_MAX_REUSE", "10"))
+
+
+@dataclass
+class AnalysedFrame:
+    """The last frame of a session that went through the cascade."""
+
+    profile: str
+    frame_hash: int
+    result: DetectionResult
+    reuse_count: int = 0
+
+
+class FrameDeduplicator:
+    """Per-session perceptual-hash cache with hit/miss counters."""
+
+    def __init__(
+        self,
+        enabled: bool = FRAME_DEDUP_ENABLED,
+        max_distance: int = FRAME_DEDUP_MAX_DISTANCE,
+        max_reuse: int = FRAME_DEDUP_MAX_REUSE,
+    ):
+        self.enabled = enabled
+        self.max_distance = max_distance
+        self.max_reuse = max_reuse
+        self.hits = 0
+        self.misses = 0
+        self._frames = TTLCache(ttl_seconds=FRAME_STATE_IDLE_TTL_SECONDS)
+        self._lock = threading.Lock()
+
+    def reference_hash(self, session_id: str, profile: DetectionProfile) -> int | None:
+        """Return the hash the next frame may match to reuse a verdict, or None to force analysis."""
+        if not self.enabled:
+            return None
+        frame = self._frames.get(session_id)
+        if frame is None or frame.profile != profile.name or frame.reuse_count >= self.max_reuse:
+            return None
+        return frame.frame_hash
+
+    def resolve(self, session_id: str, profile: DetectionProfile, result: DetectionResult) -> DetectionResult:
+        """
+        Record a worker result and return the effective result for the frame.
+
+        Duplicates are answered with the face count and box of the reference frame, but
+        keep their own hash and motion thumbnail so later stages compare against this frame.
+        """
+        if not self.enabled:
+            return result
+
+        if result.duplicate:
+            frame = self._frames.get(session_id)
+            if frame is None:
+                # Reference expired while the frame was in flight; the caller must re-analyse.
+                return result
+            frame.reuse_count += 1
+            self._count(hit=True)
+            return replace(
+                frame.result,
+                scan="skipped",
+                frame_hash=result.frame_hash,
+                thumbnail=result.thumbnail,
+                motion_score=result.motion_score,
+                duplicate=True,
+            )
+
+        if result.scan in ("full", "roi") and result.face_count is not None and result.frame_hash is not None:
+            self._frames.set(
+                session_id, AnalysedFrame(profile=profile.name, frame_hash=result.frame_hash, result=result)
+            )
+            self._count(hit=False)
+        return result
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters since start-up (or the last reset)."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "tracked_sessions": len(self._frames),
+            }
+
+    def forget(self, session_id: str):
+        """Drop a session's reference frame."""
+        self._frames.invalidate(session_id)
+
+    def clear(self):
+        """Drop all reference frames and reset the counters."""
+        self._frames.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+frame_deduplicator = FrameDeduplicator()
@@ -0,0 +1,19 @@
+"""
+Per-session frame analysis state.
+
+Frame analysis keeps per-session state in memory between frames (see face_tracking,
+frame_dedup, and motion_gate). Entries expire FRAME_STATE_IDLE_TTL_SECONDS after a session's last
+frame, but routes that end or remove a session drop them straight away with
+forget_frame_state.
+"""
+
+from backend.app.face_tracking import face_tracker
+from backend.app.frame_dedup import frame_deduplicator
+from backend.app.motion_gate import motion_gate
+
+
+def forget_frame_state(session_id: str):
+    """Drop everything frame analysis remembers about a session."""
+    face_tracker.forget(session_id)
+    frame_deduplicator.forget(session_id)
+    motion_gate.forget(session_id)
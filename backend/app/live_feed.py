@@ -0,0 +1,134 @@
+"""
+In-memory index of active sessions for the live proctor feed.
+
+The proctor dashboard used to re-stream every Active/Flagged session document on
+each poll. The index is loaded from Firestore once, kept current by the session
+routes (creation, violations, status changes, deletion), and every change is
+published as a delta to live feed subscribers. It is re-read from Firestore when
+older than LIVE_FEED_RESYNC_SECONDS to pick up sessions changed by other instances.
+
+Configuration (environment variables):
+    LIVE_FEED_RESYNC_SECONDS: Maximum age of the index before a new subscriber reloads it (default: 60).
+"""
+
+import os
+import threading
+import time
+from typing import Any
+
+from backend.app.logging_config import get_logger
+from backend.app.session_events import EventBroker
+
+logger = get_logger(__name__)
+
+LIVE_FEED_RESYNC_SECONDS = float(os.getenv("LIVE_FEED_RESYNC_SECONDS", "60"))
+
+ACTIVE_STATUSES = ("Active", "Flagged")
+
+# Session fields shown on the live feed, besides the document id
+SUMMARY_FIELDS = ("student_name", "studentId", "exam_title", "status", "trust_score", "latest_log")
+
+LIVE_FEED_TOPIC = "sessions"
+
+
+def active_session_summary(session_id: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Live-feed row for a session document."""
+    return {"id": session_id, **{field: data.get(field) for field in SUMMARY_FIELDS}}
+
+
+class ActiveSessionIndex:
+    """Summaries of Active/Flagged sessions, publishing upsert/remove deltas on change."""
+
+    def __init__(self, resync_seconds: float = LIVE_FEED_RESYNC_SECONDS):
+        self.resync_seconds = resync_seconds
+        self.events = EventBroker()
+        self._sessions: dict[str, dict[str, Any]] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def ensure_loaded(self, db):
+        """Load the index from Firestore if it has never been loaded or is older than the resync interval."""
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.resync_seconds
+        if fresh:
+            return
+
+        docs = db.collection("sessions").where("status", "in", list(ACTIVE_STATUSES)).stream()
+        sessions = {}
+        for doc in docs:
+            data = doc.to_dict()
+            if data.get("status") in ACTIVE_STATUSES:
+                sessions[doc.id] = active_session_summary(doc.id, data)
+
+        with self._lock:
+            previous, self._sessions = self._sessions, sessions
+            self._loaded_at = time.monotonic()
+        if previous:
+            # Subscribers built on the old index only need what changed.
+            for session_id in previous.keys() - sessions.keys():
+                self._publish({"type": "remove", "id": session_id})
+            for session_id, summary in sessions.items():
+                if previous.get(session_id) != summary:
+                    self._publish({"type": "upsert", "session": dict(summary)})
+        logger.info("Live feed index loaded with %d active sessions", len(sessions))
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Copy of every indexed session summary."""
+        with self._lock:
+            return [dict(summary) for summary in self._sessions.values()]
+
+    def track(self, session_id: str, data: dict[str, Any]):
+        """Add or replace a session from its full document data (e.g. on creation)."""
+        if not self.loaded:
+            return
+        if data.get("status") not in ACTIVE_STATUSES:
+            self.remove(session_id)
+            return
+        summary = active_session_summary(session_id, data)
+        with self._lock:
+            self._sessions[session_id] = summary
+        self._publish({"type": "upsert", "session": dict(summary)})
+
+    def apply(self, session_id: str, fields: dict[str, Any]):
+        """Merge changed session fields into an indexed session; sessions leaving Active/Flagged are removed."""
+        if not self.loaded:
+            return
+        with self._lock:
+            summary = self._sessions.get(session_id)
+            if summary is None:
+                return
+            changes = {k: v for k, v in fields.items() if k in SUMMARY_FIELDS and summary.get(k) != v}
+            if not changes:
+                return
+            summary.update(changes)
+            active = summary.get("status") in ACTIVE_STATUSES
+            if not active:
+                del self._sessions[session_id]
+        if active:
+            self._publish({"type": "upsert", "session": dict(summary)})
+        else:
+            self._publish({"type": "remove", "id": session_id})
+
+    def remove(self, session_id: str):
+        """Drop a session from the index (e.g. on deletion)."""
+        with self._lock:
+            removed = self._sessions.pop(session_id, None)
+        if removed is not None:
+            self._publish({"type": "remove", "id": session_id})
+
+    def _publish(self, delta: dict[str, Any]):
+        self.events.publish(LIVE_FEED_TOPIC, delta)
+
+    def clear(self):
+        """Forget the index so it is reloaded on next use, and drop all subscribers."""
+        with self._lock:
+            self._sessions.clear()
+            self._loaded_at = None
+        self.events.clear()
+
+
+active_sessions = ActiveSessionIndex()
@@ -0,0 +1,138 @@
+"""
+Motion-gated frame analysis for webcam proctoring.
+
+In motion-gated mode the detection worker differences a tiny grayscale thumbnail of
+each frame against the session's previous one and only runs the Haar cascade when
+the mean pixel change exceeds a threshold. Still frames reuse the last analysed
+verdict, and a fresh analysis is forced once FRAME_MOTION_MAX_INTERVAL_SECONDS have
+passed without one so a verdict never goes stale.
+
+Configuration (environment variables):
+    FACE_ANALYSIS_MODE: "every_frame" (default) or "motion_gated".
+    FRAME_MOTION_THRESHOLD: Mean absolute thumbnail change (0-255) that counts as motion (default: 8).
+    FRAME_MOTION_MAX_INTERVAL_SECONDS: Longest time a still session goes without analysis (default: 15).
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from backend.app.cache import TTLCache
+from backend.app.face_detection import FRAME_STATE_IDLE_TTL_SECONDS, DetectionProfile, DetectionResult
+from backend.app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ANALYSIS_MODES = ("every_frame", "motion_gated")
+
+FACE_ANALYSIS_MODE = os.getenv("FACE_ANALYSIS_MODE", "every_frame")
+FRAME_MOTION_THRESHOLD = float(os.getenv("FRAME_MOTION_THRESHOLD", "8"))
+FRAME_MOTION_MAX_INTERVAL_SECONDS = float(os.getenv("FRAME_MOTION_MAX_INTERVAL_SECONDS", "15"))
+
+if FACE_ANALYSIS_MODE not in ANALYSIS_MODES:
+    logger.warning("Unknown FACE_ANALYSIS_MODE '%s' — using 'every_frame'", FACE_ANALYSIS_MODE)
+    FACE_ANALYSIS_MODE = "every_frame"
+
+
+@dataclass
+class MotionState:
+    """Previous frame thumbnail and last analysed verdict for a session."""
+
+    profile: str
+    thumbnail: bytes | None = None
+    result: DetectionResult | None = None
+    analysed_at: float = 0.0
+
+
+class MotionGate:
+    """Per-session frame differencing state with gated/analysed counters."""
+
+    def __init__(
+        self,
+        mode: str = FACE_ANALYSIS_MODE,
+        threshold: float = FRAME_MOTION_THRESHOLD,
+        max_interval_seconds: float = FRAME_MOTION_MAX_INTERVAL_SECONDS,
+    ):
+        self.mode = mode
+        self.threshold = threshold
+        self.max_interval_seconds = max_interval_seconds
+        self.gated = 0
+        self.analysed = 0
+        self._states = TTLCache(ttl_seconds=FRAME_STATE_IDLE_TTL_SECONDS)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "motion_gated"
+
+    def reference_thumbnail(self, session_id: str, profile: DetectionProfile) -> bytes | None:
+        """Return the thumbnail to difference the next frame against, or None to force analysis."""
+        if not self.enabled:
+            return None
+        state = self._states.get(session_id)
+        if state is None or state.profile != profile.name or state.result is None:
+            return None
+        if time.monotonic() - state.analysed_at >= self.max_interval_seconds:
+            return None
+        return state.thumbnail
+
+    def resolve(self, session_id: str, profile: DetectionProfile, result: DetectionResult) -> DetectionResult:
+        """
+        Record a frame's thumbnail and return the effective result.
+
+        Still frames are answered with the last analysed verdict.
+        """
+        if not self.enabled or result.thumbnail is None:
+            return result
+
+        state = self._states.get(session_id)
+        if state is None or state.profile != profile.name:
+            state = MotionState(profile=profile.name)
+        state.thumbnail = result.thumbnail
+        self._states.set(session_id, state)
+
+        if result.scan == "still":
+            if state.result is None:
+                # Verdict expired while the frame was in flight; the caller must re-analyse.
+                return result
+            self._count(gated=True)
+            return replace(state.result, scan="still", thumbnail=result.thumbnail, motion_score=result.motion_score)
+
+        if result.scan in ("full", "roi") and result.face_count is not None:
+            state.result = result
+            state.analysed_at = time.monotonic()
+            self._count(gated=False)
+        return result
+
+    def _count(self, gated: bool):
+        with self._lock:
+            if gated:
+                self.gated += 1
+            else:
+                self.analysed += 1
+
+    def stats(self) -> dict:
+        """Gated/analysed counters since start-up (or the last reset)."""
+        with self._lock:
+            total = self.gated + self.analysed
+            return {
+                "mode": self.mode,
+                "gated": self.gated,
+                "analysed": self.analysed,
+                "gated_rate": round(self.gated / total, 4) if total else 0.0,
+            }
+
+    def forget(self, session_id: str):
+        """Drop a session's motion state."""
+        self._states.invalidate(session_id)
+
+    def clear(self):
+        """Drop all motion state and reset the counters."""
+        self._states.clear()
+        with self._lock:
+            self.gated = 0
+            self.analysed = 0
+
+
+motion_gate = MotionGate()
@@ -0,0 +1,37 @@
+"""
+Opaque cursors for keyset-paginated Firestore queries.
+
+Paginated endpoints order by one field and then by document id (descending), and
+hand the client a cursor naming the last row it received. The cursor is passed back
+to continue with Firestore's start_after, so each page costs only the documents it
+returns regardless of how deep into the results the client is. The next page's
+cursor is returned in the NEXT_CURSOR_HEADER response header.
+"""
+
+import base64
+import json
+from typing import Any
+
+from backend.app.errors import InvalidPayloadError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(order_field: str, value: Any, doc_id: str) -> str:
+    """Opaque cursor pointing just after the document with this order value and id."""
+    position = json.dumps({order_field: value, "id": doc_id})
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str, order_field: str) -> dict[str, Any]:
+    """
+    Firestore start_after values for a cursor from encode_cursor.
+
+    Raises:
+        InvalidPayloadError: If the cursor is malformed or was issued for another ordering.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {order_field: position[order_field], "__name__": str(position["id"])}
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPayloadError("Invalid pagination cursor.", details={"cursor": cursor})
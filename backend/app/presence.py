@@ -0,0 +1,310 @@
+"""
+In-memory presence table for candidate heartbeats.
+
+Clients send a heartbeat every few seconds. Writing each one to Firestore (and a
+log entry for every beat spent unfocused) made heartbeats the largest source of
+session writes. The presence table keeps each session's latest heartbeat in memory
+and only asks for a Firestore write when the tab focus changes or
+HEARTBEAT_WRITE_INTERVAL_SECONDS have passed since the last write. Focus loss is
+logged once when it starts, and again with its duration when focus comes back.
+Presence entries have Info severity: they are kept for review but carry no penalty
+and are not counted as violations.
+
+The table also detects candidates who stop sending heartbeats. Each tracked session
+has one entry in a min-heap keyed by the time its next heartbeat is due, so a
+heartbeat costs O(1) and a background sweep only pops the entries that have come
+due, instead of re-querying Firestore for every Active session. A session silent for
+HEARTBEAT_TIMEOUT_SECONDS is marked Disconnected with a log entry; its next
+heartbeat marks it Connected again and logs how long it was gone.
+
+Configuration (environment variables):
+    HEARTBEAT_WRITE_INTERVAL_SECONDS: Minimum time between heartbeat writes per session (default: 30).
+    HEARTBEAT_TIMEOUT_SECONDS: Heartbeat gap after which a session is flagged disconnected; 0 disables (default: 60).
+    HEARTBEAT_SWEEP_INTERVAL_SECONDS: How often the stale-heartbeat sweep runs (default: 5).
+"""
+
+import asyncio
+import contextlib
+import heapq
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.app.logging_config import get_logger
+from backend.app.session_cache import TERMINAL_STATUSES, get_session_state
+from backend.app.trust_score import SEVERITY_INFO
+from backend.app.write_buffer import session_write_buffer
+
+logger = get_logger(__name__)
+
+HEARTBEAT_WRITE_INTERVAL_SECONDS = float(os.getenv("HEARTBEAT_WRITE_INTERVAL_SECONDS", "30"))
+HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("HEARTBEAT_TIMEOUT_SECONDS", "60"))
+HEARTBEAT_SWEEP_INTERVAL_SECONDS = float(os.getenv("HEARTBEAT_SWEEP_INTERVAL_SECONDS", "5"))
+
+FOCUS_LOST_MESSAGE = "Tab lost focus (unfocused window detected)"
+
+CONNECTED = "Connected"
+DISCONNECTED = "Disconnected"
+
+
+@dataclass
+class Presence:
+    """Latest heartbeat of one session."""
+
+    last_seen: float
+    last_heartbeat: str
+    tab_focused: bool
+    clock_drift_seconds: float | None = None
+    battery_level: float | None = None
+    unfocused_since: str | None = None
+    unfocused_at: float | None = None
+    written_at: float | None = None
+    disconnected: bool = False
+    # Deadline of this session's live heap entry; entries with any other deadline are stale
+    due_at: float | None = None
+
+
+@dataclass
+class HeartbeatOutcome:
+    """Firestore writes a heartbeat calls for: session fields (if due) and presence log entries."""
+
+    fields: dict[str, Any] | None = None
+    logs: list[dict[str, Any]] = field(default_factory=list)
+
+
+class PresenceTable:
+    """Per-session heartbeat state with throttled persistence, focus-transition logging, and stale detection."""
+
+    def __init__(
+        self,
+        write_interval: float = HEARTBEAT_WRITE_INTERVAL_SECONDS,
+        timeout: float = HEARTBEAT_TIMEOUT_SECONDS,
+        sweep_interval: float = HEARTBEAT_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.write_interval = write_interval
+        self.timeout = timeout
+        self.sweep_interval = sweep_interval
+        self.heartbeats = 0
+        self.writes = 0
+        self.disconnects = 0
+        self._sessions: dict[str, Presence] = {}
+        self._deadlines: list[tuple[float, str]] = []
+        self._db = None
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def monitoring(self) -> bool:
+        return self.timeout > 0
+
+    def record(
+        self,
+        db,
+        session_id: str,
+        tab_focused: bool,
+        clock_drift_seconds: float | None = None,
+        battery_level: float | None = None,
+    ) -> HeartbeatOutcome:
+        """Record a heartbeat and return the writes it requires."""
+        now = time.monotonic()
+        timestamp = datetime.now(UTC).isoformat()
+        outcome = HeartbeatOutcome()
+
+        with self._lock:
+            self._db = db
+            self.heartbeats += 1
+            presence = self._sessions.get(session_id)
+            focus_changed = presence is None and not tab_focused
+            reconnected = presence is not None and presence.disconnected
+            if presence is None:
+                presence = Presence(last_seen=now, last_heartbeat=timestamp, tab_focused=tab_focused)
+                self._sessions[session_id] = presence
+                self._schedule(session_id, presence, now)
+            elif reconnected:
+                presence.disconnected = False
+                offline = round(now - presence.last_seen, 1)
+                outcome.logs.append(
+                    {
+                        "message": f"Heartbeat resumed after {offline}s offline",
+                        "timestamp": timestamp,
+                        "severity": SEVERITY_INFO,
+                        "offline_seconds": offline,
+                    }
+                )
+                self._schedule(session_id, presence, now)
+            if not focus_changed and presence.tab_focused != tab_focused:
+                focus_changed = True
+                if tab_focused:
+                    outcome.logs.append(self._focus_restored_log(presence, now, timestamp))
+
+            if focus_changed and not tab_focused:
+                presence.unfocused_since, presence.unfocused_at = timestamp, now
+                outcome.logs.append({"message": FOCUS_LOST_MESSAGE, "timestamp": timestamp, "severity": SEVERITY_INFO})
+            elif tab_focused:
+                presence.unfocused_since, presence.unfocused_at = None, None
+
+            presence.last_seen = now
+            presence.last_heartbeat = timestamp
+            presence.tab_focused = tab_focused
+            if clock_drift_seconds is not None:
+                presence.clock_drift_seconds = clock_drift_seconds
+            if battery_level is not None:
+                presence.battery_level = battery_level
+
+            due = presence.written_at is None or now - presence.written_at >= self.write_interval
+            if due or focus_changed or reconnected:
+                presence.written_at = now
+                self.writes += 1
+                outcome.fields = self._fields(presence)
+                if reconnected:
+                    outcome.fields["connection_status"] = CONNECTED
+        return outcome
+
+    def _schedule(self, session_id: str, presence: Presence, now: float):
+        """Give a session a heap entry due when its next heartbeat is overdue (lock held)."""
+        if not self.monitoring:
+            return
+        presence.due_at = now + self.timeout
+        heapq.heappush(self._deadlines, (presence.due_at, session_id))
+
+    def sweep(self) -> list[tuple[str, Presence]]:
+        """
+        Mark sessions whose heartbeat is overdue as disconnected.
+
+        Only heap entries that have come due are examined; a session that has beaten
+        since its entry was pushed is re-scheduled at its real deadline.
+
+        Returns:
+            The newly disconnected sessions with a copy of their presence.
+        """
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                due_at, session_id = heapq.heappop(self._deadlines)
+                presence = self._sessions.get(session_id)
+                if presence is None or presence.due_at != due_at:
+                    continue
+                expected = presence.last_seen + self.timeout
+                if expected > now:
+                    presence.due_at = expected
+                    heapq.heappush(self._deadlines, (expected, session_id))
+                    continue
+                presence.disconnected = True
+                presence.due_at = None
+                self.disconnects += 1
+                stale.append((session_id, Presence(**vars(presence))))
+        return stale
+
+    def check_heartbeats(self, db=None) -> int:
+        """
+        Sweep for overdue heartbeats and record each disconnect on its session.
+
+        Sessions that have meanwhile been completed, terminated, or deleted are dropped
+        instead. Returns the number of sessions flagged.
+        """
+        db = db or self._db
+        flagged = 0
+        for session_id, presence in self.sweep():
+            state = get_session_state(db, session_id) if db is not None else None
+            if state is None or state.get("status") in TERMINAL_STATUSES:
+                self.forget(session_id)
+                continue
+            gap = round(time.monotonic() - presence.last_seen)
+            timestamp = datetime.now(UTC).isoformat()
+            session_write_buffer.update(
+                db, session_id, {"connection_status": DISCONNECTED, "disconnected_at": timestamp}
+            )
+            session_write_buffer.add_log(
+                db,
+                session_id,
+                {
+                    "message": f"Heartbeat lost: no heartbeat for {gap}s",
+                    "timestamp": timestamp,
+                    "severity": SEVERITY_INFO,
+                    "last_heartbeat": presence.last_heartbeat,
+                },
+            )
+            logger.info("Session %s flagged disconnected after %ss without a heartbeat", session_id, gap)
+            flagged += 1
+        return flagged
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await run_in_threadpool(self.check_heartbeats)
+            except Exception as e:
+                logger.error("Stale heartbeat sweep failed: %s", e, exc_info=True)
+
+    def start(self):
+        """Start the periodic stale-heartbeat sweep on the running event loop."""
+        if self.monitoring and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the stale-heartbeat sweep."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    @staticmethod
+    def _focus_restored_log(presence: Presence, now: float, timestamp: str) -> dict[str, Any]:
+        duration = round(now - presence.unfocused_at, 1) if presence.unfocused_at is not None else None
+        return {
+            "message": f"Tab focus restored after {duration}s" if duration is not None else "Tab focus restored",
+            "timestamp": timestamp,
+            "severity": SEVERITY_INFO,
+            "unfocused_since": presence.unfocused_since,
+            "duration_seconds": duration,
+        }
+
+    @staticmethod
+    def _fields(presence: Presence) -> dict[str, Any]:
+        fields: dict[str, Any] = {"last_heartbeat": presence.last_heartbeat, "tab_focused": presence.tab_focused}
+        if presence.clock_drift_seconds is not None:
+            fields["clock_drift_seconds"] = presence.clock_drift_seconds
+        if presence.battery_level is not None:
+            fields["battery_level"] = presence.battery_level
+        return fields
+
+    def get(self, session_id: str) -> Presence | None:
+        """The session's latest heartbeat, if it has sent one."""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def forget(self, session_id: str):
+        """Stop tracking a session (e.g. once it is submitted, terminated, or deleted)."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        """Tracked sessions and heartbeat/write counters since start-up (or the last reset)."""
+        with self._lock:
+            return {
+                "tracked_sessions": len(self._sessions),
+                "disconnected_sessions": sum(1 for p in self._sessions.values() if p.disconnected),
+                "heartbeats": self.heartbeats,
+                "writes": self.writes,
+                "disconnects": self.disconnects,
+            }
+
+    def clear(self):
+        """Forget every session and reset the counters."""
+        with self._lock:
+            self._sessions.clear()
+            self._deadlines.clear()
+            self._db = None
+            self.heartbeats = 0
+            self.writes = 0
+            self.disconnects = 0
+
+
+presence_table = PresenceTable()
@@ -5,17 +5,36 @@ Handles admin dashboard data, student CRUD, exam history,
 and exam generation.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from collections.abc import Iterator
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from firebase_admin import auth
 from firebase_admin.auth import EmailAlreadyExistsError
+from google.cloud import firestore
 from pydantic import BaseModel
 
+from backend.app.aggregations import dashboard_totals
 from backend.app.ai_service import (
     check_semantic_consistency,
     generate_questions_from_content,
 )
 from backend.app.dependencies import get_firestore_db
+from backend.app.errors import InvalidPayloadError, SecureEvalError
+from backend.app.exam_cache import invalidate_exam_paper
+from backend.app.exports import (
+    COLUMNAR_EXPORT_AVAILABLE,
+    COLUMNAR_EXPORT_FORMATS,
+    COLUMNAR_EXTRA_FIELDS,
+    EXPORT_FILE_EXTENSIONS,
+    EXPORT_FORMATS,
+    EXPORT_MEDIA_TYPES,
+    export_chunks,
+    gzip_chunks,
+)
 from backend.app.logging_config import get_logger
+from backend.app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 logger = get_logger(__name__)
 
@@ -43,93 +62,268 @@ class ContentRequest(BaseModel):
 # --- Exam History ---
 
 
+# Page size for GET /admin/exams/history when a cursor is given without a limit, and the largest allowed
+HISTORY_DEFAULT_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Session fields read for history rows; answers, feedback and AI reports are never fetched
+HISTORY_FIELDS = (
+    "student_name",
+    "studentId",
+    "exam_title",
+    "exam_type",
+    "status",
+    "trust_score",
+    "score",
+    "percentage",
+    "total",
+    "latest_log",
+    "created_at",
+)
+
+
+def _history_row(session_id: str, data: dict[str, Any], extra_fields: tuple[str, ...] = ()) -> dict[str, Any]:
+    row = {
+        "id": session_id,
+        "student_name": data.get("student_name"),
+        "studentId": data.get("studentId"),
+        "exam_title": data.get("exam_title"),
+        "exam_type": data.get("exam_type", "University"),
+        "status": data.get("status"),
+        "trust_score": data.get("trust_score"),
+        "score": data.get("score", 0),
+        "percentage": data.get("percentage", 0),
+        "total": data.get("total", 0),
+        "latest_log": data.get("latest_log"),
+        "created_at": data.get("created_at", ""),
+    }
+    row.update({field: data.get(field) for field in extra_fields})
+    return row
+
+
+def _filtered_sessions(
+    db,
+    status: str | None = None,
+    exam_id: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+):
+    query = db.collection("sessions")
+    if status:
+        query = query.where("status", "==", status)
+    if exam_id:
+        query = query.where("exam_id", "==", exam_id)
+    if created_from:
+        query = query.where("created_at", ">=", created_from)
+    if created_to:
+        query = query.where("created_at", "<=", created_to)
+    return query
+
+
+def _history_query(db, extra_fields: tuple[str, ...] = (), **filters: str | None):
+    """
+    Session history query, newest first, projected to HISTORY_FIELDS plus extra_fields.
+
+    Ties on created_at are broken by document id so cursors are stable. Filtering on
+    status or exam together with the created_at ordering needs a composite index.
+    """
+    return (
+        _filtered_sessions(db, **filters)
+        .order_by("created_at", direction=firestore.Query.DESCENDING)
+        .order_by("__name__", direction=firestore.Query.DESCENDING)
+        .select([*HISTORY_FIELDS, *extra_fields])
+    )
+
+
+def fetch_full_history(db, **filters: str | None) -> list[dict[str, Any]]:
+    """
+    Every matching history row in one list, newest first.
+
+    Unlike the paginated query this also returns sessions without a created_at
+    (sorted last), as the unpaginated endpoint always has.
+    """
+    query = _filtered_sessions(db, **filters).select(list(HISTORY_FIELDS))
+    rows = [_history_row(doc.id, doc.to_dict()) for doc in query.stream()]
+    rows.sort(key=lambda row: row["created_at"] or "", reverse=True)
+    return rows
+
+
+def fetch_history_page(
+    db, limit: int, cursor: str | None = None, extra_fields: tuple[str, ...] = (), **filters: str | None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Read one page of session history, with extra_fields copied onto each row.
+
+    Returns:
+        The page's rows and the cursor for the next page (None on the last page).
+    """
+    query = _history_query(db, extra_fields, **filters)
+    if cursor:
+        query = query.start_after(decode_cursor(cursor, "created_at"))
+    # One extra row tells whether another page follows without a count query.
+    rows = [_history_row(doc.id, doc.to_dict(), extra_fields) for doc in query.limit(limit + 1).stream()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor("created_at", rows[-1]["created_at"], rows[-1]["id"])
+
+
+def iter_session_history(
+    db, page_size: int = HISTORY_MAX_PAGE_SIZE, extra_fields: tuple[str, ...] = (), **filters: str | None
+) -> Iterator[dict[str, Any]]:
+    """
+    Every matching history row, newest first, read one page at a time.
+
+    The first page is read before returning, so a failing query raises here rather
+    than part-way through a streamed response. Sessions without a created_at follow
+    the dated ones, as in fetch_full_history.
+    """
+    rows, cursor = fetch_history_page(db, page_size, None, extra_fields, **filters)
+    return _remaining_history(db, rows, cursor, page_size, extra_fields, filters)
+
+
+def _remaining_history(
+    db,
+    rows: list[dict[str, Any]],
+    cursor: str | None,
+    page_size: int,
+    extra_fields: tuple[str, ...],
+    filters: dict[str, str | None],
+) -> Iterator[dict[str, Any]]:
+    yield from rows
+    while cursor is not None:
+        rows, cursor = fetch_history_page(db, page_size, cursor, extra_fields, **filters)
+        yield from rows
+
+    # The created_at ordering skips undated sessions, and a created_at bound excludes them anyway.
+    if filters.get("created_from") or filters.get("created_to"):
+        return
+    query = _filtered_sessions(db, **filters).select([*HISTORY_FIELDS, *extra_fields])
+    for doc in query.stream():
+        data = doc.to_dict()
+        if not data.get("created_at"):
+            yield _history_row(doc.id, data, extra_fields)
+
+
 @router.get("/admin/exams/history", tags=["Exam Session"])
-def get_session_history(db=Depends(get_firestore_db)):
+def get_session_history(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    status: str | None = None,
+    exam_id: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    db=Depends(get_firestore_db),
+):
+    """
+    Session history, newest first.
+
+    Without `limit` or `cursor` every matching session is returned. With `limit`, one
+    page is returned; pass the X-Next-Cursor response header back as `cursor` to fetch
+    the next page (the header is absent on the last page). `created_from`/`created_to`
+    are inclusive ISO-8601 bounds on created_at.
+    """
     logger.info("Fetching session history from Firestore")
     if not db:
         raise HTTPException(status_code=500, detail="Database connection failed")
 
+    filters = {"status": status, "exam_id": exam_id, "created_from": created_from, "created_to": created_to}
     try:
-        sessions_ref = db.collection("sessions")
-        docs = sessions_ref.stream()
+        if limit is None and cursor is None:
+            rows, next_cursor = fetch_full_history(db, **filters), None
+        else:
+            page_size = limit or HISTORY_DEFAULT_PAGE_SIZE
+            rows, next_cursor = fetch_history_page(db, page_size, cursor, extra_fields=(), **filters)
+    except SecureEvalError:
+        raise
+    except Exception as e:
+        logger.error("Error fetching session history: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch session history")
 
-        sessions_data = []
-        for doc in docs:
-            data = doc.to_dict()
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    logger.info("Session history: %d sessions", len(rows))
+    return rows
 
-            sessions_data.append(
-                {
-                    "id": doc.id,
-                    "student_name": data.get("student_name"),
-                    "studentId": data.get("studentId"),
-                    "exam_title": data.get("exam_title"),
-                    "exam_type": data.get("exam_type", "University"),
-                    "status": data.get("status"),
-                    "trust_score": data.get("trust_score"),
-                    "score": data.get("score", 0),
-                    "percentage": data.get("percentage", 0),
-                    "total": data.get("total", 0),
-                    "latest_log": data.get("latest_log"),
-                    "created_at": data.get("created_at", ""),
-                }
-            )
 
-        logger.info("Total sessions found: %d", len(sessions_data))
-        sessions_data.sort(key=lambda x: x["created_at"] or "", reverse=True)
+@router.get("/admin/dashboard/stats", tags=["Exam Session"])
+def get_dashboard_stats(db=Depends(get_firestore_db)):
+    """Session counts by status, averages, and student/exam totals across all sessions."""
+    if not db:
+        raise HTTPException(status_code=500, detail="Database connection failed")
 
-        return sessions_data
+    try:
+        return dashboard_totals(db)
     except Exception as e:
-        logger.error("Error fetching session history: %s", e, exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to fetch session history")
+        logger.error("Error computing dashboard stats: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to compute dashboard stats")
 
 
 @router.get("/admin/exams/export", tags=["Exam Session"])
-def export_session_history(format: str = "json", db=Depends(get_firestore_db)):
-    """Export exam session history in CSV or JSON format."""
-    sessions = get_session_history(db=db)
-
-    if format.lower() == "csv":
-        import csv
-        import io
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            [
-                "Session ID",
-                "Student ID",
-                "Student Name",
-                "Exam Title",
-                "Status",
-                "Trust Score",
-                "Score",
-                "Percentage",
-                "Created At",
-            ]
+def export_session_history(
+    format: str = "json",
+    gzip: bool = False,
+    status: str | None = None,
+    exam_id: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    db=Depends(get_firestore_db),
+):
+    """
+    Stream exam session history as JSON, NDJSON, CSV, Parquet, or an Arrow IPC stream.
+
+    Rows are read from Firestore a page at a time and written as they arrive, so the
+    download starts immediately and memory use does not grow with the export size.
+    Parquet and Arrow add cheat_score, clock drift, and per-question timings, are
+    written in row groups, and need pyarrow. Text formats can be gzip-compressed.
+    Accepts the same filters as GET /admin/exams/history.
+    """
+    if not db:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+
+    export_format = format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise InvalidPayloadError(
+            f"Unsupported export format '{format}'.", details={"supported_formats": list(EXPORT_FORMATS)}
         )
-        for s in sessions:
-            writer.writerow(
-                [
-                    s.get("id", ""),
-                    s.get("student_id", ""),
-                    s.get("student_name", ""),
-                    s.get("exam_title", ""),
-                    s.get("status", ""),
-                    s.get("trust_score", 100),
-                    s.get("score", 0),
-                    s.get("percentage", 0),
-                    s.get("created_at", ""),
-                ]
-            )
-        from fastapi.responses import Response
 
-        return Response(
-            content=output.getvalue(),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=exam_sessions_export.csv"},
+    columnar = export_format in COLUMNAR_EXPORT_FORMATS
+    if columnar and not COLUMNAR_EXPORT_AVAILABLE:
+        raise SecureEvalError(
+            f"The {export_format} export format requires the optional pyarrow package.",
+            status_code=501,
+            error_code="EXPORT_FORMAT_UNAVAILABLE",
+            details={"format": export_format},
         )
 
-    return {"sessions": sessions, "total_count": len(sessions)}
+    try:
+        rows = iter_session_history(
+            db,
+            extra_fields=COLUMNAR_EXTRA_FIELDS if columnar else (),
+            status=status,
+            exam_id=exam_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except SecureEvalError:
+        raise
+    except Exception as e:
+        logger.error("Error exporting session history: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to export session history")
+    body = export_chunks(rows, export_format)
+    filename = f"exam_sessions_export.{EXPORT_FILE_EXTENSIONS.get(export_format, export_format)}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 # --- Student CRUD ---
@@ -273,6 +467,14 @@ def delete_student(student_id: str, db=Depends(get_firestore_db)):
             raise HTTPException(status_code=400, detail="Failed to delete student")
 
 
+@router.delete("/admin/exams/{exam_id}/cache", tags=["Admin Service"])
+def invalidate_exam_cache(exam_id: str):
+    """Drop a cached exam paper after it has been edited so candidates get the new version."""
+    invalidate_exam_paper(exam_id)
+    logger.info("Exam paper cache invalidated for exam %s", exam_id)
+    return {"status": "Invalidated", "exam_id": exam_id}
+
+
 # --- AI Exam Generation ---
 
 
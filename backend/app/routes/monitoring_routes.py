@@ -5,38 +5,56 @@ Handles webcam frame analysis for face detection and
 exam integrity monitoring.
 """
 
+import asyncio
 import base64
+from dataclasses import replace
 from datetime import UTC, datetime
 
-import cv2
-import numpy as np
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, field_validator
 
 from backend.app.dependencies import get_firestore_db
+from backend.app.errors import InvalidPayloadError, SecureEvalError
+from backend.app.face_detection import (
+    DETECTION_PROFILES,
+    DetectionProfile,
+    DetectionResult,
+    FrameHints,
+    detection_engine,
+    resolve_profile,
+)
+from backend.app.face_tracking import face_tracker
+from backend.app.frame_dedup import frame_deduplicator
+from backend.app.frame_state import forget_frame_state
 from backend.app.logging_config import get_logger
+from backend.app.motion_gate import motion_gate
+from backend.app.presence import presence_table
+from backend.app.session_cache import get_session_state, update_session_state
+from backend.app.trust_score import PENALTY_TERMINATION, trust_penalty_update, violation_severity
+from backend.app.write_buffer import session_write_buffer
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
-# Initialize face detection cascade
-face_cascade: cv2.CascadeClassifier | None = None
-try:
-    cv2_data = getattr(cv2, "data", None)
-    haarcascade_path = getattr(cv2_data, "haarcascades", "") + "haarcascade_frontalface_default.xml"
-    face_cascade = cv2.CascadeClassifier(haarcascade_path)
-except Exception:
-    face_cascade = None
+if not detection_engine.available:
     logger.warning("Haarcascade not found — face detection will be unavailable")
 
 # Maximum base64 image payload size (10 MB)
 MAX_IMAGE_PAYLOAD_SIZE = 10 * 1024 * 1024
 
+# Form field carrying the frame for multipart uploads to /analyze_frame/{session_id}
+MULTIPART_FRAME_FIELD = "frame"
+
+# Maximum frames per /analyze_frames request (each termination costs two of Firestore's 500 batch writes)
+MAX_BATCH_FRAMES = 32
+
 
 class FrameData(BaseModel):
     session_id: str
     image: str
+    profile: str | None = None
 
     @field_validator("image")
     @classmethod
@@ -46,85 +64,394 @@ class FrameData(BaseModel):
             raise ValueError(f"Image payload too large: {len(v)} bytes (max {MAX_IMAGE_PAYLOAD_SIZE} bytes)")
         return v
 
+    @field_validator("profile")
+    @classmethod
+    def validate_profile(cls, v):
+        """Validate that a requested detection profile exists."""
+        if v is not None and v not in DETECTION_PROFILES:
+            raise ValueError(f"Unknown detection profile '{v}' (expected one of {sorted(DETECTION_PROFILES)})")
+        return v
+
+
+class FrameBatch(BaseModel):
+    frames: list[FrameData]
+
+    @field_validator("frames")
+    @classmethod
+    def validate_batch_size(cls, v):
+        """Validate that the batch holds between one and MAX_BATCH_FRAMES frames."""
+        if not v:
+            raise ValueError("Frame batch must contain at least one frame")
+        if len(v) > MAX_BATCH_FRAMES:
+            raise ValueError(f"Frame batch too large: {len(v)} frames (max {MAX_BATCH_FRAMES})")
+        return v
 
-@router.post("/analyze_frame", tags=["Monitoring Service"], summary="Analyze Webcam Frame")
-def analyze_frame(data: FrameData, db=Depends(get_firestore_db)):
-    if face_cascade is None:
-        return {"status": "Error", "message": "Face detection unavailable"}
 
+def _decode_base64_frame(image: str) -> bytes | None:
+    """Decode a base64 frame, with or without a data URI prefix; None if it is not valid base64."""
+    encoded_data = image.split(",")[1] if "," in image else image
     try:
-        # Decode image
-        encoded_data = data.image.split(",")[1] if "," in data.image else data.image
+        return base64.b64decode(encoded_data)
+    except Exception:
+        return None
+
+
+def _apply_session_policy(
+    session_id: str, face_count: int, db, batch=None, pending: dict[str, dict] | None = None
+) -> dict:
+    """
+    Apply the zero-tolerance policy for a frame's face count and build its verdict.
+
+    The session's buffered writes are flushed before it is terminated. Without a batch the
+    termination is committed at once and published to the session state cache. With a
+    caller-supplied batch it is queued there and its state update recorded in `pending`
+    (session id -> update), for the caller to publish once the batch has committed.
+    """
+    is_suspicious = False
+    reason = ""
+
+    if face_count == 0:
+        is_suspicious = True
+        reason = "No face detected"
+    elif face_count > 1:
+        is_suspicious = True
+        reason = f"Multiple faces detected ({face_count})"
+
+    # DB Logging if suspicious
+    if is_suspicious:
+        if not db:
+            logger.error("Firestore connection failed during violation logging")
+            return {"status": "Error", "message": "Database error"}
 
         try:
-            decoded_bytes = base64.b64decode(encoded_data)
-        except Exception:
-            return {"status": "Error", "message": "Invalid base64 image data"}
-
-        nparr = np.frombuffer(decoded_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            return {"status": "Error", "message": "Invalid image"}
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-
-        face_count = len(faces)
-        is_suspicious = False
-        reason = ""
-
-        if face_count == 0:
-            is_suspicious = True
-            reason = "No face detected"
-        elif face_count > 1:
-            is_suspicious = True
-            reason = f"Multiple faces detected ({face_count})"
-
-        # DB Logging if suspicious
-        if is_suspicious:
-            if not db:
-                logger.error("Firestore connection failed during violation logging")
-                return {"status": "Error", "message": "Database error"}
+            if pending and session_id in pending:
+                # Already terminated by an earlier frame of this batch
+                return {
+                    "status": "Terminated",
+                    "face_count": face_count,
+                    "reason": pending[session_id]["termination_reason"],
+                }
 
-            try:
-                session_ref = db.collection("sessions").document(data.session_id)
-                session_doc = session_ref.get()
-
-                if session_doc.exists:
-                    session_data = session_doc.to_dict()
-                    if session_data.get("status") == "Active":
-                        # STRICT TERMINATION LOGIC
-                        termination_reason = f"Zero Tolerance Violation: {reason}"
-
-                        # Update Session
-                        session_ref.update(
-                            {
-                                "status": "Terminated",
-                                "termination_reason": termination_reason,
-                                "trust_score": 0,
-                                "latest_log": f"Terminated: {reason}",
-                            }
-                        )
-
-                        # Log to subcollection
-                        log_entry = {"message": f"Terminated: {reason}", "timestamp": datetime.now(UTC).isoformat()}
-                        session_ref.collection("logs").add(log_entry)
-
-                        logger.warning("Session %s terminated: %s", data.session_id, termination_reason)
-
-                        return {"status": "Terminated", "face_count": face_count, "reason": termination_reason}
-                    elif session_data.get("status") == "Terminated":
-                        return {
-                            "status": "Terminated",
-                            "face_count": face_count,
-                            "reason": session_data.get("termination_reason"),
-                        }
-
-            except Exception as e:
-                logger.error("Error logging violation to Firestore: %s", e, exc_info=True)
-
-        return {"status": "Active", "face_count": face_count, "reason": None}
+            state = get_session_state(db, session_id)
+
+            if state is not None:
+                if state.get("status") == "Active":
+                    # STRICT TERMINATION LOGIC
+                    termination_reason = f"Zero Tolerance Violation: {reason}"
+                    trust_value, _ = trust_penalty_update(state.get("trust_score"), PENALTY_TERMINATION)
+                    termination_update = {
+                        "status": "Terminated",
+                        "termination_reason": termination_reason,
+                        "trust_score": trust_value,
+                        "latest_log": f"Terminated: {reason}",
+                    }
+
+                    # Update Session
+                    session_ref = db.collection("sessions").document(session_id)
+                    log_entry = {
+                        "message": f"Terminated: {reason}",
+                        "timestamp": datetime.now(UTC).isoformat(),
+                        "severity": violation_severity(PENALTY_TERMINATION),
+                    }
+                    # Buffered writes for the session must land before the termination
+                    session_write_buffer.flush(db, session_id)
+                    writes = db.batch() if batch is None else batch
+                    writes.update(session_ref, termination_update)
+                    writes.set(session_ref.collection("logs").document(), log_entry)
+                    if batch is None:
+                        writes.commit()
+                        update_session_state(session_id, termination_update)
+                        forget_frame_state(session_id)
+                    elif pending is not None:
+                        pending[session_id] = termination_update
+
+                    logger.warning("Session %s terminated: %s", session_id, termination_reason)
+
+                    return {"status": "Terminated", "face_count": face_count, "reason": termination_reason}
+                elif state.get("status") == "Terminated":
+                    return {
+                        "status": "Terminated",
+                        "face_count": face_count,
+                        "reason": state.get("termination_reason"),
+                    }
 
+        except Exception as e:
+            logger.error("Error logging violation to Firestore: %s", e, exc_info=True)
+
+    return {"status": "Active", "face_count": face_count, "reason": None}
+
+
+def _resolve_frame(session_id: str, profile: DetectionProfile, result: DetectionResult) -> DetectionResult:
+    """Answer skipped and still frames from the session's last analysed verdict."""
+    result = frame_deduplicator.resolve(session_id, profile, result)
+    return motion_gate.resolve(session_id, profile, result)
+
+
+async def _detect_frame(buffer, session_id: str, profile: DetectionProfile) -> DetectionResult:
+    """Detect faces using the session's tracking region, duplicate-frame and motion references."""
+    hints = FrameHints(
+        roi=face_tracker.roi_for(session_id, profile),
+        reference_hash=frame_deduplicator.reference_hash(session_id, profile),
+        max_hash_distance=frame_deduplicator.max_distance,
+        reference_thumbnail=motion_gate.reference_thumbnail(session_id, profile),
+        motion_threshold=motion_gate.threshold,
+    )
+    result = _resolve_frame(session_id, profile, await detection_engine.detect(buffer, profile, hints))
+    if result.face_count is None and result.scan in ("skipped", "still"):
+        retry_hints = replace(hints, reference_hash=None, reference_thumbnail=None)
+        result = _resolve_frame(session_id, profile, await detection_engine.detect(buffer, profile, retry_hints))
+
+    face_tracker.observe(session_id, profile, result)
+    return result
+
+
+async def _analyze_image_bytes(buffer, session_id: str, db, profile: DetectionProfile) -> dict:
+    """Run face detection on an encoded frame in the detection pool and build the session verdict."""
+    try:
+        result = await _detect_frame(buffer, session_id, profile)
+        if result.face_count is None:
+            return {"status": "Error", "message": result.error or "Invalid image", "profile": profile.name}
+
+        verdict = await run_in_threadpool(_apply_session_policy, session_id, result.face_count, db)
+        verdict["profile"] = profile.name
+        return verdict
+    except SecureEvalError:
+        raise
     except Exception as e:
         logger.error("Error analyzing frame: %s", e, exc_info=True)
         return {"status": "Error", "message": "Frame analysis failed"}
+
+
+async def _read_frame_body(request: Request) -> bytes | bytearray:
+    """
+    Read a raw or multipart frame upload, enforcing MAX_IMAGE_PAYLOAD_SIZE.
+
+    Raw bodies are accumulated chunk by chunk so oversized uploads are rejected
+    without buffering the whole payload first.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_IMAGE_PAYLOAD_SIZE:
+        raise InvalidPayloadError(
+            f"Image payload too large: {content_length} bytes (max {MAX_IMAGE_PAYLOAD_SIZE} bytes)",
+            details={"max_bytes": MAX_IMAGE_PAYLOAD_SIZE},
+        )
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form(max_part_size=MAX_IMAGE_PAYLOAD_SIZE)
+        upload = form.get(MULTIPART_FRAME_FIELD)
+        if upload is None or isinstance(upload, str):
+            raise InvalidPayloadError(
+                f"Multipart upload must include a '{MULTIPART_FRAME_FIELD}' file field",
+                details={"field": MULTIPART_FRAME_FIELD},
+            )
+        return await upload.read()
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_IMAGE_PAYLOAD_SIZE:
+            raise InvalidPayloadError(
+                f"Image payload too large (max {MAX_IMAGE_PAYLOAD_SIZE} bytes)",
+                details={"max_bytes": MAX_IMAGE_PAYLOAD_SIZE},
+            )
+    return body
+
+
+@router.post("/analyze_frame", tags=["Monitoring Service"], summary="Analyze Webcam Frame")
+async def analyze_frame(data: FrameData, db=Depends(get_firestore_db)):
+    if not detection_engine.available:
+        return {"status": "Error", "message": "Face detection unavailable"}
+
+    decoded_bytes = _decode_base64_frame(data.image)
+    if decoded_bytes is None:
+        return {"status": "Error", "message": "Invalid base64 image data"}
+
+    return await _analyze_image_bytes(decoded_bytes, data.session_id, db, resolve_profile(data.profile))
+
+
+@router.post(
+    "/analyze_frame/{session_id}",
+    tags=["Monitoring Service"],
+    summary="Analyze Binary Webcam Frame",
+    description=(
+        "Accepts a raw JPEG/PNG body (e.g. application/octet-stream or image/jpeg) or a multipart "
+        f"upload with a '{MULTIPART_FRAME_FIELD}' file field. Returns the same verdict as /analyze_frame "
+        "without the base64/JSON overhead. The optional 'profile' query parameter overrides the "
+        "server's default detection profile."
+    ),
+)
+async def analyze_frame_binary(
+    session_id: str, request: Request, profile: str | None = None, db=Depends(get_firestore_db)
+):
+    if not detection_engine.available:
+        return {"status": "Error", "message": "Face detection unavailable"}
+
+    detection_profile = resolve_profile(profile)
+    body = await _read_frame_body(request)
+    return await _analyze_image_bytes(body, session_id, db, detection_profile)
+
+
+async def _detect_batch_frame(frame: FrameData) -> int | dict:
+    """Return the face count of one frame of a batch, or its error verdict."""
+    profile = resolve_profile(frame.profile)
+    buffer = _decode_base64_frame(frame.image)
+    if buffer is None:
+        return {"status": "Error", "message": "Invalid base64 image data", "profile": profile.name}
+
+    try:
+        result = await _detect_frame(buffer, frame.session_id, profile)
+    except SecureEvalError as e:
+        return {"status": "Error", "message": e.message, "profile": profile.name}
+    except Exception as e:
+        logger.error("Error analyzing frame for session %s: %s", frame.session_id, e, exc_info=True)
+        return {"status": "Error", "message": "Frame analysis failed", "profile": profile.name}
+
+    if result.face_count is None:
+        return {"status": "Error", "message": result.error or "Invalid image", "profile": profile.name}
+    return result.face_count
+
+
+async def _detect_batch(frames: list[FrameData]) -> list[int | dict]:
+    """
+    Detect faces in every frame of a batch through the detection pool.
+
+    Sessions run concurrently; frames of the same session run in order so its
+    tracking, duplicate and motion state advance exactly as for separate calls.
+    """
+    outcomes: list[int | dict] = [0] * len(frames)
+    by_session: dict[str, list[int]] = {}
+    for index, frame in enumerate(frames):
+        by_session.setdefault(frame.session_id, []).append(index)
+
+    async def detect_session(indices: list[int]):
+        for index in indices:
+            outcomes[index] = await _detect_batch_frame(frames[index])
+
+    await asyncio.gather(*(detect_session(indices) for indices in by_session.values()))
+    return outcomes
+
+
+def _apply_batch_policy(frames: list[FrameData], outcomes: list[int | dict], db) -> list[dict]:
+    """
+    Build a verdict per frame, committing every termination in a single Firestore batch.
+
+    Terminations are only published to the session state cache (and so to the status and
+    live feed streams) once the batch has committed; if it fails, their verdicts become errors.
+    """
+    batch = db.batch() if db else None
+    pending: dict[str, dict] = {}
+    verdicts = []
+    for frame, outcome in zip(frames, outcomes, strict=True):
+        if isinstance(outcome, dict):
+            verdict = outcome
+        else:
+            verdict = _apply_session_policy(frame.session_id, outcome, db, batch, pending)
+            verdict["profile"] = resolve_profile(frame.profile).name
+        verdicts.append({"session_id": frame.session_id, **verdict})
+
+    if batch is None or not pending:
+        return verdicts
+    try:
+        batch.commit()
+    except Exception as e:
+        logger.error("Error committing frame batch violations to Firestore: %s", e, exc_info=True)
+        for verdict in verdicts:
+            if verdict["session_id"] in pending and verdict["status"] == "Terminated":
+                verdict.pop("reason", None)
+                verdict.update(status="Error", message="Database error")
+        return verdicts
+
+    for session_id, termination_update in pending.items():
+        update_session_state(session_id, termination_update)
+        forget_frame_state(session_id)
+    return verdicts
+
+
+@router.post(
+    "/analyze_frames",
+    tags=["Monitoring Service"],
+    summary="Analyze a Batch of Webcam Frames",
+    description=(
+        f"Accepts up to {MAX_BATCH_FRAMES} {{session_id, image, profile}} frames (e.g. from a classroom "
+        "kiosk or proctor relay), runs detection for them concurrently on the detection pool, and "
+        "commits any resulting terminations in one Firestore batch. Returns one verdict per frame, "
+        "in request order, tagged with its session_id."
+    ),
+)
+async def analyze_frames(data: FrameBatch, db=Depends(get_firestore_db)):
+    if not detection_engine.available:
+        return {"status": "Error", "message": "Face detection unavailable"}
+
+    outcomes = await _detect_batch(data.frames)
+    verdicts = await run_in_threadpool(_apply_batch_policy, data.frames, outcomes, db)
+    return {"results": verdicts}
+
+
+@router.websocket("/ws/analyze_frame/{session_id}")
+async def analyze_frame_stream(
+    websocket: WebSocket, session_id: str, profile: str | None = None, db=Depends(get_firestore_db)
+):
+    """
+    Persistent per-session frame channel.
+
+    The client sends each webcam frame as a binary message (raw JPEG/PNG bytes) and
+    receives the same {status, face_count, reason} verdict as /analyze_frame. The
+    server closes the socket as soon as the session is terminated.
+    """
+    await websocket.accept()
+
+    if not detection_engine.available:
+        await websocket.send_json({"status": "Error", "message": "Face detection unavailable"})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    if profile is not None and profile not in DETECTION_PROFILES:
+        await websocket.send_json({"status": "Error", "message": f"Unknown detection profile '{profile}'"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    detection_profile = resolve_profile(profile)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            frame = message.get("bytes")
+            if frame is None:
+                await websocket.send_json({"status": "Error", "message": "Expected a binary frame"})
+                continue
+            if len(frame) > MAX_IMAGE_PAYLOAD_SIZE:
+                await websocket.send_json(
+                    {"status": "Error", "message": f"Image payload too large (max {MAX_IMAGE_PAYLOAD_SIZE} bytes)"}
+                )
+                continue
+
+            try:
+                verdict = await _analyze_image_bytes(frame, session_id, db, detection_profile)
+            except SecureEvalError as e:
+                verdict = {"status": "Error", "message": e.message}
+            await websocket.send_json(verdict)
+
+            if verdict.get("status") == "Terminated":
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Session terminated")
+                break
+    except WebSocketDisconnect:
+        logger.info("Frame stream for session %s disconnected", session_id)
+
+
+@router.get("/monitoring/stats", tags=["Monitoring Service"], summary="Frame Analysis Statistics")
+def get_monitoring_stats():
+    """Report detection pool load, cascade work saved by frame skipping, and buffered session writes."""
+    return {
+        "detection": {
+            "workers": detection_engine.workers,
+            "capacity": detection_engine.capacity,
+            "in_flight": detection_engine.in_flight,
+        },
+        "frame_dedup": frame_deduplicator.stats(),
+        "motion_gate": motion_gate.stats(),
+        "session_writes": session_write_buffer.stats(),
+        "presence": presence_table.stats(),
+    }
@@ -5,24 +5,58 @@ Handles exam session lifecycle: creation, retrieval, submission,
 termination, logging, timing, and messaging using typed domain exceptions.
 """
 
+import time
 from datetime import UTC, datetime
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from google.cloud import firestore
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
-from backend.app.dependencies import get_firestore_db
+from backend.app.aggregations import count_session_logs
+from backend.app.dependencies import get_async_firestore_db, get_firestore_db
 from backend.app.errors import (
     FirestoreUnavailableError,
     SecureEvalError,
     SessionNotFoundError,
 )
+from backend.app.exam_cache import get_exam_paper, get_exam_paper_async
+from backend.app.fanout import read_fanout
+from backend.app.frame_state import forget_frame_state
+from backend.app.live_feed import ACTIVE_STATUSES, LIVE_FEED_TOPIC, active_session_summary, active_sessions
 from backend.app.logging_config import get_logger
+from backend.app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from backend.app.presence import presence_table
+from backend.app.session_cache import (
+    TERMINAL_STATUSES,
+    get_session_state,
+    get_session_state_async,
+    invalidate_session_state,
+    update_session_state,
+)
+from backend.app.session_events import format_sse, session_events, session_status_view, stream_events
+from backend.app.trust_score import trust_penalty_update, violation_penalty, violation_severity
+from backend.app.write_buffer import FIRESTORE_BATCH_LIMIT, session_write_buffer
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+# Student documents fetched per get_all call when bulk scheduling sessions
+STUDENT_LOOKUP_CHUNK_SIZE = 300
+
+# Student fields copied onto bulk-created sessions
+STUDENT_PROFILE_FIELDS = ["full_name", "course", "class_name"]
+
+# Log entries per GET /sessions/{id}/logs page when paging by cursor without a limit, and the largest allowed
+LOGS_DEFAULT_PAGE_SIZE = 100
+LOGS_MAX_PAGE_SIZE = 500
+
+# Question timing entries accepted per POST /sessions/{id}/log-timings request
+MAX_TIMING_BATCH = 500
+
 
 # --- Pydantic Models ---
 
@@ -56,8 +90,22 @@ class LogRequest(BaseModel):
 
 
 class QuestionTiming(BaseModel):
-    index: int
-    duration_ms: int
+    index: int = Field(ge=0)
+    duration_ms: int = Field(ge=0)
+
+
+class QuestionTimingBatch(BaseModel):
+    timings: list[QuestionTiming]
+
+    @field_validator("timings")
+    @classmethod
+    def validate_batch_size(cls, v):
+        """Validate that the batch holds between one and MAX_TIMING_BATCH entries."""
+        if not v:
+            raise ValueError("Timing batch must contain at least one entry")
+        if len(v) > MAX_TIMING_BATCH:
+            raise ValueError(f"Timing batch too large: {len(v)} entries (max {MAX_TIMING_BATCH})")
+        return v
 
 
 class MessageRequest(BaseModel):
@@ -104,6 +152,7 @@ def create_session(data: CreateSessionRequest, db=Depends(get_firestore_db)):
 
         logger.info("Creating session for student %s with duration %d mins", data.studentId, data.duration_minutes)
         new_session_ref.set(session_data)
+        active_sessions.track(new_session_ref.id, session_data)
 
         return {"session_id": new_session_ref.id}
     except SecureEvalError:
@@ -113,22 +162,44 @@ def create_session(data: CreateSessionRequest, db=Depends(get_firestore_db)):
         raise HTTPException(status_code=500, detail="Failed to create session")
 
 
+def _fetch_student_profiles(db, student_ids: list[str]) -> dict[str, dict]:
+    """
+    Look up student profiles with batched get_all reads.
+
+    Students are read from `users` first and only the misses from `students`, in
+    chunks of STUDENT_LOOKUP_CHUNK_SIZE, fetching just the fields sessions copy.
+    """
+    profiles: dict[str, dict] = {}
+    missing = list(dict.fromkeys(student_ids))
+    for collection in ("users", "students"):
+        for start in range(0, len(missing), STUDENT_LOOKUP_CHUNK_SIZE):
+            refs = [
+                db.collection(collection).document(sid) for sid in missing[start : start + STUDENT_LOOKUP_CHUNK_SIZE]
+            ]
+            for snapshot in db.get_all(refs, field_paths=STUDENT_PROFILE_FIELDS):
+                if snapshot.exists:
+                    profiles[snapshot.id] = snapshot.to_dict()
+        missing = [sid for sid in missing if sid not in profiles]
+    return profiles
+
+
 @router.post("/sessions/bulk", tags=["Exam Session"])
 def bulk_create_sessions(data: BulkCreateSessionRequest, db=Depends(get_firestore_db)):
     if not db:
         raise FirestoreUnavailableError("bulk_create_sessions")
 
     try:
+        started = time.perf_counter()
+        profiles = _fetch_student_profiles(db, data.studentIds)
+        looked_up = time.perf_counter()
+
         results = []
+        created = {}
         batch = db.batch()
+        pending_writes = 0
 
         for student_id in data.studentIds:
-            # Fetch student details
-            student_doc = db.collection("users").document(student_id).get()
-            if not student_doc.exists:
-                student_doc = db.collection("students").document(student_id).get()
-
-            student_data = student_doc.to_dict() if student_doc.exists else {}
+            student_data = profiles.get(student_id, {})
             student_name = student_data.get("full_name", "Unknown")
             course = student_data.get("course", "")
             class_name = student_data.get("class_name", "")
@@ -157,11 +228,29 @@ def bulk_create_sessions(data: BulkCreateSessionRequest, db=Depends(get_firestor
             }
 
             batch.set(new_session_ref, session_data)
+            pending_writes += 1
+            created[new_session_ref.id] = session_data
             results.append({"session_id": new_session_ref.id, "student_id": student_id, "student_name": student_name})
 
-        batch.commit()
-        logger.info("Bulk created %d sessions for exam %s", len(results), data.examId)
-        return {"sessions": results}
+            if pending_writes == FIRESTORE_BATCH_LIMIT:
+                batch.commit()
+                batch = db.batch()
+                pending_writes = 0
+
+        if pending_writes:
+            batch.commit()
+        finished = time.perf_counter()
+
+        for session_id, session_data in created.items():
+            active_sessions.track(session_id, session_data)
+
+        timing = {
+            "student_lookup_ms": round((looked_up - started) * 1000, 2),
+            "write_ms": round((finished - looked_up) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2),
+        }
+        logger.info("Bulk created %d sessions for exam %s in %.2f ms", len(results), data.examId, timing["total_ms"])
+        return {"sessions": results, "timing": timing}
     except SecureEvalError:
         raise
     except Exception as e:
@@ -170,13 +259,13 @@ def bulk_create_sessions(data: BulkCreateSessionRequest, db=Depends(get_firestor
 
 
 @router.get("/sessions/{session_id}", tags=["Exam Session"])
-def get_session(session_id: str, db=Depends(get_firestore_db)):
-    if not db:
+async def get_session(session_id: str, adb=Depends(get_async_firestore_db)):
+    if not adb:
         raise FirestoreUnavailableError("get_session")
 
     try:
-        session_ref = db.collection("sessions").document(session_id)
-        doc = session_ref.get()
+        session_ref = adb.collection("sessions").document(session_id)
+        doc = await session_ref.get()
 
         if not doc.exists:
             raise SessionNotFoundError(session_id)
@@ -193,15 +282,13 @@ def get_session(session_id: str, db=Depends(get_firestore_db)):
                 "termination_reason": data.get("termination_reason"),
             }
 
-        # Fetch questions from Firestore
+        # Fetch questions from the exam paper cache
         questions = []
         exam_id = data.get("exam_id")
         exam_metadata = {}
         if exam_id:
-            paper_ref = db.collection("exams").document(exam_id)
-            paper_doc = paper_ref.get()
-            if paper_doc.exists:
-                paper_data = paper_doc.to_dict()
+            paper_data = await get_exam_paper_async(adb, exam_id)
+            if paper_data is not None:
                 questions = paper_data.get("questions", [])
                 exam_metadata = {
                     "duration": paper_data.get("duration"),
@@ -240,25 +327,10 @@ def get_active_sessions(db=Depends(get_firestore_db)):
 
     try:
         sessions_ref = db.collection("sessions")
-        query = sessions_ref.where("status", "in", ["Active", "Flagged"])
+        query = sessions_ref.where("status", "in", list(ACTIVE_STATUSES))
         docs = query.stream()
 
-        sessions_data = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-
-            sessions_data.append(
-                {
-                    "id": data["id"],
-                    "student_name": data.get("student_name"),
-                    "studentId": data.get("studentId"),
-                    "exam_title": data.get("exam_title"),
-                    "status": data.get("status"),
-                    "trust_score": data.get("trust_score"),
-                    "latest_log": data.get("latest_log"),
-                }
-            )
+        sessions_data = [active_session_summary(doc.id, doc.to_dict()) for doc in docs]
 
         return sessions_data
     except SecureEvalError:
@@ -268,19 +340,96 @@ def get_active_sessions(db=Depends(get_firestore_db)):
         raise HTTPException(status_code=500, detail="Failed to fetch sessions")
 
 
+@router.get(
+    "/live_feed",
+    tags=["Exam Session"],
+    summary="Live Proctor Feed",
+    description=(
+        "Server-Sent Events stream for the proctor dashboard. Sends a 'snapshot' event with every "
+        "Active/Flagged session (same rows as GET /sessions), then an 'upsert' event with the full "
+        "row whenever a session is created or its status, trust score or latest log changes, and a "
+        "'remove' event when it leaves the active set. Idle streams receive keep-alive comments."
+    ),
+)
+async def stream_live_feed(db=Depends(get_firestore_db)):
+    if not db:
+        raise FirestoreUnavailableError("stream_live_feed")
+
+    # Subscribe before taking the snapshot so no delta can slip in between
+    queue = active_sessions.events.subscribe(LIVE_FEED_TOPIC)
+    try:
+        await run_in_threadpool(active_sessions.ensure_loaded, db)
+    except Exception as e:
+        active_sessions.events.unsubscribe(LIVE_FEED_TOPIC, queue)
+        logger.error("Error loading live feed index: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to load live feed") from e
+
+    async def event_stream():
+        try:
+            yield format_sse("snapshot", {"sessions": active_sessions.snapshot()})
+            async for delta in stream_events(queue):
+                if delta is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(delta["type"], delta.get("session") or {"id": delta["id"]})
+        finally:
+            active_sessions.events.unsubscribe(LIVE_FEED_TOPIC, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/sessions/{session_id}/logs", tags=["Exam Session"])
-def get_session_logs(session_id: str, db=Depends(get_firestore_db)):
+def get_session_logs(
+    session_id: str,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=LOGS_MAX_PAGE_SIZE),
+    start_after: str | None = None,
+    since: str | None = None,
+    severity: list[str] | None = Query(None),
+    db=Depends(get_firestore_db),
+):
+    """
+    A session's violation logs, newest first.
+
+    Without `limit` or `start_after` every matching entry is returned. With `limit`, one
+    page is returned; pass the X-Next-Cursor response header back as `start_after` for
+    the next (older) page (the header is absent on the last page). To poll incrementally, pass the newest timestamp already seen as `since`:
+    only strictly newer entries are returned. `severity` may be repeated. Severity
+    filters need a composite index on the logs collection (severity, timestamp).
+    """
     if not db:
         raise FirestoreUnavailableError("get_session_logs")
 
     try:
-        logs_ref = db.collection("sessions").document(session_id).collection("logs")
-        query = logs_ref.order_by("timestamp", direction=firestore.Query.DESCENDING)
-        docs = query.stream()
-
-        logs = []
-        for doc in docs:
-            logs.append(doc.to_dict())
+        session_write_buffer.flush(db, session_id)
+        query = db.collection("sessions").document(session_id).collection("logs")
+        if severity:
+            query = (
+                query.where("severity", "in", severity)
+                if len(severity) > 1
+                else query.where("severity", "==", severity[0])
+            )
+        if since:
+            query = query.where("timestamp", ">", since)
+        query = query.order_by("timestamp", direction=firestore.Query.DESCENDING).order_by(
+            "__name__", direction=firestore.Query.DESCENDING
+        )
+        if limit is None and start_after is None:
+            return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
+        if start_after:
+            query = query.start_after(decode_cursor(start_after, "timestamp"))
+        page_size = limit or LOGS_DEFAULT_PAGE_SIZE
+        # One extra entry tells whether an older page follows.
+        docs = list(query.limit(page_size + 1).stream())
+        logs = [{"id": doc.id, **doc.to_dict()} for doc in docs[:page_size]]
+        if len(docs) > page_size:
+            last = logs[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor("timestamp", last["timestamp"], last["id"])
 
         return logs
     except SecureEvalError:
@@ -291,26 +440,17 @@ def get_session_logs(session_id: str, db=Depends(get_firestore_db)):
 
 
 @router.get("/sessions/{session_id}/status", tags=["Exam Session"])
-def get_session_status(session_id: str, db=Depends(get_firestore_db)):
-    if not db:
+async def get_session_status(session_id: str, adb=Depends(get_async_firestore_db)):
+    if not adb:
         raise FirestoreUnavailableError("get_session_status")
 
     try:
-        session_ref = db.collection("sessions").document(session_id)
-        doc = session_ref.get()
+        data = await get_session_state_async(adb, session_id)
 
-        if not doc.exists:
+        if data is None:
             raise SessionNotFoundError(session_id)
 
-        data = doc.to_dict()
-        return {
-            "status": data.get("status"),
-            "trust_score": data.get("trust_score"),
-            "score": data.get("score"),
-            "total_questions": data.get("total_questions"),
-            "message": data.get("current_message"),
-            "is_message_read": data.get("is_message_read", False),
-        }
+        return session_status_view(data)
     except SecureEvalError:
         raise
     except HTTPException:
@@ -320,6 +460,55 @@ def get_session_status(session_id: str, db=Depends(get_firestore_db)):
         raise HTTPException(status_code=500, detail="Failed to fetch session status")
 
 
+@router.get(
+    "/sessions/{session_id}/events",
+    tags=["Exam Session"],
+    summary="Session Status Stream",
+    description=(
+        "Server-Sent Events stream of the session's status. Sends a 'status' event with the same "
+        "fields as /sessions/{session_id}/status on connect and again whenever the status, trust "
+        "score or proctor message changes, with keep-alive comments while idle. The stream ends "
+        "after the session is completed or terminated."
+    ),
+)
+async def stream_session_status(session_id: str, db=Depends(get_firestore_db)):
+    if not db:
+        raise FirestoreUnavailableError("stream_session_status")
+
+    # Subscribe before reading the snapshot so no change can slip in between
+    queue = session_events.subscribe(session_id)
+    try:
+        state = await run_in_threadpool(get_session_state, db, session_id)
+    except Exception:
+        session_events.unsubscribe(session_id, queue)
+        raise
+    if state is None:
+        session_events.unsubscribe(session_id, queue)
+        raise SessionNotFoundError(session_id)
+
+    async def event_stream():
+        try:
+            yield format_sse("status", session_status_view(state))
+            if state.get("status") in TERMINAL_STATUSES:
+                return
+            async for change in stream_events(queue):
+                if change is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                state.update(change)
+                yield format_sse("status", session_status_view(state))
+                if state.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            session_events.unsubscribe(session_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Session Actions ---
 
 
@@ -339,14 +528,19 @@ def submit_exam(session_id: str, submission: SubmitExamRequest, db=Depends(get_f
         if data.get("status") == "Completed":
             return {"message": "Already submitted"}
 
+        # Buffered logs count towards the cheat score and buffered updates must not land after completion
+        session_write_buffer.flush(db, session_id)
+
+        # Count suspicious logs server-side while the exam paper is read and graded
+        log_count = read_fanout.submit(count_session_logs, db, session_id)
+
         # Fetch questions for grading
         questions = []
         exam_id = data.get("exam_id")
         if exam_id:
-            paper_ref = db.collection("exams").document(exam_id)
-            paper_doc = paper_ref.get()
-            if paper_doc.exists:
-                questions = paper_doc.to_dict().get("questions", [])
+            paper_data = get_exam_paper(db, exam_id)
+            if paper_data is not None:
+                questions = paper_data.get("questions", [])
 
         # Use AI Service for Evaluation
         from backend.app.ai_service import evaluate_exam_submission
@@ -357,29 +551,27 @@ def submit_exam(session_id: str, submission: SubmitExamRequest, db=Depends(get_f
         total = evaluation["total_questions"]
         percentage = (score / total * 100) if total > 0 else 0
 
-        # Count number of suspicious logs
-        logs_ref = session_ref.collection("logs")
-        logs_stream = logs_ref.stream()
-        cheat_score = len(list(logs_stream))
+        cheat_score = log_count.result()
 
         # Calculate questions attempted
         questions_attempted = len([v for v in submission.answers.values() if v is not None and v != ""])
 
         # Update Firestore
-        session_ref.update(
-            {
-                "status": "Completed",
-                "score": score,
-                "total": total,
-                "total_questions": total,
-                "questions_attempted": questions_attempted,
-                "cheat_score": cheat_score,
-                "percentage": round(percentage, 2),
-                "answers": submission.answers,
-                "feedback": evaluation["feedback"],
-                "finished_at": datetime.now(UTC).isoformat(),
-            }
-        )
+        completion_update = {
+            "status": "Completed",
+            "score": score,
+            "total": total,
+            "total_questions": total,
+            "questions_attempted": questions_attempted,
+            "cheat_score": cheat_score,
+            "percentage": round(percentage, 2),
+            "answers": submission.answers,
+            "feedback": evaluation["feedback"],
+            "finished_at": datetime.now(UTC).isoformat(),
+        }
+        session_ref.update(completion_update)
+        update_session_state(session_id, completion_update)
+        forget_frame_state(session_id)
 
         logger.info("Exam submitted for session %s: score=%s/%s", session_id, score, total)
 
@@ -411,14 +603,17 @@ def terminate_exam(session_id: str, reason: str = "Violation of exam protocols",
         if not session_ref.get().exists:
             raise SessionNotFoundError(session_id)
 
-        session_ref.update(
-            {
-                "status": "Terminated",
-                "termination_reason": reason,
-                "trust_score": 0,
-                "finished_at": datetime.now(UTC).isoformat(),
-            }
-        )
+        # Buffered trust score updates must not land after the termination
+        session_write_buffer.flush(db, session_id)
+        termination_update = {
+            "status": "Terminated",
+            "termination_reason": reason,
+            "trust_score": 0,
+            "finished_at": datetime.now(UTC).isoformat(),
+        }
+        session_ref.update(termination_update)
+        update_session_state(session_id, termination_update)
+        forget_frame_state(session_id)
 
         logger.info("Session %s terminated: %s", session_id, reason)
         return {"message": "Exam terminated successfully"}
@@ -439,6 +634,11 @@ def delete_session(session_id: str, db=Depends(get_firestore_db)):
 
     try:
         db.collection("sessions").document(session_id).delete()
+        session_write_buffer.discard(session_id)
+        invalidate_session_state(session_id)
+        active_sessions.remove(session_id)
+        presence_table.forget(session_id)
+        forget_frame_state(session_id)
         logger.info("Session %s deleted", session_id)
         return {"message": "Session deleted successfully"}
     except SecureEvalError:
@@ -463,6 +663,7 @@ def generate_session_report(session_id: str, db=Depends(get_firestore_db)):
         data = session_doc.to_dict()
 
         # Fetch detailed logs
+        session_write_buffer.flush(db, session_id)
         logs_ref = session_ref.collection("logs").order_by("timestamp")
         logs = [d.to_dict() for d in logs_ref.stream()]
 
@@ -489,27 +690,28 @@ def generate_session_report(session_id: str, db=Depends(get_firestore_db)):
 
 
 @router.post("/sessions/{session_id}/log", tags=["Exam Session"])
-def log_violation(session_id: str, log: LogRequest, db=Depends(get_firestore_db)):
-    if not db:
+async def log_violation(
+    session_id: str, log: LogRequest, db=Depends(get_firestore_db), adb=Depends(get_async_firestore_db)
+):
+    if not db or not adb:
         raise FirestoreUnavailableError("log_violation")
 
     try:
-        session_ref = db.collection("sessions").document(session_id)
+        state = await get_session_state_async(adb, session_id)
+        penalty = violation_penalty(log.message)
 
-        penalty = 10
-        if "Locked" in log.message:
-            penalty = 30
-        if "Terminated" in log.message:
-            penalty = 100
-
-        session_ref.collection("logs").add(
-            {"message": log.message, "timestamp": log.timestamp, "severity": "High" if penalty >= 30 else "Medium"}
+        await session_write_buffer.add_log_async(
+            db,
+            session_id,
+            {"message": log.message, "timestamp": log.timestamp, "severity": violation_severity(penalty)},
         )
 
-        doc = session_ref.get()
-        if doc.exists:
-            new_trust = max(0, doc.to_dict().get("trust_score", 100) - penalty)
-            session_ref.update({"latest_log": log.message, "trust_score": new_trust})
+        if state is not None:
+            trust_value, new_trust = trust_penalty_update(state.get("trust_score"), penalty)
+            await session_write_buffer.update_async(
+                db, session_id, {"latest_log": log.message, "trust_score": trust_value}
+            )
+            update_session_state(session_id, {"latest_log": log.message, "trust_score": new_trust})
 
         return {"status": "Logged"}
     except SecureEvalError:
@@ -519,17 +721,59 @@ def log_violation(session_id: str, log: LogRequest, db=Depends(get_firestore_db)
         raise HTTPException(status_code=500, detail="Failed to log violation")
 
 
+def _timing_update(timings: list[QuestionTiming]) -> dict[str, Any]:
+    """
+    Fold timing entries into one session update.
+
+    Time spent on a question is added to its running total in performance.{index}
+    and each entry counts as a visit in question_visits.{index}, so returning to a
+    question accumulates instead of overwriting the previous visit.
+    """
+    totals: dict[int, int] = {}
+    visits: dict[int, int] = {}
+    for timing in timings:
+        totals[timing.index] = totals.get(timing.index, 0) + timing.duration_ms
+        visits[timing.index] = visits.get(timing.index, 0) + 1
+
+    update: dict[str, Any] = {}
+    for index, total in totals.items():
+        update[f"performance.{index}"] = firestore.Increment(total)
+        update[f"question_visits.{index}"] = firestore.Increment(visits[index])
+    return update
+
+
+def _record_timings(db, session_id: str, timings: list[QuestionTiming]):
+    if get_session_state(db, session_id) is None:
+        raise SessionNotFoundError(session_id)
+    session_write_buffer.update(db, session_id, _timing_update(timings))
+
+
 @router.post("/sessions/{session_id}/log-timing", tags=["Exam Session"])
 def log_question_timing(session_id: str, timing: QuestionTiming, db=Depends(get_firestore_db)):
+    """Add one question visit to the session's per-question time totals."""
     try:
-        session_ref = db.collection("sessions").document(session_id)
-        session_ref.update({f"performance.{timing.index}": timing.duration_ms})
+        _record_timings(db, session_id, [timing])
         return {"status": "saved"}
+    except SecureEvalError:
+        raise
     except Exception as e:
         logger.error("Error logging timing for session %s: %s", session_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to log timing")
 
 
+@router.post("/sessions/{session_id}/log-timings", tags=["Exam Session"])
+def log_question_timings(session_id: str, batch: QuestionTimingBatch, db=Depends(get_firestore_db)):
+    """Add a batch of question visits to the session's per-question time totals in a single update."""
+    try:
+        _record_timings(db, session_id, batch.timings)
+        return {"status": "saved", "questions": len({timing.index for timing in batch.timings})}
+    except SecureEvalError:
+        raise
+    except Exception as e:
+        logger.error("Error logging timings for session %s: %s", session_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to log timings")
+
+
 # --- Messaging ---
 
 
@@ -546,6 +790,7 @@ def send_message_to_student(session_id: str, request: MessageRequest, db=Depends
             raise SessionNotFoundError(session_id)
 
         session_ref.update({"current_message": request.message, "is_message_read": False})
+        update_session_state(session_id, {"current_message": request.message, "is_message_read": False})
 
         logger.info("Message sent to student in session %s", session_id)
         return {"status": "Message Sent"}
@@ -571,6 +816,7 @@ def mark_message_as_read(session_id: str, db=Depends(get_firestore_db)):
             raise SessionNotFoundError(session_id)
 
         session_ref.update({"is_message_read": True})
+        update_session_state(session_id, {"is_message_read": True})
 
         return {"status": "Marked as read"}
     except SecureEvalError:
@@ -583,40 +829,35 @@ def mark_message_as_read(session_id: str, db=Depends(get_firestore_db)):
 
 
 @router.post("/sessions/{session_id}/heartbeat", tags=["Exam Session"])
-def record_heartbeat(session_id: str, heartbeat: HeartbeatRequest, db=Depends(get_firestore_db)):
-    """Records client heartbeat to verify tab presence and network connectivity."""
-    if not db:
+async def record_heartbeat(
+    session_id: str, heartbeat: HeartbeatRequest, db=Depends(get_firestore_db), adb=Depends(get_async_firestore_db)
+):
+    """
+    Records client heartbeat to verify tab presence and network connectivity.
+
+    Heartbeats are kept in the presence table; the session document is only written
+    when focus changes or the per-session write interval has passed.
+    """
+    if not db or not adb:
         raise FirestoreUnavailableError("record_heartbeat")
 
     try:
-        session_ref = db.collection("sessions").document(session_id)
-        doc = session_ref.get()
-
-        if not doc.exists:
+        state = await get_session_state_async(adb, session_id)
+        if state is None:
             raise SessionNotFoundError(session_id)
 
         server_time = datetime.now(UTC).timestamp()
         drift = round(server_time - heartbeat.client_timestamp, 3) if heartbeat.client_timestamp else None
 
-        update_payload = {
-            "last_heartbeat": datetime.now(UTC).isoformat(),
-            "tab_focused": heartbeat.tab_focused,
-        }
-        if drift is not None:
-            update_payload["clock_drift_seconds"] = drift
-        if heartbeat.battery_level is not None:
-            update_payload["battery_level"] = heartbeat.battery_level
-
-        session_ref.update(update_payload)
-
-        if not heartbeat.tab_focused:
-            session_ref.collection("logs").add(
-                {
-                    "message": "Tab lost focus (unfocused window detected)",
-                    "timestamp": datetime.now(UTC).isoformat(),
-                    "severity": "Medium",
-                }
-            )
+        if state.get("status") in TERMINAL_STATUSES:
+            # The exam is over; late heartbeats are acknowledged but no longer tracked.
+            presence_table.forget(session_id)
+        else:
+            outcome = presence_table.record(db, session_id, heartbeat.tab_focused, drift, heartbeat.battery_level)
+            if outcome.fields:
+                await session_write_buffer.update_async(db, session_id, outcome.fields)
+            for entry in outcome.logs:
+                await session_write_buffer.add_log_async(db, session_id, entry)
 
         return {
             "status": "ok",
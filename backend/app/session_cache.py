@@ -0,0 +1,103 @@
+"""
+Cached session-state lookups.
+
+Keeps a short-lived, in-process copy of the session fields that hot endpoints
+check on every call (status, trust score, proctor message), so frame analysis,
+violation logging, heartbeats and status polling do not each cost a Firestore read.
+Routes that change those fields write through or invalidate the cached entry, and
+write-throughs are published to session status streams.
+
+Configuration (environment variables):
+    SESSION_CACHE_TTL_SECONDS: Lifetime of an Active session entry (default: 5).
+    SESSION_CACHE_TERMINAL_TTL_SECONDS: Lifetime of a Completed/Terminated entry (default: 300).
+"""
+
+import os
+from typing import Any
+
+from backend.app.cache import TTLCache
+from backend.app.live_feed import active_sessions
+from backend.app.session_events import session_events
+
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "5"))
+SESSION_CACHE_TERMINAL_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TERMINAL_TTL_SECONDS", "300"))
+
+# Session fields mirrored in the cache
+SESSION_STATE_FIELDS = (
+    "status",
+    "trust_score",
+    "termination_reason",
+    "score",
+    "total_questions",
+    "current_message",
+    "is_message_read",
+)
+
+TERMINAL_STATUSES = ("Completed", "Terminated")
+
+session_state_cache = TTLCache(ttl_seconds=SESSION_CACHE_TTL_SECONDS)
+
+
+def _ttl_for(state: dict[str, Any]) -> float:
+    if state.get("status") in TERMINAL_STATUSES:
+        return SESSION_CACHE_TERMINAL_TTL_SECONDS
+    return SESSION_CACHE_TTL_SECONDS
+
+
+def cache_session_state(session_id: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Cache the state fields of a freshly read session document and return them."""
+    state = {field: data.get(field) for field in SESSION_STATE_FIELDS}
+    session_state_cache.set(session_id, state, ttl_seconds=_ttl_for(state))
+    return dict(state)
+
+
+def get_session_state(db, session_id: str) -> dict[str, Any] | None:
+    """
+    Return the cached state of a session, reading Firestore on a miss.
+
+    Returns:
+        A copy of the session state fields, or None if the session does not exist.
+    """
+    cached = session_state_cache.get(session_id)
+    if cached is not None:
+        return dict(cached)
+
+    doc = db.collection("sessions").document(session_id).get()
+    if not doc.exists:
+        return None
+    return cache_session_state(session_id, doc.to_dict())
+
+
+async def get_session_state_async(db, session_id: str) -> dict[str, Any] | None:
+    """Like get_session_state, reading Firestore on a miss through an AsyncClient without blocking the event loop."""
+    cached = session_state_cache.get(session_id)
+    if cached is not None:
+        return dict(cached)
+
+    doc = await db.collection("sessions").document(session_id).get()
+    if not doc.exists:
+        return None
+    return cache_session_state(session_id, doc.to_dict())
+
+
+def update_session_state(session_id: str, fields: dict[str, Any]):
+    """
+    Write changed fields through to the cached entry and publish them to status subscribers.
+
+    The cache is only updated if the session is already cached; subscribers receive the
+    changed state fields either way. The live proctor feed index is updated too.
+    """
+    active_sessions.apply(session_id, fields)
+    changed = {k: v for k, v in fields.items() if k in SESSION_STATE_FIELDS}
+    if not changed:
+        return
+    cached = session_state_cache.get(session_id)
+    if cached is not None:
+        state = {**cached, **changed}
+        session_state_cache.set(session_id, state, ttl_seconds=_ttl_for(state))
+    session_events.publish(session_id, changed)
+
+
+def invalidate_session_state(session_id: str):
+    """Forget a session's cached state so the next lookup re-reads Firestore."""
+    session_state_cache.invalidate(session_id)
@@ -0,0 +1,111 @@
+"""
+In-process pub/sub for session change events.
+
+Routes publish session changes (status, trust score, proctor messages) to a topic;
+streaming endpoints subscribe to it and push each event to connected clients, so
+candidates and proctors no longer have to poll. Publishing is thread-safe because
+most session routes run on the request threadpool while subscribers live on the
+event loop.
+
+Configuration (environment variables):
+    SESSION_EVENTS_KEEPALIVE_SECONDS: Idle time before a stream sends a keep-alive comment (default: 15).
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections.abc import AsyncIterator
+from typing import Any
+
+from backend.app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("SESSION_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Events a slow subscriber may fall behind by before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _deliver(queue: asyncio.Queue, event: dict[str, Any]):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class EventBroker:
+    """Topic-based fan-out of events to asyncio subscriber queues."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        """Register a queue on the running event loop that receives every event published to the topic."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue):
+        """Stop delivering events for the topic to a queue."""
+        with self._lock:
+            subscribers = self._subscribers.get(topic, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(topic, None)
+
+    def publish(self, topic: str, event: dict[str, Any]):
+        """Deliver an event to every subscriber of the topic. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will never unsubscribe itself.
+                self.unsubscribe(topic, queue)
+
+    def subscriber_count(self, topic: str | None = None) -> int:
+        """Number of subscriptions to a topic, or across all topics."""
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def clear(self):
+        """Drop all subscriptions."""
+        with self._lock:
+            self._subscribers.clear()
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_events(
+    queue: asyncio.Queue, keepalive_seconds: float = SESSION_EVENTS_KEEPALIVE_SECONDS
+) -> AsyncIterator[dict[str, Any] | None]:
+    """Yield events from a subscriber queue, or None after each idle keep-alive interval."""
+    while True:
+        try:
+            yield await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+        except TimeoutError:
+            yield None
+
+
+def session_status_view(state: dict[str, Any]) -> dict[str, Any]:
+    """Client-facing status fields of a cached session state."""
+    return {
+        "status": state.get("status"),
+        "trust_score": state.get("trust_score"),
+        "score": state.get("score"),
+        "total_questions": state.get("total_questions"),
+        "message": state.get("current_message"),
+        "is_message_read": state.get("is_message_read", False),
+    }
+
+
+session_events = EventBroker()
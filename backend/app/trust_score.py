@@ -0,0 +1,87 @@
+"""
+Atomic trust-score penalties.
+
+Violations lower a session's trust score with a server-side Firestore Increment
+instead of a read-modify-write, so concurrent violations from several tabs or
+devices are never lost. Increments cannot clamp, so a penalty that would take the
+expected score to zero or below is written as an absolute 0 instead.
+
+The expected score comes from the session state cache and can be stale: two
+violations that both see a score of 15 each write Increment(-10), leaving -5. Once a
+penalty Increment has been committed, clamp_trust_score reconciles the stored score
+in a transaction, raising anything below zero back to 0.
+"""
+
+from typing import Any
+
+from google.cloud import firestore
+
+INITIAL_TRUST_SCORE = 100
+
+# Trust penalties by violation severity
+PENALTY_MEDIUM = 10
+PENALTY_HIGH = 30
+PENALTY_TERMINATION = 100
+
+# Severity of informational log entries, which carry no penalty and are not counted as violations
+SEVERITY_INFO = "Info"
+
+
+def violation_penalty(message: str) -> int:
+    """Return the trust penalty for a client-reported violation message."""
+    if "Terminated" in message:
+        return PENALTY_TERMINATION
+    if "Locked" in message:
+        return PENALTY_HIGH
+    return PENALTY_MEDIUM
+
+
+def violation_severity(penalty: int) -> str:
+    """Map a trust penalty to the severity stored on its log entry."""
+    return "High" if penalty >= PENALTY_HIGH else "Medium"
+
+
+def is_trust_penalty(fields: dict[str, Any]) -> bool:
+    """Whether a session update lowers trust_score with an Increment that may need clamping."""
+    value = fields.get("trust_score")
+    return isinstance(value, firestore.Increment) and value.value < 0
+
+
+@firestore.transactional
+def _clamp_in_transaction(transaction, session_ref) -> bool:
+    snapshot = session_ref.get(transaction=transaction)
+    score = snapshot.to_dict().get("trust_score") if snapshot.exists else None
+    if isinstance(score, int | float) and score < 0:
+        transaction.update(session_ref, {"trust_score": 0})
+        return True
+    return False
+
+
+def clamp_trust_score(db, session_id: str) -> bool:
+    """
+    Raise a session's stored trust_score back to 0 if penalty Increments took it below zero.
+
+    Returns:
+        Whether the score had to be clamped.
+    """
+    session_ref = db.collection("sessions").document(session_id)
+    return _clamp_in_transaction(db.transaction(), session_ref)
+
+
+def trust_penalty_update(current: int | None, penalty: int) -> tuple[Any, int]:
+    """
+    Build the trust_score write for a penalty.
+
+    Args:
+        current: The session's last known trust score (None for a new session).
+        penalty: Points to deduct.
+
+    Returns:
+        The value to write to trust_score (an Increment, or 0 once the score bottoms
+        out) and the expected score after the write.
+    """
+    current = INITIAL_TRUST_SCORE if current is None else max(0, current)
+    expected = max(0, current - penalty)
+    if expected == 0:
+        return 0, 0
+    return firestore.Increment(-penalty), expected
@@ -0,0 +1,365 @@
+"""
+Write-behind buffer for high-frequency session writes.
+
+Violation logs and heartbeats each cost one or two Firestore writes per event. The
+buffer accumulates log entries and session field updates per session and commits
+them with db.batch() every FLUSH_INTERVAL seconds, or as soon as MAX_PENDING writes
+are waiting. Routes that read logs or change a session's status flush that session
+synchronously first, so buffered writes never land after (or hide from) them; such a
+flush waits for a background commit of the same session that is already in flight.
+
+Writes that fail with a transient error are put back in the queue and retried by
+later flushes, up to SESSION_WRITE_MAX_RETRIES times. Only writes for a session that
+no longer exists (NotFound) are dropped straight away.
+
+Configuration (environment variables):
+    SESSION_WRITE_FLUSH_INTERVAL_SECONDS: Flush period; 0 writes through immediately (default: 1).
+    SESSION_WRITE_MAX_PENDING: Buffered writes that trigger an early flush (default: 200).
+    SESSION_WRITE_MAX_RETRIES: Failed commits of a session's writes retried before they are dropped (default: 3).
+"""
+
+import asyncio
+import contextlib
+import os
+import threading
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+from backend.app.logging_config import get_logger
+from backend.app.trust_score import clamp_trust_score, is_trust_penalty
+
+logger = get_logger(__name__)
+
+SESSION_WRITE_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_WRITE_FLUSH_INTERVAL_SECONDS", "1"))
+SESSION_WRITE_MAX_PENDING = int(os.getenv("SESSION_WRITE_MAX_PENDING", "200"))
+SESSION_WRITE_MAX_RETRIES = int(os.getenv("SESSION_WRITE_MAX_RETRIES", "3"))
+
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def _merge_field(pending: Any, value: Any) -> Any:
+    """Combine a queued field value with a newer one so the flushed write has the same effect."""
+    if isinstance(value, firestore.Increment):
+        if isinstance(pending, firestore.Increment):
+            return firestore.Increment(pending.value + value.value)
+        if isinstance(pending, int | float):
+            # A penalty folded into an absolute score is floored here; the post-commit clamp only covers Increments
+            return max(0, pending + value.value) if value.value < 0 else pending + value.value
+    return value
+
+
+class SessionWriteBuffer:
+    """Per-session queue of pending log entries and field updates."""
+
+    def __init__(
+        self,
+        flush_interval: float = SESSION_WRITE_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = SESSION_WRITE_MAX_PENDING,
+        max_retries: int = SESSION_WRITE_MAX_RETRIES,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.max_retries = max(0, max_retries)
+        self.flushed_writes = 0
+        self.commits = 0
+        self.retried_writes = 0
+        self.dropped_writes = 0
+        self._logs: dict[str, list[dict[str, Any]]] = {}
+        self._updates: dict[str, dict[str, Any]] = {}
+        self._pending = 0
+        # Sessions whose writes are being committed, set once the commit has finished
+        self._in_flight: dict[str, threading.Event] = {}
+        # Consecutive failed commits per session
+        self._failures: dict[str, int] = {}
+        self._db = None
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def add_log(self, db, session_id: str, entry: dict[str, Any]):
+        """Queue a log entry for the session's logs subcollection."""
+        if not self.enabled:
+            db.collection("sessions").document(session_id).collection("logs").add(entry)
+            return
+        self._queue_log(db, session_id, entry)
+        self._flush_if_full()
+
+    def update(self, db, session_id: str, fields: dict[str, Any]):
+        """Queue a field update for the session document; later updates win per field, increments add up."""
+        if not self.enabled:
+            db.collection("sessions").document(session_id).update(fields)
+            if is_trust_penalty(fields):
+                self._clamp_trust_scores(db, [session_id])
+            return
+        self._queue_update(db, session_id, fields)
+        self._flush_if_full()
+
+    async def add_log_async(self, db, session_id: str, entry: dict[str, Any]):
+        """Like add_log, for async routes: queueing stays on the event loop, Firestore writes run on the threadpool."""
+        if not self.enabled:
+            await run_in_threadpool(self.add_log, db, session_id, entry)
+            return
+        self._queue_log(db, session_id, entry)
+        if self._pending >= self.max_pending:
+            await run_in_threadpool(self.flush)
+
+    async def update_async(self, db, session_id: str, fields: dict[str, Any]):
+        """Like update, for async routes: queueing stays on the event loop, Firestore writes run on the threadpool."""
+        if not self.enabled:
+            await run_in_threadpool(self.update, db, session_id, fields)
+            return
+        self._queue_update(db, session_id, fields)
+        if self._pending >= self.max_pending:
+            await run_in_threadpool(self.flush)
+
+    def _queue_log(self, db, session_id: str, entry: dict[str, Any]):
+        with self._lock:
+            self._db = db
+            self._logs.setdefault(session_id, []).append(entry)
+            self._pending += 1
+
+    def _queue_update(self, db, session_id: str, fields: dict[str, Any]):
+        with self._lock:
+            self._db = db
+            if session_id not in self._updates:
+                self._updates[session_id] = {}
+                self._pending += 1
+            pending = self._updates[session_id]
+            for field, value in fields.items():
+                pending[field] = _merge_field(pending[field], value) if field in pending else value
+
+    def flush(self, db=None, session_id: str | None = None) -> int:
+        """
+        Commit queued writes now, for one session or for all of them.
+
+        Flushing one session first waits for a commit of its writes that another flush
+        already has in flight, so once it returns, everything queued before the call
+        has been committed (or re-queued after a failure). Flushing all sessions skips
+        sessions with a commit in flight, keeping each session's writes in order.
+
+        Returns:
+            The number of writes committed.
+        """
+        if session_id is not None:
+            with self._claim_session(session_id) as (logs, fields):
+                if not (logs or fields):
+                    return 0
+                return self._commit_pending(db or self._db, {session_id: (logs, fields)})
+
+        with self._lock:
+            db = db or self._db
+            session_ids = [sid for sid in dict.fromkeys([*self._updates, *self._logs]) if sid not in self._in_flight]
+            pending = {sid: self._take(sid) for sid in session_ids}
+            for sid in pending:
+                self._in_flight[sid] = threading.Event()
+        try:
+            return self._commit_pending(db, pending)
+        finally:
+            self._release(pending)
+
+    @contextlib.contextmanager
+    def _claim_session(self, session_id: str):
+        """Take one session's queued writes once no other commit of it is in flight, and hold it until done."""
+        while True:
+            with self._lock:
+                in_flight = self._in_flight.get(session_id)
+                if in_flight is None:
+                    writes = self._take(session_id)
+                    self._in_flight[session_id] = threading.Event()
+                    break
+            in_flight.wait()
+        try:
+            yield writes
+        finally:
+            self._release([session_id])
+
+    def _release(self, session_ids):
+        with self._lock:
+            for sid in session_ids:
+                self._in_flight.pop(sid).set()
+
+    def _commit_pending(self, db, pending: dict[str, tuple[list[dict[str, Any]], dict[str, Any]]]) -> int:
+        """Commit taken writes in batches of at most FIRESTORE_BATCH_LIMIT writes."""
+        if db is None:
+            return 0
+        committed = 0
+        chunk: dict[str, tuple[list[dict[str, Any]], dict[str, Any]]] = {}
+        chunk_size = 0
+        for sid, (logs, fields) in pending.items():
+            size = len(logs) + (1 if fields else 0)
+            if chunk and chunk_size + size > FIRESTORE_BATCH_LIMIT:
+                committed += self._commit(db, chunk)
+                chunk, chunk_size = {}, 0
+            chunk[sid] = (logs, fields)
+            chunk_size += size
+        if chunk:
+            committed += self._commit(db, chunk)
+        return committed
+
+    def discard(self, session_id: str):
+        """Drop a session's queued writes (e.g. when the session is deleted)."""
+        with self._lock:
+            self._take(session_id)
+
+    def _take(self, session_id: str) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        logs = self._logs.pop(session_id, [])
+        fields = self._updates.pop(session_id, {})
+        self._pending -= len(logs) + (1 if fields else 0)
+        return logs, fields
+
+    def _requeue(self, session_id: str, logs: list[dict[str, Any]], fields: dict[str, Any]):
+        """Put failed writes back ahead of anything queued since they were taken (lock held)."""
+        if logs:
+            self._logs[session_id] = logs + self._logs.get(session_id, [])
+            self._pending += len(logs)
+        if fields:
+            newer = self._updates.get(session_id)
+            if newer is None:
+                self._pending += 1
+                newer = {}
+            merged = dict(fields)
+            for field, value in newer.items():
+                merged[field] = _merge_field(merged[field], value) if field in merged else value
+            self._updates[session_id] = merged
+
+    @staticmethod
+    def _queue_writes(db, batch, session_id: str, logs: list[dict[str, Any]], fields: dict[str, Any]):
+        session_ref = db.collection("sessions").document(session_id)
+        # Field updates go first so a log entry never lands on a session the update would fail on.
+        if fields:
+            batch.update(session_ref, fields)
+        for entry in logs:
+            batch.set(session_ref.collection("logs").document(), entry)
+
+    def _commit(self, db, writes: dict[str, tuple[list[dict[str, Any]], dict[str, Any]]]) -> int:
+        """Commit a chunk in one batch, falling back to one batch per session if it is rejected."""
+        count = sum(len(logs) + (1 if fields else 0) for logs, fields in writes.values())
+        try:
+            batch = db.batch()
+            for sid, (logs, fields) in writes.items():
+                self._queue_writes(db, batch, sid, logs, fields)
+            batch.commit()
+            self._record_commit(writes, count)
+            self._clamp_trust_scores(db, [sid for sid, (_, fields) in writes.items() if is_trust_penalty(fields)])
+            return count
+        except Exception as e:
+            if len(writes) == 1:
+                sid, (logs, fields) = next(iter(writes.items()))
+                self._record_failure(sid, logs, fields, e)
+                return 0
+            logger.warning("Buffered write batch failed (%s); retrying per session", e)
+            return sum(self._commit(db, {sid: session_writes}) for sid, session_writes in writes.items())
+
+    @staticmethod
+    def _clamp_trust_scores(db, session_ids: list[str]):
+        """Reconcile trust scores that committed penalty Increments may have taken below zero."""
+        for sid in session_ids:
+            try:
+                if clamp_trust_score(db, sid):
+                    logger.info("Clamped negative trust score of session %s to 0", sid)
+            except Exception as e:
+                logger.warning("Could not reconcile trust score of session %s: %s", sid, e)
+
+    def _record_commit(self, writes: dict[str, Any], count: int):
+        with self._lock:
+            self.commits += 1
+            self.flushed_writes += count
+            for sid in writes:
+                self._failures.pop(sid, None)
+
+    def _record_failure(self, session_id: str, logs: list[dict[str, Any]], fields: dict[str, Any], error: Exception):
+        """Re-queue a session's failed writes, or drop them if the session is gone or retries are used up."""
+        count = len(logs) + (1 if fields else 0)
+        with self._lock:
+            attempts = self._failures.pop(session_id, 0) + 1
+            retry = not isinstance(error, NotFound) and attempts <= self.max_retries
+            if retry:
+                self._failures[session_id] = attempts
+                self._requeue(session_id, logs, fields)
+                self.retried_writes += count
+            else:
+                self.dropped_writes += count
+        if retry:
+            logger.warning(
+                "Buffered writes for session %s failed (attempt %d of %d), re-queued: %s",
+                session_id,
+                attempts,
+                self.max_retries + 1,
+                error,
+            )
+        elif isinstance(error, NotFound):
+            logger.error("Dropping %d buffered writes for missing session %s: %s", count, session_id, error)
+        else:
+            logger.error(
+                "Dropping %d buffered writes for session %s after %d failed attempts: %s",
+                count,
+                session_id,
+                attempts,
+                error,
+                exc_info=True,
+            )
+
+    def _flush_if_full(self):
+        if self._pending >= self.max_pending:
+            self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                logger.error("Background session write flush failed: %s", e, exc_info=True)
+
+    def start(self):
+        """Start the periodic background flush on the running event loop."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flush and commit everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+    def stats(self) -> dict:
+        """Queue depth and commit counters since start-up (or the last reset)."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending_writes": self._pending,
+                "flushed_writes": self.flushed_writes,
+                "commits": self.commits,
+                "retried_writes": self.retried_writes,
+                "dropped_writes": self.dropped_writes,
+            }
+
+    def clear(self):
+        """Drop all queued writes and reset the counters."""
+        with self._lock:
+            self._logs.clear()
+            self._updates.clear()
+            self._pending = 0
+            self._failures.clear()
+            self._db = None
+            self.flushed_writes = 0
+            self.commits = 0
+            self.retried_writes = 0
+            self.dropped_writes = 0
+
+
+session_write_buffer = SessionWriteBuffer()
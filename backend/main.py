@@ -7,25 +7,46 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
 import time
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from backend.app.face_detection import detection_engine
+from backend.app.fanout import read_fanout
 from backend.app.logging_config import configure_logging, get_logger
+from backend.app.pagination import NEXT_CURSOR_HEADER
+from backend.app.presence import presence_table
 from backend.app.routes import router as api_router
+from backend.app.write_buffer import session_write_buffer
 
 # Configure structured logging
 configure_logging(level=os.getenv("LOG_LEVEL", "INFO"), structured=os.getenv("LOG_FORMAT", "text") == "json")
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application."""
+    detection_engine.start()
+    session_write_buffer.start()
+    presence_table.start()
+    yield
+    await presence_table.stop()
+    await session_write_buffer.stop()
+    detection_engine.shutdown()
+    read_fanout.shutdown()
+
+
 app = FastAPI(
     title="SecureEval Tracking System API",
     description="Backend for the SecureEval platform. Provides OCR, Face Detection, and Monitoring services.",
     version="2.5.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 
@@ -93,6 +114,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RateLimitMiddleware, max_requests=120, window_seconds=60)
@@ -6,15 +6,20 @@ FastAPI TestClient that requires zero network access.
 """
 
 import os
+import sys
 from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
 
 # Set test environment variables before any app imports
 os.environ["GEMINI_API_KEY"] = "test-api-key-not-real"
 os.environ["FIREBASE_CREDENTIALS"] = ""
 os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["FACE_DETECTION_WORKERS"] = "0"
+os.environ["SESSION_WRITE_FLUSH_INTERVAL_SECONDS"] = "0"
 
 
 class MockDocumentSnapshot:
@@ -38,7 +43,7 @@ class MockDocumentReference:
         self._exists = exists
         self._subcollections = {}
 
-    def get(self):
+    def get(self, transaction=None):
         return MockDocumentSnapshot(self.id, self._data, self._exists)
 
     def set(self, data):
@@ -46,7 +51,15 @@ class MockDocumentReference:
         self._exists = True
 
     def update(self, data):
-        self._data.update(data)
+        for field, value in data.items():
+            # Like Firestore, dotted field paths address nested map fields
+            *parents, leaf = field.split(".")
+            target = self._data
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            if isinstance(value, firestore.Increment):
+                value = target.get(leaf, 0) + value.value
+            target[leaf] = value
 
     def delete(self):
         self._exists = False
@@ -82,17 +95,23 @@ class MockCollectionReference:
         self._documents[doc_id] = doc_ref
         return None, doc_ref
 
+    def _query(self):
+        return MockQuery(self)
+
     def where(self, field, op, value):
-        """Simple mock filtering — returns self for chaining."""
-        return self
+        return self._query().where(field, op, value)
 
     def order_by(self, field, direction=None):
-        """Simple mock ordering — returns self for chaining."""
-        return self
+        return self._query().order_by(field, direction)
 
     def limit(self, count):
-        """Simple mock limit — returns self for chaining."""
-        return self
+        return self._query().limit(count)
+
+    def select(self, field_paths):
+        return self._query().select(field_paths)
+
+    def count(self, alias=None):
+        return self._query().count(alias)
 
     def stream(self):
         """Yield all existing documents."""
@@ -101,6 +120,149 @@ class MockCollectionReference:
                 yield MockDocumentSnapshot(doc_ref.id, doc_ref._data)
 
 
+_MOCK_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class MockQuery:
+    """Simulates an immutable Firestore query: filters, ordering, cursors, limits and field masks."""
+
+    def __init__(self, collection, filters=(), orders=(), limit=None, cursor=None, fields=None):
+        self._collection = collection
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._cursor = cursor
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "cursor": self._cursor,
+            "fields": self._fields,
+        }
+        state.update(changes)
+        return MockQuery(self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=(*self._filters, (field, op, value)))
+
+    def order_by(self, field, direction=None):
+        return self._copy(orders=(*self._orders, (field, direction == firestore.Query.DESCENDING)))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, values):
+        return self._copy(cursor=values)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    @staticmethod
+    def _value(doc_id, data, field):
+        return doc_id if field == "__name__" else data.get(field)
+
+    def _sort_key(self, doc_id, data):
+        return tuple(self._value(doc_id, data, field) for field, _ in self._orders)
+
+    def _after_cursor(self, doc_id, data):
+        for field, descending in self._orders:
+            cursor_value = self._cursor[field]
+            if field == "__name__" and not isinstance(cursor_value, str):
+                cursor_value = cursor_value.id
+            value = self._value(doc_id, data, field)
+            if value != cursor_value:
+                return value < cursor_value if descending else value > cursor_value
+        return False
+
+    def stream(self):
+        rows = []
+        for doc_ref in self._collection._documents.values():
+            if not doc_ref._exists:
+                continue
+            data = doc_ref._data
+            if any(
+                field not in data or not _MOCK_OPERATORS[op](data[field], value) for field, op, value in self._filters
+            ):
+                continue
+            # Like Firestore, ordering excludes documents that lack the ordered field
+            if any(field != "__name__" and field not in data for field, _ in self._orders):
+                continue
+            rows.append((doc_ref.id, data))
+
+        for field, descending in reversed(self._orders):
+            rows.sort(key=lambda row, f=field: self._value(row[0], row[1], f), reverse=descending)
+        if self._cursor is not None:
+            rows = [row for row in rows if self._after_cursor(*row)]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+
+        for doc_id, data in rows:
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield MockDocumentSnapshot(doc_id, data)
+
+    def get(self):
+        return list(self.stream())
+
+    def count(self, alias=None):
+        return MockAggregationQuery(self).count(alias)
+
+
+class MockAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class MockAggregationQuery:
+    """Simulates Firestore count/sum/avg aggregation queries over a MockQuery."""
+
+    def __init__(self, query):
+        self._query = query
+        self._aggregations = []
+        self.runs = 0
+
+    def count(self, alias=None):
+        self._aggregations.append(("count", None, alias or "field_1"))
+        return self
+
+    def sum(self, field, alias=None):
+        self._aggregations.append(("sum", field, alias or "field_1"))
+        return self
+
+    def avg(self, field, alias=None):
+        self._aggregations.append(("avg", field, alias or "field_1"))
+        return self
+
+    def get(self):
+        self.runs += 1
+        docs = [doc.to_dict() for doc in self._query.stream()]
+        results = []
+        for kind, field, alias in self._aggregations:
+            # Like Firestore, sum and avg skip documents whose field is missing or non-numeric
+            numbers = [d.get(field) for d in docs]
+            numbers = [n for n in numbers if isinstance(n, int | float) and not isinstance(n, bool)]
+            if kind == "count":
+                value = len(docs)
+            elif kind == "sum":
+                value = sum(numbers)
+            else:
+                value = sum(numbers) / len(numbers) if numbers else None
+            results.append(MockAggregationResult(alias, value))
+        return [results]
+
+
 class MockFirestoreDB:
     """Simulates a Firestore database client."""
 
@@ -115,6 +277,66 @@ class MockFirestoreDB:
     def batch(self):
         return MockBatch(self)
 
+    def transaction(self):
+        return MockTransaction(self)
+
+    def get_all(self, references, field_paths=None):
+        """Yield a snapshot per reference, keeping only field_paths when given."""
+        for doc_ref in references:
+            data = doc_ref._data
+            if field_paths is not None:
+                data = {field: data[field] for field in field_paths if field in data}
+            yield MockDocumentSnapshot(doc_ref.id, data, doc_ref._exists)
+
+
+class MockAsyncDocumentReference:
+    """Simulates a firestore.AsyncDocumentReference over a MockDocumentReference."""
+
+    def __init__(self, doc_ref):
+        self._ref = doc_ref
+        self.id = doc_ref.id
+
+    async def get(self):
+        return self._ref.get()
+
+    async def set(self, data):
+        self._ref.set(data)
+
+    async def update(self, data):
+        self._ref.update(data)
+
+
+class MockAsyncCollectionReference:
+    """Simulates a firestore.AsyncCollectionReference over a MockCollectionReference."""
+
+    def __init__(self, collection_ref):
+        self._ref = collection_ref
+
+    def document(self, doc_id):
+        return MockAsyncDocumentReference(self._ref.document(doc_id))
+
+
+class MockAsyncFirestoreDB:
+    """Simulates a firestore.AsyncClient sharing its data with a MockFirestoreDB."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def collection(self, name):
+        return MockAsyncCollectionReference(self._db.collection(name))
+
+
+def _override_firestore(app, db):
+    """Serve a mock from both Firestore dependencies; the async one follows get_firestore_db as in production."""
+    from fastapi import Depends
+
+    from backend.app.dependencies import get_async_firestore_db, get_firestore_db
+
+    app.dependency_overrides[get_firestore_db] = lambda: db
+    app.dependency_overrides[get_async_firestore_db] = lambda sync_db=Depends(get_firestore_db): (
+        MockAsyncFirestoreDB(sync_db) if sync_db else None
+    )
+
 
 class MockBatch:
     """Simulates a Firestore batch write."""
@@ -126,12 +348,91 @@ class MockBatch:
     def set(self, doc_ref, data):
         self._operations.append(("set", doc_ref, data))
 
+    def update(self, doc_ref, data):
+        self._operations.append(("update", doc_ref, data))
+
+    def __len__(self):
+        return len(self._operations)
+
     def commit(self):
+        # Like Firestore, reject the whole batch if any update targets a missing document
+        for op, doc_ref, _ in self._operations:
+            if op == "update" and not doc_ref._exists:
+                self._operations.clear()
+                raise NotFound(f"No document to update: {doc_ref.id}")
         for op, doc_ref, data in self._operations:
             if op == "set":
                 doc_ref.set(data)
+            elif op == "update":
+                doc_ref.update(data)
+        self._operations.clear()
+
+
+class MockTransaction(MockBatch):
+    """Simulates a Firestore transaction as driven by firestore.transactional."""
+
+    _read_only = False
+    _max_attempts = 5
+    _id = b"mock-transaction"
+
+    def _clean_up(self):
         self._operations.clear()
 
+    def _begin(self, retry_id=None):
+        pass
+
+    def _commit(self):
+        self.commit()
+
+    def _rollback(self):
+        self._operations.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_in_process_state():
+    """Clear module-level caches so state never leaks between tests."""
+    from backend.app.exam_cache import exam_paper_cache
+    from backend.app.face_tracking import face_tracker
+    from backend.app.frame_dedup import frame_deduplicator
+    from backend.app.live_feed import active_sessions
+    from backend.app.motion_gate import motion_gate
+    from backend.app.presence import presence_table
+    from backend.app.session_cache import session_state_cache
+    from backend.app.session_events import session_events
+    from backend.app.write_buffer import session_write_buffer
+
+    caches = (
+        session_state_cache,
+        face_tracker,
+        frame_deduplicator,
+        motion_gate,
+        session_write_buffer,
+        session_events,
+        active_sessions,
+        exam_paper_cache,
+        presence_table,
+    )
+    for cache in caches:
+        cache.clear()
+    _reset_rate_limits()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
+def _reset_rate_limits():
+    """Forget request history in the app's rate limiter so the suite's volume never trips it."""
+    main = sys.modules.get("backend.main")
+    if main is None:
+        return
+    from backend.app.middleware.rate_limit import RateLimitMiddleware
+
+    layer = main.app.middleware_stack
+    while layer is not None:
+        if isinstance(layer, RateLimitMiddleware):
+            layer._request_history.clear()
+        layer = getattr(layer, "app", None)
+
 
 @pytest.fixture
 def mock_db():
@@ -167,6 +468,12 @@ def mock_db_with_session(mock_db):
     return mock_db
 
 
+@pytest.fixture
+def async_db_with_session(mock_db_with_session):
+    """Async Firestore client view of mock_db_with_session."""
+    return MockAsyncFirestoreDB(mock_db_with_session)
+
+
 @pytest.fixture
 def mock_db_with_exam(mock_db_with_session):
     """Provides a mock DB with both a session and its linked exam."""
@@ -228,7 +535,7 @@ def client(mock_db):
     """
     Provides a FastAPI TestClient with all external dependencies mocked.
 
-    - Firestore is replaced with MockFirestoreDB
+    - Firestore is replaced with MockFirestoreDB (and MockAsyncFirestoreDB for async routes)
     - Firebase Admin SDK initialization is patched
     - AI service calls return predictable responses
     """
@@ -238,10 +545,9 @@ def client(mock_db):
         patch("backend.app.firebase_setup.credentials"),
         patch("backend.app.firebase_setup.get_db", return_value=mock_db),
     ):
-        from backend.app.dependencies import get_firestore_db
         from backend.main import app
 
-        app.dependency_overrides[get_firestore_db] = lambda: mock_db
+        _override_firestore(app, mock_db)
 
         with TestClient(app) as test_client:
             yield test_client
@@ -257,10 +563,9 @@ def client_with_session(mock_db_with_session):
         patch("backend.app.firebase_setup.credentials"),
         patch("backend.app.firebase_setup.get_db", return_value=mock_db_with_session),
     ):
-        from backend.app.dependencies import get_firestore_db
         from backend.main import app
 
-        app.dependency_overrides[get_firestore_db] = lambda: mock_db_with_session
+        _override_firestore(app, mock_db_with_session)
 
         with TestClient(app) as test_client:
             yield test_client
@@ -276,10 +581,9 @@ def client_with_exam(mock_db_with_exam):
         patch("backend.app.firebase_setup.credentials"),
         patch("backend.app.firebase_setup.get_db", return_value=mock_db_with_exam),
     ):
-        from backend.app.dependencies import get_firestore_db
         from backend.main import app
 
-        app.dependency_overrides[get_firestore_db] = lambda: mock_db_with_exam
+        _override_firestore(app, mock_db_with_exam)
 
         with TestClient(app) as test_client:
             yield test_client
@@ -295,10 +599,9 @@ def client_with_students(mock_db_with_students):
         patch("backend.app.firebase_setup.credentials"),
         patch("backend.app.firebase_setup.get_db", return_value=mock_db_with_students),
     ):
-        from backend.app.dependencies import get_firestore_db
         from backend.main import app
 
-        app.dependency_overrides[get_firestore_db] = lambda: mock_db_with_students
+        _override_firestore(app, mock_db_with_students)
 
         with TestClient(app) as test_client:
             yield test_client
@@ -39,6 +39,158 @@ class TestExamHistory:
         assert dates == sorted(dates, reverse=True)
 
 
+class TestHistoryPagination:
+    """Cursor pagination, filters and field projection for GET /api/admin/exams/history."""
+
+    @staticmethod
+    def _seed(mock_db, count=5):
+        for i in range(count):
+            mock_db.collection("sessions").document(f"s-{i}").set(
+                {
+                    "student_name": f"Student {i}",
+                    "exam_id": "exam-a" if i % 2 == 0 else "exam-b",
+                    "status": "Completed" if i < 3 else "Terminated",
+                    "created_at": f"2026-03-0{i + 1}T09:00:00",
+                    "trust_score": 100,
+                    "answers": {"q1": "a long answer"},
+                    "ai_report": "a long report",
+                }
+            )
+
+    def test_pages_follow_next_cursor(self, client, mock_db):
+        self._seed(mock_db)
+
+        first = client.get("/api/admin/exams/history?limit=2")
+        assert [s["id"] for s in first.json()] == ["s-4", "s-3"]
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = client.get(f"/api/admin/exams/history?limit=2&cursor={cursor}")
+        assert [s["id"] for s in second.json()] == ["s-2", "s-1"]
+
+        last = client.get(f"/api/admin/exams/history?limit=2&cursor={second.headers['X-Next-Cursor']}")
+        assert [s["id"] for s in last.json()] == ["s-0"]
+        assert "X-Next-Cursor" not in last.headers
+
+    def test_cursor_breaks_created_at_ties_by_id(self, client, mock_db):
+        for sid in ("a", "b", "c"):
+            mock_db.collection("sessions").document(sid).set({"created_at": "2026-03-01T09:00:00"})
+
+        first = client.get("/api/admin/exams/history?limit=2")
+        second = client.get(f"/api/admin/exams/history?limit=2&cursor={first.headers['X-Next-Cursor']}")
+        assert [s["id"] for s in first.json() + second.json()] == ["c", "b", "a"]
+
+    def test_rows_exclude_large_fields(self, client, mock_db):
+        self._seed(mock_db, count=1)
+        row = client.get("/api/admin/exams/history").json()[0]
+        assert "answers" not in row
+        assert "ai_report" not in row
+        assert row["student_name"] == "Student 0"
+
+    def test_filters(self, client, mock_db):
+        self._seed(mock_db)
+
+        by_status = client.get("/api/admin/exams/history?status=Terminated").json()
+        assert [s["id"] for s in by_status] == ["s-4", "s-3"]
+
+        by_exam = client.get("/api/admin/exams/history?exam_id=exam-b").json()
+        assert [s["id"] for s in by_exam] == ["s-3", "s-1"]
+
+        by_date = client.get(
+            "/api/admin/exams/history?created_from=2026-03-02T00:00:00&created_to=2026-03-03T23:59:59"
+        ).json()
+        assert [s["id"] for s in by_date] == ["s-2", "s-1"]
+
+    def test_without_limit_returns_every_session(self, client, mock_db):
+        for i in range(120):
+            mock_db.collection("sessions").document(f"s-{i:03d}").set(
+                {"created_at": f"2026-03-01T09:{i // 60:02d}:{i % 60:02d}"}
+            )
+        mock_db.collection("sessions").document("undated").set({"status": "Active"})
+
+        response = client.get("/api/admin/exams/history")
+        rows = response.json()
+        assert len(rows) == 121
+        assert rows[0]["id"] == "s-119"
+        assert rows[-1]["id"] == "undated"
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_cursor_without_limit_uses_default_page(self, client, mock_db):
+        for i in range(120):
+            mock_db.collection("sessions").document(f"s-{i:03d}").set(
+                {"created_at": f"2026-03-01T09:{i // 60:02d}:{i % 60:02d}"}
+            )
+
+        first = client.get("/api/admin/exams/history?limit=10")
+        second = client.get(f"/api/admin/exams/history?cursor={first.headers['X-Next-Cursor']}")
+        assert len(second.json()) == 100
+        assert second.json()[0]["id"] == "s-109"
+
+    def test_invalid_cursor_rejected(self, client):
+        response = client.get("/api/admin/exams/history?cursor=not-a-cursor")
+        assert response.status_code == 422
+        assert response.json()["error"] == "INVALID_PAYLOAD"
+
+    def test_limit_bounds(self, client):
+        assert client.get("/api/admin/exams/history?limit=0").status_code == 422
+        assert client.get("/api/admin/exams/history?limit=501").status_code == 422
+
+    def test_export_reads_every_page(self, client, mock_db):
+        self._seed(mock_db)
+        from backend.app.routes.admin_routes import iter_session_history
+
+        rows = list(iter_session_history(mock_db, page_size=2))
+        assert [r["id"] for r in rows] == ["s-4", "s-3", "s-2", "s-1", "s-0"]
+        assert client.get("/api/admin/exams/export").json()["total_count"] == 5
+
+
+class TestDashboardStats:
+    """Tests for GET /api/admin/dashboard/stats"""
+
+    def test_empty_dashboard(self, client):
+        response = client.get("/api/admin/dashboard/stats")
+        assert response.status_code == 200
+        assert response.json() == {
+            "active": 0,
+            "flagged": 0,
+            "completed": 0,
+            "terminated": 0,
+            "total_sessions": 0,
+            "total_students": 0,
+            "total_exams": 0,
+            "avg_score": 0,
+            "avg_trust": 100,
+        }
+
+    def test_totals_across_all_sessions(self, client, mock_db):
+        sessions = [
+            ("Active", 100, None),
+            ("Active", 80, None),
+            ("Flagged", 40, None),
+            ("Completed", 90, 7),
+            ("Completed", 95, 8),
+            ("Terminated", 0, 0),
+        ]
+        for i, (status, trust, score) in enumerate(sessions):
+            data = {"status": status, "trust_score": trust}
+            if score is not None:
+                data["score"] = score
+            mock_db.collection("sessions").document(f"s-{i}").set(data)
+        mock_db.collection("users").document("u1").set({"role": "student"})
+        mock_db.collection("users").document("u2").set({"role": "admin"})
+        mock_db.collection("exams").document("e1").set({"title": "Exam"})
+
+        stats = client.get("/api/admin/dashboard/stats").json()
+        assert stats["active"] == 2
+        assert stats["flagged"] == 1
+        assert stats["completed"] == 2
+        assert stats["terminated"] == 1
+        assert stats["total_sessions"] == 6
+        assert stats["total_students"] == 1
+        assert stats["total_exams"] == 1
+        assert stats["avg_score"] == 5.0
+        assert stats["avg_trust"] == 68
+
+
 class TestStudentManagement:
     """Tests for /api/admin/students CRUD endpoints."""
 
@@ -0,0 +1,166 @@
+"""
+Tests for the exam paper cache.
+
+Covers: cache hits and copies, uncached missing exams, request coalescing,
+invalidation, and cached papers through the session routes.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend.app.exam_cache import ExamPaperCache, exam_paper_cache
+
+
+def _slow_db(paper, delay=0.05, error=None):
+    """Mock Firestore whose exam reads take a while, counting how often they happen."""
+    db = MagicMock()
+    reads = []
+
+    def get():
+        reads.append(1)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return MagicMock(exists=paper is not None, to_dict=lambda: dict(paper))
+
+    db.collection.return_value.document.return_value.get.side_effect = get
+    return db, reads
+
+
+def _slow_async_db(paper, delay=0.05, error=None):
+    """Like _slow_db, for the async Firestore client."""
+    db = MagicMock()
+    reads = []
+
+    async def get():
+        reads.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return MagicMock(exists=paper is not None, to_dict=lambda: dict(paper))
+
+    db.collection.return_value.document.return_value.get.side_effect = get
+    return db, reads
+
+
+class TestExamPaperCache:
+    """Tests for ExamPaperCache."""
+
+    def test_second_lookup_is_a_hit(self, mock_db_with_exam):
+        cache = ExamPaperCache()
+        first = cache.get(mock_db_with_exam, "exam-001")
+        second = cache.get(mock_db_with_exam, "exam-001")
+        assert first == second
+        assert first["subject"] == "Computer Science"
+        assert cache.reads == 1
+
+    def test_returns_copies(self, mock_db_with_exam):
+        cache = ExamPaperCache()
+        cache.get(mock_db_with_exam, "exam-001")["questions"].clear()
+        assert len(cache.get(mock_db_with_exam, "exam-001")["questions"]) == 2
+
+    def test_missing_exam_not_cached(self, mock_db):
+        cache = ExamPaperCache()
+        assert cache.get(mock_db, "nope") is None
+        assert cache.get(mock_db, "nope") is None
+        assert cache.reads == 2
+
+    def test_invalidate(self, mock_db_with_exam):
+        cache = ExamPaperCache()
+        cache.get(mock_db_with_exam, "exam-001")
+        mock_db_with_exam.collection("exams").document("exam-001").update({"duration": 45})
+        cache.invalidate("exam-001")
+        assert cache.get(mock_db_with_exam, "exam-001")["duration"] == 45
+
+    def test_concurrent_misses_coalesce(self):
+        cache = ExamPaperCache()
+        db, reads = _slow_db({"questions": [1, 2]})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(db, "exam-001"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(reads) == 1
+        assert results == [{"questions": [1, 2]}] * 8
+
+    def test_read_error_reaches_every_waiter(self):
+        cache = ExamPaperCache()
+        db, reads = _slow_db(None, error=RuntimeError("unavailable"))
+        errors = []
+
+        def lookup():
+            with pytest.raises(RuntimeError):
+                cache.get(db, "exam-001")
+            errors.append(1)
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 4
+        assert len(reads) < 4
+
+    def test_async_concurrent_misses_coalesce(self):
+        cache = ExamPaperCache()
+        adb, reads = _slow_async_db({"questions": [1]})
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_async(adb, "exam-001") for _ in range(5)))
+
+        assert asyncio.run(scenario()) == [{"questions": [1]}] * 5
+        assert len(reads) == 1
+        assert cache.reads == 1
+
+    def test_async_read_error_reaches_every_waiter(self):
+        cache = ExamPaperCache()
+        adb, reads = _slow_async_db(None, error=RuntimeError("unavailable"))
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_async(adb, "exam-001") for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
+        assert len(reads) == 1
+
+    def test_sync_lookup_waits_for_async_read(self):
+        cache = ExamPaperCache()
+        adb, _ = _slow_async_db({"questions": [1]}, delay=0.1)
+        sync_db, sync_reads = _slow_db({"questions": [2]})
+
+        async def scenario():
+            read = asyncio.create_task(cache.get_async(adb, "exam-001"))
+            await asyncio.sleep(0.02)
+            waiter = asyncio.to_thread(cache.get, sync_db, "exam-001")
+            return await asyncio.gather(read, waiter)
+
+        assert asyncio.run(scenario()) == [{"questions": [1]}] * 2
+        assert sync_reads == []
+
+
+class TestExamCacheThroughApi:
+    """End-to-end checks through the session and admin routes."""
+
+    def test_get_session_and_submit_share_paper(self, client_with_exam, mock_db_with_exam, monkeypatch):
+        monkeypatch.setattr(
+            "backend.app.ai_service.evaluate_exam_submission",
+            lambda questions, answers: {"score": len(questions), "total_questions": len(questions), "feedback": {}},
+        )
+        client_with_exam.get("/api/sessions/session-001")
+        client_with_exam.get("/api/sessions/session-001")
+        response = client_with_exam.post("/api/sessions/session-001/submit", json={"answers": {"0": 0}})
+        assert response.json()["total"] == 2
+        assert exam_paper_cache.reads == 1
+
+    def test_admin_invalidation(self, client_with_exam, mock_db_with_exam):
+        client_with_exam.get("/api/sessions/session-001")
+        mock_db_with_exam.collection("exams").document("exam-001").update({"subject": "Maths"})
+
+        response = client_with_exam.delete("/api/admin/exams/exam-001/cache")
+        assert response.status_code == 200
+        data = client_with_exam.get("/api/sessions/session-001").json()
+        assert data["questions_metadata"]["subject"] == "Maths"
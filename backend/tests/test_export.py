@@ -1,9 +1,17 @@
 """
 Tests for exam session data export endpoint.
 
-Covers: CSV format with header formatting, JSON structure, empty sessions handling.
+Covers: CSV format with header formatting, JSON structure, empty sessions handling,
+NDJSON, gzip compression, filters, chunked streaming, and Parquet/Arrow exports.
 """
 
+import gzip
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
 
 class TestSessionExport:
     """Tests for GET /api/admin/exams/export."""
@@ -55,3 +63,142 @@ class TestSessionExport:
         response = client.get("/api/admin/exams/export?format=json")
         assert response.status_code == 200
         assert response.json()["total_count"] == 0
+
+    def test_export_ndjson_streams_one_row_per_line(self, client, mock_db):
+        for i in range(3):
+            mock_db.collection("sessions").document(f"n{i}").set(
+                {"student_name": f"Student {i}", "created_at": f"2026-02-0{i + 1}T10:00:00"}
+            )
+
+        response = client.get("/api/admin/exams/export?format=ndjson")
+        assert response.status_code == 200
+        assert "application/x-ndjson" in response.headers["content-type"]
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["id"] for r in rows] == ["n2", "n1", "n0"]
+
+    def test_export_gzip(self, client, mock_db):
+        mock_db.collection("sessions").document("g1").set(
+            {"student_name": "Gina", "studentId": "stud_g", "created_at": "2026-02-03T10:00:00"}
+        )
+
+        response = client.get("/api/admin/exams/export?format=csv&gzip=true")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert "exam_sessions_export.csv.gz" in response.headers["content-disposition"]
+        content = gzip.decompress(response.content).decode()
+        assert content.splitlines()[1].startswith("g1,stud_g,Gina,")
+
+    def test_export_applies_filters(self, client, mock_db):
+        mock_db.collection("sessions").document("a").set({"status": "Completed", "created_at": "2026-02-01"})
+        mock_db.collection("sessions").document("b").set({"status": "Terminated", "created_at": "2026-02-02"})
+
+        data = client.get("/api/admin/exams/export?status=Terminated").json()
+        assert [s["id"] for s in data["sessions"]] == ["b"]
+        assert data["total_count"] == 1
+
+    def test_export_includes_sessions_without_created_at(self, client, mock_db):
+        mock_db.collection("sessions").document("dated").set({"status": "Completed", "created_at": "2026-02-01"})
+        mock_db.collection("sessions").document("undated").set({"status": "Completed"})
+
+        data = client.get("/api/admin/exams/export").json()
+        assert [s["id"] for s in data["sessions"]] == ["dated", "undated"]
+
+    def test_export_read_failure_returns_error_before_streaming(self, client):
+        with patch(
+            "backend.app.routes.admin_routes.fetch_history_page", side_effect=RuntimeError("Firestore unavailable")
+        ):
+            response = client.get("/api/admin/exams/export?format=csv")
+        assert response.status_code == 500
+
+    def test_export_rejects_unknown_format(self, client):
+        response = client.get("/api/admin/exams/export?format=xml")
+        assert response.status_code == 422
+
+    def test_encoded_rows_are_chunked(self):
+        from backend.app.exports import chunked, csv_lines
+
+        rows = [{"id": f"s{i}", "student_name": "x" * 50} for i in range(100)]
+        chunks = list(chunked(csv_lines(rows), chunk_bytes=1024))
+        assert len(chunks) > 1
+        assert all(len(chunk) < 1024 + 200 for chunk in chunks)
+        assert b"".join(chunks).decode().count("\n") == 101
+
+
+class TestColumnarExport:
+    """Parquet and Arrow IPC exports (need the optional pyarrow package)."""
+
+    @staticmethod
+    def _seed(mock_db, count=3):
+        for i in range(count):
+            mock_db.collection("sessions").document(f"c{i}").set(
+                {
+                    "student_name": f"Student {i}",
+                    "studentId": f"stud_{i}",
+                    "exam_id": "exam-001",
+                    "exam_title": "Physics",
+                    "status": "Completed",
+                    "trust_score": 90 - i,
+                    "score": i + 0.5,
+                    "percentage": 12.5 * i,
+                    "cheat_score": i,
+                    "clock_drift_seconds": 0.25,
+                    "performance": {"0": 1000, "2": 3000 + i},
+                    "answers": {"q1": "not exported"},
+                    "created_at": f"2026-04-0{i + 1}T08:30:00",
+                }
+            )
+
+    def test_parquet_export(self, client, mock_db):
+        pq = pytest.importorskip("pyarrow.parquet")
+        self._seed(mock_db)
+
+        response = client.get("/api/admin/exams/export?format=parquet")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        assert "exam_sessions_export.parquet" in response.headers["content-disposition"]
+
+        table = pq.read_table(io.BytesIO(response.content))
+        rows = table.to_pylist()
+        assert [r["id"] for r in rows] == ["c2", "c1", "c0"]
+        assert rows[0]["student_id"] == "stud_2"
+        assert rows[0]["trust_score"] == 88
+        assert rows[0]["score"] == 2.5
+        assert rows[0]["percentage"] == 25.0
+        assert rows[0]["cheat_score"] == 2
+        assert rows[0]["clock_drift_seconds"] == 0.25
+        assert rows[0]["question_timings_ms"] == [1000, None, 3002]
+        assert rows[0]["created_at"].isoformat() == "2026-04-03T08:30:00+00:00"
+        assert "answers" not in table.column_names
+
+    def test_arrow_stream_export(self, client, mock_db):
+        pa = pytest.importorskip("pyarrow")
+        self._seed(mock_db, count=2)
+
+        response = client.get("/api/admin/exams/export?format=arrow")
+        assert response.status_code == 200
+        assert "exam_sessions_export.arrows" in response.headers["content-disposition"]
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == 2
+        assert table.schema.field("trust_score").type == pa.int64()
+        assert table.schema.field("score").type == pa.float64()
+        assert table.column("score").to_pylist() == [1.5, 0.5]
+
+    def test_parquet_written_in_row_groups(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        from backend.app.exports import columnar_chunks
+
+        rows = [{"id": f"s{i}", "trust_score": i, "created_at": "not a date"} for i in range(5)]
+        chunks = list(columnar_chunks(rows, "parquet", row_group_size=2))
+        assert len(chunks) > 1
+
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column("trust_score").to_pylist() == [0, 1, 2, 3, 4]
+        assert table.column("created_at").null_count == 5
+
+    def test_columnar_export_without_pyarrow(self, client):
+        with patch("backend.app.routes.admin_routes.COLUMNAR_EXPORT_AVAILABLE", False):
+            response = client.get("/api/admin/exams/export?format=parquet")
+        assert response.status_code == 501
+        assert response.json()["error"] == "EXPORT_FORMAT_UNAVAILABLE"
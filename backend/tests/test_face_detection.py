@@ -0,0 +1,129 @@
+"""
+Unit tests for the face detection engine.
+
+Covers: worker detection function, process pool dispatch, and submission backpressure.
+"""
+
+import asyncio
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.app import face_detection
+from backend.app.errors import InvalidPayloadError
+from backend.app.face_detection import (
+    DETECTION_PROFILES,
+    DetectionEngine,
+    DetectionOverloadedError,
+    decode_grayscale,
+    detect_faces,
+    resolve_profile,
+)
+
+
+def _jpeg_bytes(color=(0, 0, 0), width=320, height=240):
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    img[:] = color
+    _, buffer = cv2.imencode(".jpg", img)
+    return buffer.tobytes()
+
+
+class TestDetectFaces:
+    """Tests for the worker-side detect_faces function."""
+
+    def test_blank_frame_has_no_faces(self):
+        result = detect_faces(_jpeg_bytes())
+        assert result.face_count == 0
+        assert result.error is None
+
+    def test_invalid_bytes_report_error(self):
+        result = detect_faces(b"not an image")
+        assert result.face_count is None
+        assert result.error == "Invalid image"
+
+    def test_empty_buffer_reports_error(self):
+        assert detect_faces(b"").face_count is None
+
+
+class TestDetectionProfiles:
+    """Tests for detection profile resolution and reduced-resolution decoding."""
+
+    def test_default_profile(self):
+        assert resolve_profile().name == "accurate"
+
+    def test_named_profile(self):
+        assert resolve_profile("fast") is DETECTION_PROFILES["fast"]
+
+    def test_unknown_profile_rejected(self):
+        with pytest.raises(InvalidPayloadError):
+            resolve_profile("turbo")
+
+    def test_reduced_decode_is_grayscale_and_smaller(self):
+        frame = _jpeg_bytes(width=640, height=480)
+        assert decode_grayscale(frame, DETECTION_PROFILES["accurate"]).shape == (480, 640)
+        assert decode_grayscale(frame, DETECTION_PROFILES["balanced"]).shape == (240, 320)
+        assert decode_grayscale(frame, DETECTION_PROFILES["fast"]).shape == (120, 160)
+
+    def test_decode_caps_resolution(self):
+        frame = _jpeg_bytes(width=1920, height=1080)
+        gray = decode_grayscale(frame, DETECTION_PROFILES["balanced"])
+        assert max(gray.shape) == 640
+
+    @pytest.mark.parametrize("name", sorted(DETECTION_PROFILES))
+    def test_every_profile_detects(self, name):
+        result = detect_faces(_jpeg_bytes(width=640, height=480), DETECTION_PROFILES[name])
+        assert result.face_count == 0
+
+
+class TestDetectionEngine:
+    """Tests for DetectionEngine dispatch and backpressure."""
+
+    def test_thread_mode_detects(self):
+        engine = DetectionEngine(workers=0, queue_size=0)
+        try:
+            result = asyncio.run(engine.detect(_jpeg_bytes()))
+        finally:
+            engine.shutdown()
+        assert result.face_count == 0
+        assert engine.in_flight == 0
+
+    @pytest.mark.slow
+    def test_process_pool_detects(self):
+        engine = DetectionEngine(workers=1, queue_size=1)
+        engine.start()
+        try:
+            result = asyncio.run(engine.detect(_jpeg_bytes()))
+        finally:
+            engine.shutdown()
+        assert result.face_count == 0
+
+    def test_rejects_when_saturated(self, monkeypatch):
+        release = threading.Event()
+
+        def blocking_detect(buffer, profile=None, hints=None):
+            release.wait(timeout=5)
+            return face_detection.DetectionResult(face_count=1)
+
+        monkeypatch.setattr(face_detection, "detect_faces", blocking_detect)
+        engine = DetectionEngine(workers=0, queue_size=0)
+
+        async def scenario():
+            first = asyncio.create_task(engine.detect(b"frame"))
+            await asyncio.sleep(0.05)
+            with pytest.raises(DetectionOverloadedError):
+                await engine.detect(b"frame")
+            release.set()
+            return await first
+
+        try:
+            result = asyncio.run(scenario())
+        finally:
+            engine.shutdown()
+        assert result.face_count == 1
+        assert engine.in_flight == 0
+
+    def test_capacity_includes_queue(self):
+        assert DetectionEngine(workers=4, queue_size=8).capacity == 12
+        assert DetectionEngine(workers=0, queue_size=2).capacity == 3
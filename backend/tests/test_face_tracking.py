@@ -0,0 +1,160 @@
+"""
+Unit tests for temporal face tracking.
+
+Covers: region-of-interest scans in the detection worker, the per-session tracker, and
+dropping tracking state when a session ends.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.app import face_detection
+from backend.app.face_detection import DETECTION_PROFILES, DetectionResult, FrameHints, detect_faces
+from backend.app.face_tracking import FaceTracker
+
+ACCURATE = DETECTION_PROFILES["accurate"]
+BALANCED = DETECTION_PROFILES["balanced"]
+
+
+def _jpeg_bytes(width=640, height=480):
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode(".jpg", img)
+    return buffer.tobytes()
+
+
+class FakeCascade:
+    """Cascade stub that reports one face at a fixed frame position and records scan sizes."""
+
+    def __init__(self, face=(300, 200, 80, 80), extra_face=None):
+        self.face = face
+        self.extra_face = extra_face
+        self.scanned_shapes = []
+
+    def detectMultiScale(self, gray, **kwargs):  # noqa: N802 - mirrors the OpenCV API
+        self.scanned_shapes.append(gray.shape)
+        faces = [self.face]
+        if self.extra_face is not None and gray.shape == (480, 640):
+            faces.append(self.extra_face)
+        return np.array(faces)
+
+
+@pytest.fixture
+def fake_cascade(monkeypatch):
+    cascade = FakeCascade()
+    monkeypatch.setattr(face_detection, "_get_cascade", lambda: cascade)
+    return cascade
+
+
+class TestRoiDetection:
+    """Tests for detect_faces with a tracking region."""
+
+    def test_full_scan_reports_face_box(self, fake_cascade):
+        result = detect_faces(_jpeg_bytes(), ACCURATE)
+        assert result.scan == "full"
+        assert result.face_count == 1
+        assert result.face_box == (300, 200, 80, 80)
+
+    def test_roi_hit_scans_only_region(self, fake_cascade):
+        fake_cascade.face = (40, 40, 80, 80)
+        result = detect_faces(_jpeg_bytes(), ACCURATE, hints=FrameHints(roi=(260, 160, 160, 160)))
+        assert result.scan == "roi"
+        assert result.face_count == 1
+        assert result.face_box == (300, 200, 80, 80)
+        assert fake_cascade.scanned_shapes == [(160, 160)]
+
+    def test_roi_clipped_to_frame(self, fake_cascade):
+        result = detect_faces(_jpeg_bytes(), ACCURATE, hints=FrameHints(roi=(600, 440, 200, 200)))
+        assert fake_cascade.scanned_shapes[0] == (40, 40)
+        assert result.scan == "roi"
+
+    def test_roi_miss_falls_back_to_full_scan(self):
+        result = detect_faces(_jpeg_bytes(), ACCURATE, hints=FrameHints(roi=(100, 100, 200, 200)))
+        assert result.scan == "full"
+        assert result.face_count == 0
+        assert result.face_box is None
+
+    def test_multiple_faces_have_no_box(self, fake_cascade):
+        fake_cascade.extra_face = (10, 10, 80, 80)
+        result = detect_faces(_jpeg_bytes(), ACCURATE)
+        assert result.face_count == 2
+        assert result.face_box is None
+
+
+class TestFaceTracker:
+    """Tests for the per-session FaceTracker."""
+
+    def test_no_roi_before_first_face(self):
+        assert FaceTracker().roi_for("s1", BALANCED) is None
+
+    def test_padded_roi_after_full_scan(self):
+        tracker = FaceTracker(full_scan_interval=5, padding=0.5)
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(100, 50, 40, 40)))
+        assert tracker.roi_for("s1", BALANCED) == (80, 30, 80, 80)
+
+    def test_forces_periodic_full_scan(self):
+        tracker = FaceTracker(full_scan_interval=3)
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        rois = []
+        for _ in range(4):
+            roi = tracker.roi_for("s1", BALANCED)
+            rois.append(roi)
+            scan = "full" if roi is None else "roi"
+            tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40), scan=scan))
+        assert [roi is None for roi in rois] == [False, False, True, False]
+
+    def test_lost_face_triggers_full_scan(self):
+        tracker = FaceTracker()
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=0))
+        assert tracker.roi_for("s1", BALANCED) is None
+
+    def test_profile_change_resets_track(self):
+        tracker = FaceTracker()
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        assert tracker.roi_for("s1", ACCURATE) is None
+
+    def test_errors_are_ignored(self):
+        tracker = FaceTracker()
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=None, error="Invalid image"))
+        assert tracker.roi_for("s1", BALANCED) is not None
+
+    def test_disabled_tracker(self):
+        tracker = FaceTracker(enabled=False)
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        assert tracker.roi_for("s1", BALANCED) is None
+
+    def test_forget(self):
+        tracker = FaceTracker()
+        tracker.observe("s1", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        tracker.forget("s1")
+        assert tracker.roi_for("s1", BALANCED) is None
+
+
+class TestSessionEndForgetsTracking:
+    """Tests that ending or deleting a session drops its tracking state."""
+
+    @pytest.mark.parametrize(
+        "method, path, body",
+        [
+            ("post", "/api/sessions/session-001/terminate", None),
+            ("post", "/api/sessions/session-001/submit", {"answers": {}}),
+            ("delete", "/api/sessions/session-001", None),
+        ],
+    )
+    def test_session_end_forgets_track(self, client_with_session, method, path, body):
+        from backend.app.face_tracking import face_tracker
+
+        face_tracker.observe("session-001", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        response = client_with_session.request(method, path, json=body)
+        assert response.status_code == 200
+        assert face_tracker.roi_for("session-001", BALANCED) is None
+
+    def test_frame_termination_forgets_track(self, mock_db_with_session):
+        from backend.app.face_tracking import face_tracker
+        from backend.app.routes.monitoring_routes import _apply_session_policy
+
+        face_tracker.observe("session-001", BALANCED, DetectionResult(face_count=1, face_box=(10, 10, 40, 40)))
+        assert _apply_session_policy("session-001", face_count=2, db=mock_db_with_session)["status"] == "Terminated"
+        assert face_tracker.roi_for("session-001", BALANCED) is None
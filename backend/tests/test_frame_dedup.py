@@ -0,0 +1,169 @@
+"""
+Unit tests for perceptual-hash duplicate frame skipping.
+
+Covers: dHash computation, worker-side duplicate detection, and the per-session deduplicator.
+"""
+
+import cv2
+import numpy as np
+
+from backend.app.face_detection import (
+    DETECTION_PROFILES,
+    DetectionResult,
+    FrameHints,
+    detect_faces,
+    difference_hash,
+    hamming_distance,
+)
+from backend.app.frame_dedup import FrameDeduplicator
+
+ACCURATE = DETECTION_PROFILES["accurate"]
+BALANCED = DETECTION_PROFILES["balanced"]
+
+
+def _gradient_frame(shift=0):
+    """Horizontal gradient whose brightness ramp can be shifted to simulate movement."""
+    ramp = np.tile(np.linspace(0, 255, 640, dtype=np.uint8), (480, 1))
+    return np.roll(ramp, shift, axis=1)
+
+
+def _jpeg_bytes(gray):
+    _, buffer = cv2.imencode(".jpg", cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    return buffer.tobytes()
+
+
+class TestDifferenceHash:
+    """Tests for dHash and Hamming distance helpers."""
+
+    def test_identical_frames_hash_equal(self):
+        assert difference_hash(_gradient_frame()) == difference_hash(_gradient_frame())
+
+    def test_different_frames_hash_apart(self):
+        a = difference_hash(_gradient_frame())
+        b = difference_hash(np.fliplr(_gradient_frame()))
+        assert hamming_distance(a, b) > 32
+
+    def test_hamming_distance(self):
+        assert hamming_distance(0b1011, 0b0001) == 2
+
+
+class TestWorkerDuplicateDetection:
+    """Tests for detect_faces with a reference hash."""
+
+    def test_result_carries_hash(self):
+        result = detect_faces(_jpeg_bytes(_gradient_frame()), ACCURATE)
+        assert result.frame_hash is not None
+        assert result.duplicate is False
+
+    def test_near_duplicate_skips_cascade(self):
+        reference = detect_faces(_jpeg_bytes(_gradient_frame()), ACCURATE).frame_hash
+        hints = FrameHints(reference_hash=reference, max_hash_distance=4)
+        result = detect_faces(_jpeg_bytes(_gradient_frame()), ACCURATE, hints)
+        assert result.duplicate is True
+        assert result.scan == "skipped"
+        assert result.face_count is None
+
+    def test_changed_frame_is_analysed(self):
+        reference = detect_faces(_jpeg_bytes(_gradient_frame()), ACCURATE).frame_hash
+        hints = FrameHints(reference_hash=reference, max_hash_distance=4)
+        result = detect_faces(_jpeg_bytes(np.fliplr(_gradient_frame())), ACCURATE, hints)
+        assert result.duplicate is False
+        assert result.face_count == 0
+
+
+class TestFrameDeduplicator:
+    """Tests for the per-session FrameDeduplicator."""
+
+    def test_no_reference_before_first_frame(self):
+        assert FrameDeduplicator().reference_hash("s1", BALANCED) is None
+
+    def test_duplicate_reuses_previous_verdict(self):
+        dedup = FrameDeduplicator()
+        analysed = DetectionResult(face_count=1, face_box=(1, 2, 3, 4), frame_hash=42)
+        assert dedup.resolve("s1", BALANCED, analysed) is analysed
+        assert dedup.reference_hash("s1", BALANCED) == 42
+
+        reused = dedup.resolve("s1", BALANCED, DetectionResult(face_count=None, frame_hash=43, duplicate=True))
+        assert reused.face_count == 1
+        assert reused.face_box == (1, 2, 3, 4)
+        assert reused.duplicate is True
+        assert dedup.stats()["hits"] == 1
+        assert dedup.stats()["misses"] == 1
+
+    def test_reuse_is_bounded(self):
+        dedup = FrameDeduplicator(max_reuse=2)
+        dedup.resolve("s1", BALANCED, DetectionResult(face_count=1, frame_hash=42))
+        for _ in range(2):
+            dedup.resolve("s1", BALANCED, DetectionResult(face_count=None, frame_hash=42, duplicate=True))
+        assert dedup.reference_hash("s1", BALANCED) is None
+
+    def test_expired_reference_requests_reanalysis(self):
+        dedup = FrameDeduplicator()
+        result = dedup.resolve("s1", BALANCED, DetectionResult(face_count=None, frame_hash=42, duplicate=True))
+        assert result.duplicate is True
+        assert result.face_count is None
+
+    def test_profile_change_invalidates_reference(self):
+        dedup = FrameDeduplicator()
+        dedup.resolve("s1", BALANCED, DetectionResult(face_count=1, frame_hash=42))
+        assert dedup.reference_hash("s1", ACCURATE) is None
+
+    def test_errors_are_not_counted(self):
+        dedup = FrameDeduplicator()
+        dedup.resolve("s1", BALANCED, DetectionResult(face_count=None, error="Invalid image"))
+        assert dedup.stats()["misses"] == 0
+
+    def test_disabled(self):
+        dedup = FrameDeduplicator(enabled=False)
+        dedup.resolve("s1", BALANCED, DetectionResult(face_count=1, frame_hash=42))
+        assert dedup.reference_hash("s1", BALANCED) is None
+        assert dedup.stats()["misses"] == 0
+
+
+class TestDuplicateFramesThroughApi:
+    """End-to-end checks through the binary frame endpoint."""
+
+    def test_repeated_frame_is_a_cache_hit(self, client_with_session, monkeypatch):
+        from backend.app.routes import monitoring_routes
+
+        # The faceless frame would terminate the session, which drops its reference frame
+        monkeypatch.setattr(
+            monitoring_routes,
+            "_apply_session_policy",
+            lambda session_id, face_count, db, *args: {"status": "Active", "face_count": face_count, "reason": None},
+        )
+        frame = _jpeg_bytes(_gradient_frame())
+        headers = {"Content-Type": "image/jpeg"}
+        first = client_with_session.post("/api/analyze_frame/session-001", content=frame, headers=headers).json()
+        stats = client_with_session.get("/api/monitoring/stats").json()["frame_dedup"]
+        assert stats["misses"] == 1
+
+        second = client_with_session.post("/api/analyze_frame/session-001", content=frame, headers=headers).json()
+        assert second["face_count"] == first["face_count"]
+        stats = client_with_session.get("/api/monitoring/stats").json()["frame_dedup"]
+        assert stats["hits"] == 1
+        assert stats["tracked_sessions"] == 1
+
+    def test_frame_termination_forgets_reference(self, client_with_session):
+        from backend.app.frame_dedup import frame_deduplicator
+
+        frame = _jpeg_bytes(_gradient_frame())
+        verdict = client_with_session.post(
+            "/api/analyze_frame/session-001", content=frame, headers={"Content-Type": "image/jpeg"}
+        ).json()
+        assert verdict["status"] == "Terminated"
+        assert frame_deduplicator.stats()["tracked_sessions"] == 0
+
+    def test_deleted_session_forgets_reference(self, client_with_session, mock_db_with_session):
+        from backend.app.frame_dedup import frame_deduplicator
+
+        # Frames of an already terminated session are still analysed and remembered
+        mock_db_with_session.collection("sessions").document("session-001").update({"status": "Terminated"})
+        frame = _jpeg_bytes(_gradient_frame())
+        client_with_session.post(
+            "/api/analyze_frame/session-001", content=frame, headers={"Content-Type": "image/jpeg"}
+        )
+        assert frame_deduplicator.stats()["tracked_sessions"] == 1
+
+        client_with_session.delete("/api/sessions/session-001")
+        assert frame_deduplicator.stats()["tracked_sessions"] == 0
@@ -2,6 +2,8 @@
 Unit tests for the live session heartbeat and latency drift endpoint.
 """
 
+from unittest.mock import patch
+
 
 class TestSessionHeartbeat:
     """Tests for POST /api/sessions/{session_id}/heartbeat."""
@@ -58,3 +60,34 @@ class TestSessionHeartbeat:
             },
         )
         assert response.status_code == 404
+
+    def test_repeated_heartbeats_coalesced(self, client, mock_db):
+        session_ref = mock_db.collection("sessions").document("sess_hb3")
+        session_ref.set({"status": "Active", "trust_score": 100})
+
+        for _ in range(3):
+            client.post("/api/sessions/sess_hb3/heartbeat", json={"tab_focused": False})
+
+        logs = list(session_ref.collection("logs").stream())
+        assert len(logs) == 1
+        assert session_ref.get().to_dict()["tab_focused"] is False
+
+        with patch.object(session_ref, "update", side_effect=AssertionError("heartbeat should be coalesced")):
+            response = client.post("/api/sessions/sess_hb3/heartbeat", json={"tab_focused": False})
+        assert response.status_code == 200
+
+        client.post("/api/sessions/sess_hb3/heartbeat", json={"tab_focused": True})
+        logs = [doc.to_dict() for doc in session_ref.collection("logs").stream()]
+        assert len(logs) == 2
+        assert "duration_seconds" in logs[1]
+        assert session_ref.get().to_dict()["tab_focused"] is True
+
+    def test_heartbeat_after_completion_not_tracked(self, client, mock_db):
+        from backend.app.presence import presence_table
+
+        mock_db.collection("sessions").document("sess_hb4").set({"status": "Completed"})
+
+        response = client.post("/api/sessions/sess_hb4/heartbeat", json={"tab_focused": False})
+        assert response.status_code == 200
+        assert presence_table.get("sess_hb4") is None
+        assert list(mock_db.collection("sessions").document("sess_hb4").collection("logs").stream()) == []
@@ -0,0 +1,137 @@
+"""
+Tests for the live proctor feed.
+
+Covers: the active-session index, deltas published by the session routes,
+and the GET /api/live_feed stream.
+"""
+
+import asyncio
+import json
+
+from backend.app.live_feed import LIVE_FEED_TOPIC, ActiveSessionIndex, active_sessions
+
+
+def _deltas(queue):
+    return [queue.get_nowait() for _ in range(queue.qsize())]
+
+
+def _record_deltas(action):
+    """Run a blocking action and return the live feed deltas it published."""
+
+    async def scenario():
+        queue = active_sessions.events.subscribe(LIVE_FEED_TOPIC)
+        await asyncio.to_thread(action)
+        await asyncio.sleep(0)
+        return _deltas(queue)
+
+    return asyncio.run(scenario())
+
+
+class TestActiveSessionIndex:
+    """Tests for ActiveSessionIndex."""
+
+    def test_loads_active_sessions(self, mock_db_with_session):
+        mock_db_with_session.collection("sessions").document("done").set({"status": "Completed"})
+        index = ActiveSessionIndex()
+        index.ensure_loaded(mock_db_with_session)
+        assert [row["id"] for row in index.snapshot()] == ["session-001"]
+        assert index.snapshot()[0]["trust_score"] == 100
+
+    def test_ignores_changes_before_loading(self):
+        index = ActiveSessionIndex()
+        index.track("s1", {"status": "Active"})
+        assert index.snapshot() == []
+
+    def test_status_change_removes_session(self, mock_db_with_session):
+        index = ActiveSessionIndex()
+        index.ensure_loaded(mock_db_with_session)
+
+        async def scenario():
+            queue = index.events.subscribe(LIVE_FEED_TOPIC)
+            index.apply("session-001", {"trust_score": 90, "score": 3})
+            index.apply("session-001", {"trust_score": 90})
+            index.apply("session-001", {"status": "Terminated"})
+            await asyncio.sleep(0)
+            return _deltas(queue)
+
+        deltas = asyncio.run(scenario())
+        assert [d["type"] for d in deltas] == ["upsert", "remove"]
+        assert deltas[0]["session"]["trust_score"] == 90
+        assert index.snapshot() == []
+
+    def test_resync_publishes_differences(self, mock_db_with_session):
+        index = ActiveSessionIndex(resync_seconds=0)
+        index.ensure_loaded(mock_db_with_session)
+        sessions = mock_db_with_session.collection("sessions")
+        sessions.document("session-001").update({"status": "Completed"})
+        sessions.document("session-002").set({"status": "Active", "student_name": "B"})
+
+        async def scenario():
+            queue = index.events.subscribe(LIVE_FEED_TOPIC)
+            index.ensure_loaded(mock_db_with_session)
+            await asyncio.sleep(0)
+            return _deltas(queue)
+
+        deltas = asyncio.run(scenario())
+        assert {"type": "remove", "id": "session-001"} in deltas
+        assert any(d["type"] == "upsert" and d["session"]["id"] == "session-002" for d in deltas)
+
+
+class TestRoutesUpdateIndex:
+    """Tests that session routes keep the index current."""
+
+    def test_violation_and_termination(self, client_with_session, mock_db_with_session):
+        active_sessions.ensure_loaded(mock_db_with_session)
+        deltas = _record_deltas(
+            lambda: client_with_session.post(
+                "/api/sessions/session-001/log", json={"message": "Tab switch", "timestamp": "2026-01-01T00:00:00"}
+            )
+        )
+        assert deltas[0]["session"]["latest_log"] == "Tab switch"
+        assert deltas[0]["session"]["trust_score"] == 90
+
+        deltas = _record_deltas(lambda: client_with_session.post("/api/sessions/session-001/terminate"))
+        assert deltas == [{"type": "remove", "id": "session-001"}]
+
+    def test_created_session_added(self, client_with_session, mock_db_with_session):
+        active_sessions.ensure_loaded(mock_db_with_session)
+        payload = {
+            "studentId": "student-002",
+            "student_name": "New Student",
+            "examId": "exam-001",
+            "examTitle": "Test Exam",
+            "exam_type": "University",
+        }
+        deltas = _record_deltas(lambda: client_with_session.post("/api/sessions", json=payload))
+        assert deltas[0]["type"] == "upsert"
+        assert deltas[0]["session"]["student_name"] == "New Student"
+        assert len(active_sessions.snapshot()) == 2
+
+    def test_deleted_session_removed(self, client_with_session, mock_db_with_session):
+        active_sessions.ensure_loaded(mock_db_with_session)
+        client_with_session.delete("/api/sessions/session-001")
+        assert active_sessions.snapshot() == []
+
+
+class TestLiveFeedStream:
+    """Tests for GET /api/live_feed"""
+
+    def test_snapshot_then_deltas(self, mock_db_with_session):
+        from backend.app.routes.session_routes import stream_live_feed
+
+        async def scenario():
+            response = await stream_live_feed(db=mock_db_with_session)
+            body = response.body_iterator
+            first = await anext(body)
+            active_sessions.apply("session-001", {"trust_score": 70})
+            second = await anext(body)
+            await body.aclose()
+            return response.media_type, first, second
+
+        media_type, first, second = asyncio.run(scenario())
+        assert media_type == "text/event-stream"
+        assert first.startswith("event: snapshot\n")
+        assert json.loads(first.split("data: ")[1])["sessions"][0]["id"] == "session-001"
+        assert second.startswith("event: upsert\n")
+        assert json.loads(second.split("data: ")[1])["trust_score"] == 70
+        assert active_sessions.events.subscriber_count() == 0
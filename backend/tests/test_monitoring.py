@@ -5,9 +5,11 @@ Covers: frame analysis, face detection edge cases, violation logging.
 """
 
 import base64
+from unittest.mock import MagicMock
 
 import cv2
 import numpy as np
+import pytest
 
 
 def _create_test_image(width=640, height=480, color=(128, 128, 128)):
@@ -130,3 +132,293 @@ class TestFrameDataValidation:
             "/api/analyze_frame", json={"session_id": "session-001", "image": oversized_data}
         )
         assert response.status_code == 422  # Pydantic validation error
+
+
+def _create_test_jpeg_bytes(color=(128, 128, 128)):
+    """Create a synthetic JPEG and return the raw encoded bytes."""
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[:] = color
+    _, buffer = cv2.imencode(".jpg", img)
+    return buffer.tobytes()
+
+
+class TestAnalyzeFrameBinary:
+    """Tests for POST /api/analyze_frame/{session_id}"""
+
+    def test_raw_octet_stream_frame(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            content=_create_test_jpeg_bytes(),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert "face_count" in data
+        assert data["status"] in ["Active", "Terminated"]
+
+    def test_multipart_frame(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            files={"frame": ("frame.jpg", _create_test_jpeg_bytes(), "image/jpeg")},
+        )
+        assert response.status_code == 200
+        assert "face_count" in response.json()
+
+    def test_multipart_missing_frame_field(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            files={"image": ("frame.jpg", _create_test_jpeg_bytes(), "image/jpeg")},
+        )
+        assert response.status_code == 422
+        assert response.json()["error"] == "INVALID_PAYLOAD"
+
+    def test_binary_matches_base64_verdict(self, client_with_session, mock_db_with_session):
+        """A black frame terminates the session the same way as the JSON endpoint."""
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            content=_create_test_jpeg_bytes(color=(0, 0, 0)),
+            headers={"Content-Type": "image/jpeg"},
+        )
+        data = response.json()
+        assert data["face_count"] == 0
+        assert data["status"] == "Terminated"
+        session_data = mock_db_with_session.collection("sessions").document("session-001")._data
+        assert session_data["status"] == "Terminated"
+
+    def test_binary_invalid_image(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            content=b"definitely not a jpeg",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "Error"
+
+    def test_binary_empty_body(self, client_with_session):
+        response = client_with_session.post("/api/analyze_frame/session-001", content=b"")
+        assert response.status_code == 200
+        assert response.json()["status"] == "Error"
+
+    def test_binary_oversized_payload_rejected(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            content=b"\xff" * (10 * 1024 * 1024 + 1),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 422
+
+
+class TestAnalyzeFrameStream:
+    """Tests for the /api/ws/analyze_frame/{session_id} WebSocket channel."""
+
+    def test_stream_returns_verdict_per_frame(self, client_with_session):
+        with client_with_session.websocket_connect("/api/ws/analyze_frame/session-001") as ws:
+            ws.send_bytes(_create_test_jpeg_bytes())
+            data = ws.receive_json()
+            assert "face_count" in data
+            assert data["status"] in ["Active", "Terminated"]
+
+    def test_stream_rejects_text_frames(self, client_with_session):
+        with client_with_session.websocket_connect("/api/ws/analyze_frame/session-001") as ws:
+            ws.send_text("hello")
+            data = ws.receive_json()
+            assert data["status"] == "Error"
+
+    def test_stream_invalid_image_keeps_connection_open(self, client_with_session):
+        with client_with_session.websocket_connect("/api/ws/analyze_frame/session-001") as ws:
+            ws.send_bytes(b"not an image")
+            assert ws.receive_json()["status"] == "Error"
+            ws.send_bytes(b"still not an image")
+            assert ws.receive_json()["status"] == "Error"
+
+    def test_stream_closes_on_termination(self, client_with_session, mock_db_with_session):
+        from starlette.websockets import WebSocketDisconnect
+
+        with client_with_session.websocket_connect("/api/ws/analyze_frame/session-001") as ws:
+            ws.send_bytes(_create_test_jpeg_bytes(color=(0, 0, 0)))
+            data = ws.receive_json()
+            assert data["status"] == "Terminated"
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                ws.receive_json()
+            assert exc_info.value.code == 1000
+
+        session_data = mock_db_with_session.collection("sessions").document("session-001")._data
+        assert session_data["status"] == "Terminated"
+
+
+class TestAnalyzeFramesBatch:
+    """Tests for POST /api/analyze_frames"""
+
+    def test_verdicts_in_request_order(self, client_with_session, mock_db_with_session):
+        mock_db_with_session.collection("sessions").document("session-002").set({"status": "Active"})
+        frames = [
+            {"session_id": "session-001", "image": _create_test_image(color=(0, 0, 0))},
+            {"session_id": "session-002", "image": _create_test_image(color=(0, 0, 0)), "profile": "accurate"},
+        ]
+        response = client_with_session.post("/api/analyze_frames", json={"frames": frames})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["session_id"] for r in results] == ["session-001", "session-002"]
+        assert all(r["status"] == "Terminated" for r in results)
+        assert results[1]["profile"] == "accurate"
+
+    def test_terminations_committed_in_one_batch(self, client_with_session, mock_db_with_session, monkeypatch):
+        mock_db_with_session.collection("sessions").document("session-002").set({"status": "Active"})
+        commits = []
+        original_batch = mock_db_with_session.batch
+
+        def counting_batch():
+            batch = original_batch()
+            original_commit = batch.commit
+            batch.commit = lambda: commits.append(len(batch)) or original_commit()
+            return batch
+
+        monkeypatch.setattr(mock_db_with_session, "batch", counting_batch)
+        frames = [
+            {"session_id": session_id, "image": _create_test_image(color=(0, 0, 0))}
+            for session_id in ("session-001", "session-002")
+        ]
+        client_with_session.post("/api/analyze_frames", json={"frames": frames})
+
+        assert commits == [4]
+        for session_id in ("session-001", "session-002"):
+            session_ref = mock_db_with_session.collection("sessions").document(session_id)
+            assert session_ref._data["status"] == "Terminated"
+            assert len(list(session_ref.collection("logs").stream())) == 1
+
+    def test_repeated_session_sees_earlier_termination(self, client_with_session, mock_db_with_session):
+        frames = [{"session_id": "session-001", "image": _create_test_image(color=(0, 0, 0))}] * 2
+        results = client_with_session.post("/api/analyze_frames", json={"frames": frames}).json()["results"]
+        assert results[0]["reason"] == results[1]["reason"]
+        logs = mock_db_with_session.collection("sessions").document("session-001").collection("logs")
+        assert len(list(logs.stream())) == 1
+
+    def test_failed_commit_returns_errors_without_publishing(
+        self, client_with_session, mock_db_with_session, monkeypatch
+    ):
+        from backend.app.routes import monitoring_routes
+
+        published = []
+        original_batch = mock_db_with_session.batch
+
+        def failing_batch():
+            batch = original_batch()
+            batch.commit = MagicMock(side_effect=RuntimeError("commit failed"))
+            return batch
+
+        monkeypatch.setattr(mock_db_with_session, "batch", failing_batch)
+        monkeypatch.setattr(monitoring_routes, "update_session_state", lambda sid, fields: published.append(sid))
+        frames = [{"session_id": "session-001", "image": _create_test_image(color=(0, 0, 0))}] * 2
+        results = client_with_session.post("/api/analyze_frames", json={"frames": frames}).json()["results"]
+
+        assert [r["status"] for r in results] == ["Error", "Error"]
+        assert all("reason" not in r for r in results)
+        assert published == []
+        assert mock_db_with_session.collection("sessions").document("session-001")._data["status"] == "Active"
+
+    def test_buffered_writes_survive_failed_termination(self, client_with_session, mock_db_with_session, monkeypatch):
+        from backend.app.write_buffer import session_write_buffer
+
+        monkeypatch.setattr(session_write_buffer, "flush_interval", 60)
+        session_write_buffer.add_log(mock_db_with_session, "session-001", {"message": "tab switch"})
+        original_batch = mock_db_with_session.batch
+        batches = []
+
+        def failing_termination_batch():
+            batch = original_batch()
+            batches.append(batch)
+            # The frame batch holding the termination is created before the session's flush
+            if len(batches) == 1:
+                batch.commit = MagicMock(side_effect=RuntimeError("commit failed"))
+            return batch
+
+        monkeypatch.setattr(mock_db_with_session, "batch", failing_termination_batch)
+        frames = [{"session_id": "session-001", "image": _create_test_image(color=(0, 0, 0))}]
+        client_with_session.post("/api/analyze_frames", json={"frames": frames})
+
+        logs = mock_db_with_session.collection("sessions").document("session-001").collection("logs")
+        assert [log.to_dict()["message"] for log in logs.stream()] == ["tab switch"]
+
+    def test_invalid_frame_does_not_fail_batch(self, client_with_session):
+        frames = [
+            {"session_id": "session-001", "image": "not-valid-base64!!!"},
+            {"session_id": "session-001", "image": _create_test_image()},
+        ]
+        results = client_with_session.post("/api/analyze_frames", json={"frames": frames}).json()["results"]
+        assert results[0]["status"] == "Error"
+        assert results[1]["status"] in ["Active", "Terminated"]
+
+    def test_empty_batch_rejected(self, client_with_session):
+        response = client_with_session.post("/api/analyze_frames", json={"frames": []})
+        assert response.status_code == 422
+
+    def test_oversized_batch_rejected(self, client_with_session):
+        from backend.app.routes.monitoring_routes import MAX_BATCH_FRAMES
+
+        frames = [{"session_id": "session-001", "image": "x"}] * (MAX_BATCH_FRAMES + 1)
+        response = client_with_session.post("/api/analyze_frames", json={"frames": frames})
+        assert response.status_code == 422
+
+
+class TestDetectionBackpressure:
+    """Tests for how saturated detection capacity surfaces to clients."""
+
+    def test_overloaded_engine_returns_503(self, client_with_session, monkeypatch):
+        from backend.app.face_detection import DetectionOverloadedError, detection_engine
+
+        async def overloaded(buffer, profile=None, hints=None):
+            raise DetectionOverloadedError(capacity=1)
+
+        monkeypatch.setattr(detection_engine, "detect", overloaded)
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001",
+            content=_create_test_jpeg_bytes(),
+            headers={"Content-Type": "image/jpeg"},
+        )
+        assert response.status_code == 503
+        assert response.json()["error"] == "DETECTION_OVERLOADED"
+
+
+class TestDetectionProfileSelection:
+    """Tests for per-request detection profile overrides."""
+
+    def test_default_profile_reported(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame", json={"session_id": "session-001", "image": _create_test_image()}
+        )
+        assert response.json()["profile"] == "accurate"
+
+    def test_json_profile_override(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame",
+            json={"session_id": "session-001", "image": _create_test_image(), "profile": "accurate"},
+        )
+        assert response.json()["profile"] == "accurate"
+
+    def test_json_unknown_profile_rejected(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame",
+            json={"session_id": "session-001", "image": _create_test_image(), "profile": "turbo"},
+        )
+        assert response.status_code == 422
+
+    def test_binary_profile_override(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001?profile=fast",
+            content=_create_test_jpeg_bytes(),
+            headers={"Content-Type": "image/jpeg"},
+        )
+        assert response.json()["profile"] == "fast"
+
+    def test_binary_unknown_profile_rejected(self, client_with_session):
+        response = client_with_session.post(
+            "/api/analyze_frame/session-001?profile=turbo",
+            content=_create_test_jpeg_bytes(),
+            headers={"Content-Type": "image/jpeg"},
+        )
+        assert response.status_code == 422
+        assert response.json()["error"] == "INVALID_PAYLOAD"
+
+    def test_stream_unknown_profile_closes(self, client_with_session):
+        with client_with_session.websocket_connect("/api/ws/analyze_frame/session-001?profile=turbo") as ws:
+            assert ws.receive_json()["status"] == "Error"
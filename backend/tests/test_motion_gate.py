@@ -0,0 +1,144 @@
+"""
+Unit tests for motion-gated frame analysis.
+
+Covers: thumbnail differencing, worker-side still-frame detection, and the per-session motion gate.
+"""
+
+import cv2
+import numpy as np
+
+from backend.app.face_detection import (
+    DETECTION_PROFILES,
+    DetectionResult,
+    FrameHints,
+    detect_faces,
+    motion_score,
+    motion_thumbnail,
+)
+from backend.app.frame_dedup import FrameDeduplicator
+from backend.app.motion_gate import MotionGate, motion_gate
+
+ACCURATE = DETECTION_PROFILES["accurate"]
+BALANCED = DETECTION_PROFILES["balanced"]
+
+
+def _frame(value=128):
+    return np.full((480, 640), value, dtype=np.uint8)
+
+
+def _jpeg_bytes(gray):
+    _, buffer = cv2.imencode(".jpg", cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    return buffer.tobytes()
+
+
+class TestMotionScore:
+    """Tests for thumbnail differencing helpers."""
+
+    def test_identical_frames_score_zero(self):
+        assert motion_score(motion_thumbnail(_frame()), motion_thumbnail(_frame())) == 0.0
+
+    def test_brightness_change_scores_difference(self):
+        assert motion_score(motion_thumbnail(_frame(100)), motion_thumbnail(_frame(140))) == 40.0
+
+    def test_mismatched_thumbnails_always_move(self):
+        assert motion_score(b"\x00" * 4, b"\x00" * 8) == float("inf")
+
+
+class TestWorkerStillDetection:
+    """Tests for detect_faces with a reference thumbnail."""
+
+    def test_still_frame_skips_cascade(self):
+        reference = detect_faces(_jpeg_bytes(_frame()), ACCURATE).thumbnail
+        hints = FrameHints(reference_thumbnail=reference, motion_threshold=8.0)
+        result = detect_faces(_jpeg_bytes(_frame()), ACCURATE, hints)
+        assert result.scan == "still"
+        assert result.face_count is None
+        assert result.motion_score is not None and result.motion_score < 8.0
+
+    def test_moving_frame_is_analysed(self):
+        reference = detect_faces(_jpeg_bytes(_frame(40)), ACCURATE).thumbnail
+        hints = FrameHints(reference_thumbnail=reference, motion_threshold=8.0)
+        result = detect_faces(_jpeg_bytes(_frame(200)), ACCURATE, hints)
+        assert result.scan == "full"
+        assert result.face_count == 0
+
+
+class TestMotionGate:
+    """Tests for the per-session MotionGate."""
+
+    def test_disabled_in_every_frame_mode(self):
+        gate = MotionGate(mode="every_frame")
+        gate.resolve("s1", BALANCED, DetectionResult(face_count=1, thumbnail=b"a"))
+        assert gate.reference_thumbnail("s1", BALANCED) is None
+        assert gate.stats()["analysed"] == 0
+
+    def test_still_frame_reuses_last_verdict(self):
+        gate = MotionGate(mode="motion_gated")
+        analysed = DetectionResult(face_count=2, face_box=None, thumbnail=b"a")
+        assert gate.resolve("s1", BALANCED, analysed) is analysed
+        assert gate.reference_thumbnail("s1", BALANCED) == b"a"
+
+        still = gate.resolve("s1", BALANCED, DetectionResult(face_count=None, scan="still", thumbnail=b"b"))
+        assert still.face_count == 2
+        assert still.scan == "still"
+        assert gate.reference_thumbnail("s1", BALANCED) == b"b"
+        assert gate.stats() == {"mode": "motion_gated", "gated": 1, "analysed": 1, "gated_rate": 0.5}
+
+    def test_max_interval_forces_analysis(self):
+        gate = MotionGate(mode="motion_gated", max_interval_seconds=0)
+        gate.resolve("s1", BALANCED, DetectionResult(face_count=1, thumbnail=b"a"))
+        assert gate.reference_thumbnail("s1", BALANCED) is None
+
+    def test_expired_verdict_requests_reanalysis(self):
+        gate = MotionGate(mode="motion_gated")
+        result = gate.resolve("s1", BALANCED, DetectionResult(face_count=None, scan="still", thumbnail=b"a"))
+        assert result.face_count is None
+        assert gate.reference_thumbnail("s1", BALANCED) is None
+
+    def test_duplicate_frame_becomes_motion_reference(self):
+        dedup = FrameDeduplicator()
+        gate = MotionGate(mode="motion_gated")
+        analysed = DetectionResult(face_count=1, frame_hash=42, thumbnail=b"a")
+        gate.resolve("s1", BALANCED, dedup.resolve("s1", BALANCED, analysed))
+
+        duplicate = DetectionResult(face_count=None, frame_hash=43, thumbnail=b"b", scan="skipped", duplicate=True)
+        gate.resolve("s1", BALANCED, dedup.resolve("s1", BALANCED, duplicate))
+        assert gate.reference_thumbnail("s1", BALANCED) == b"b"
+
+    def test_profile_change_invalidates_reference(self):
+        gate = MotionGate(mode="motion_gated")
+        gate.resolve("s1", BALANCED, DetectionResult(face_count=1, thumbnail=b"a"))
+        assert gate.reference_thumbnail("s1", ACCURATE) is None
+
+
+class TestMotionGateThroughApi:
+    """End-to-end checks through the binary frame endpoint."""
+
+    def test_repeated_frame_is_gated_before_dedup(self, client_with_session, monkeypatch):
+        from backend.app.routes import monitoring_routes
+
+        monkeypatch.setattr(motion_gate, "mode", "motion_gated")
+        # The faceless frame would terminate the session, which drops its motion state
+        monkeypatch.setattr(
+            monitoring_routes,
+            "_apply_session_policy",
+            lambda session_id, face_count, db, *args: {"status": "Active", "face_count": face_count, "reason": None},
+        )
+        headers = {"Content-Type": "image/jpeg"}
+        frame = _jpeg_bytes(_frame(40))
+        client_with_session.post("/api/analyze_frame/session-001", content=frame, headers=headers)
+        verdict = client_with_session.post("/api/analyze_frame/session-001", content=frame, headers=headers).json()
+        stats = client_with_session.get("/api/monitoring/stats").json()["motion_gate"]
+        assert stats["analysed"] == 1
+        assert stats["gated"] == 1
+        assert verdict["face_count"] == 0
+        assert client_with_session.get("/api/monitoring/stats").json()["frame_dedup"]["hits"] == 0
+
+    def test_frame_termination_forgets_motion_state(self, client_with_session, monkeypatch):
+        monkeypatch.setattr(motion_gate, "mode", "motion_gated")
+        frame = _jpeg_bytes(_frame(40))
+        verdict = client_with_session.post(
+            "/api/analyze_frame/session-001", content=frame, headers={"Content-Type": "image/jpeg"}
+        ).json()
+        assert verdict["status"] == "Terminated"
+        assert motion_gate.reference_thumbnail("session-001", ACCURATE) is None
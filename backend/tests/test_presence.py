@@ -0,0 +1,148 @@
+"""
+Tests for the in-memory heartbeat presence table and stale-heartbeat sweep.
+"""
+
+from unittest.mock import patch
+
+from backend.app.presence import DISCONNECTED, FOCUS_LOST_MESSAGE, PresenceTable
+
+
+def _record(table, at, session_id="s1", **kwargs):
+    kwargs.setdefault("tab_focused", True)
+    with patch("backend.app.presence.time.monotonic", return_value=at):
+        return table.record(None, session_id, **kwargs)
+
+
+class TestPresenceTable:
+    def test_first_heartbeat_is_written(self):
+        table = PresenceTable(write_interval=30)
+        outcome = _record(table, 100.0, clock_drift_seconds=0.5, battery_level=0.9)
+        assert outcome.fields["tab_focused"] is True
+        assert outcome.fields["clock_drift_seconds"] == 0.5
+        assert outcome.fields["battery_level"] == 0.9
+        assert outcome.logs == []
+
+    def test_writes_throttled_to_interval(self):
+        table = PresenceTable(write_interval=30)
+        _record(table, 100.0)
+        assert _record(table, 110.0).fields is None
+        assert _record(table, 129.0).fields is None
+        due = _record(table, 130.0, battery_level=0.4)
+        assert due.fields is not None
+        assert due.fields["battery_level"] == 0.4
+        stats = table.stats()
+        assert (stats["heartbeats"], stats["writes"]) == (4, 2)
+
+    def test_focus_loss_logged_once_with_duration_on_return(self):
+        table = PresenceTable(write_interval=30)
+        _record(table, 100.0)
+
+        lost = _record(table, 105.0, tab_focused=False)
+        assert lost.fields["tab_focused"] is False
+        assert [entry["message"] for entry in lost.logs] == [FOCUS_LOST_MESSAGE]
+
+        still_lost = _record(table, 110.0, tab_focused=False)
+        assert still_lost.logs == []
+        assert still_lost.fields is None
+
+        restored = _record(table, 117.5, tab_focused=True)
+        assert restored.fields["tab_focused"] is True
+        [entry] = restored.logs
+        assert entry["duration_seconds"] == 12.5
+        assert entry["unfocused_since"] == lost.logs[0]["timestamp"]
+        assert {log["severity"] for log in (*lost.logs, entry)} == {"Info"}
+
+    def test_unfocused_first_heartbeat_logs_loss(self):
+        table = PresenceTable()
+        outcome = _record(table, 100.0, tab_focused=False)
+        assert [entry["message"] for entry in outcome.logs] == [FOCUS_LOST_MESSAGE]
+
+    def test_forget(self):
+        table = PresenceTable()
+        _record(table, 100.0)
+        table.forget("s1")
+        assert table.get("s1") is None
+        assert _record(table, 101.0).fields is not None
+
+
+def _sweep(table, at, db=None):
+    with patch("backend.app.presence.time.monotonic", return_value=at):
+        return table.check_heartbeats(db) if db is not None else table.sweep()
+
+
+class TestStaleHeartbeatSweep:
+    def test_silent_session_flagged_once(self):
+        table = PresenceTable(timeout=60)
+        _record(table, 100.0)
+        assert _sweep(table, 159.0) == []
+
+        [(session_id, presence)] = _sweep(table, 160.0)
+        assert session_id == "s1"
+        assert presence.disconnected is True
+        assert _sweep(table, 500.0) == []
+        assert table.stats()["disconnected_sessions"] == 1
+
+    def test_heartbeats_push_deadline_back_without_heap_growth(self):
+        table = PresenceTable(timeout=60)
+        for at in range(100, 200, 5):
+            _record(table, float(at))
+        assert len(table._deadlines) == 1
+
+        # The original entry comes due but the session beat since; it is re-scheduled, not flagged.
+        assert _sweep(table, 160.0) == []
+        assert table._deadlines == [(255.0, "s1")]
+        assert [sid for sid, _ in _sweep(table, 255.0)] == ["s1"]
+
+    def test_only_due_entries_are_examined(self):
+        table = PresenceTable(timeout=60)
+        _record(table, 100.0, session_id="early")
+        _record(table, 150.0, session_id="late")
+        assert [sid for sid, _ in _sweep(table, 165.0)] == ["early"]
+        assert table._deadlines == [(210.0, "late")]
+
+    def test_reconnect_logs_offline_time(self):
+        table = PresenceTable(timeout=60, write_interval=300)
+        _record(table, 100.0)
+        _sweep(table, 170.0)
+
+        outcome = _record(table, 190.0)
+        assert outcome.fields["connection_status"] == "Connected"
+        [entry] = outcome.logs
+        assert entry["offline_seconds"] == 90.0
+        assert entry["severity"] == "Info"
+        assert table.get("s1").disconnected is False
+        assert [sid for sid, _ in _sweep(table, 250.0)] == ["s1"]
+
+    def test_forgotten_session_not_flagged(self):
+        table = PresenceTable(timeout=60)
+        _record(table, 100.0)
+        table.forget("s1")
+        assert _sweep(table, 200.0) == []
+
+    def test_disabled_timeout(self):
+        table = PresenceTable(timeout=0)
+        _record(table, 100.0)
+        assert table._deadlines == []
+        assert _sweep(table, 10_000.0) == []
+
+    def test_check_heartbeats_writes_disconnect(self, mock_db):
+        session_ref = mock_db.collection("sessions").document("s1")
+        session_ref.set({"status": "Active"})
+        table = PresenceTable(timeout=60)
+        _record(table, 100.0)
+
+        assert _sweep(table, 161.0, db=mock_db) == 1
+        assert session_ref.get().to_dict()["connection_status"] == DISCONNECTED
+        [log] = [doc.to_dict() for doc in session_ref.collection("logs").stream()]
+        assert log["message"] == "Heartbeat lost: no heartbeat for 61s"
+        assert log["severity"] == "Info"
+
+    def test_check_heartbeats_drops_finished_sessions(self, mock_db):
+        session_ref = mock_db.collection("sessions").document("s1")
+        session_ref.set({"status": "Completed"})
+        table = PresenceTable(timeout=60)
+        _record(table, 100.0)
+
+        assert _sweep(table, 161.0, db=mock_db) == 0
+        assert table.get("s1") is None
+        assert list(session_ref.collection("logs").stream()) == []
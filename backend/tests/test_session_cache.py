@@ -0,0 +1,144 @@
+"""
+Unit tests for the in-process TTL cache and cached session-state lookups.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from backend.app.cache import TTLCache
+from backend.app.session_cache import (
+    get_session_state,
+    get_session_state_async,
+    invalidate_session_state,
+    session_state_cache,
+    update_session_state,
+)
+
+
+class TestTTLCache:
+    """Tests for the generic TTLCache."""
+
+    def test_set_and_get(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert "a" in cache
+
+    def test_entries_expire(self):
+        cache = TTLCache(ttl_seconds=10)
+        with patch("backend.app.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("backend.app.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = TTLCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_zero_ttl_is_not_stored(self):
+        cache = TTLCache(ttl_seconds=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    def test_invalidate(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("a", 1)
+        cache.invalidate("a")
+        assert cache.get("a") is None
+
+
+class TestSessionStateCache:
+    """Tests for get_session_state and its write-through helpers."""
+
+    def test_miss_reads_firestore_once(self, mock_db_with_session):
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        with patch.object(session_ref, "get", wraps=session_ref.get) as spy:
+            first = get_session_state(mock_db_with_session, "session-001")
+            second = get_session_state(mock_db_with_session, "session-001")
+        assert first["status"] == "Active"
+        assert second == first
+        assert spy.call_count == 1
+
+    def test_missing_session_is_not_cached(self, mock_db):
+        assert get_session_state(mock_db, "missing") is None
+        assert "missing" not in session_state_cache
+
+    def test_returned_state_is_a_copy(self, mock_db_with_session):
+        state = get_session_state(mock_db_with_session, "session-001")
+        state["status"] = "Mutated"
+        assert get_session_state(mock_db_with_session, "session-001")["status"] == "Active"
+
+    def test_update_writes_through(self, mock_db_with_session):
+        get_session_state(mock_db_with_session, "session-001")
+        update_session_state("session-001", {"status": "Terminated", "latest_log": "ignored"})
+        state = get_session_state(mock_db_with_session, "session-001")
+        assert state["status"] == "Terminated"
+        assert "latest_log" not in state
+
+    def test_update_ignores_uncached_sessions(self):
+        update_session_state("never-read", {"status": "Terminated"})
+        assert "never-read" not in session_state_cache
+
+    def test_invalidate_forces_reread(self, mock_db_with_session):
+        get_session_state(mock_db_with_session, "session-001")
+        mock_db_with_session.collection("sessions").document("session-001").update({"trust_score": 50})
+        assert get_session_state(mock_db_with_session, "session-001")["trust_score"] == 100
+        invalidate_session_state("session-001")
+        assert get_session_state(mock_db_with_session, "session-001")["trust_score"] == 50
+
+
+class TestAsyncSessionState:
+    """Tests for get_session_state_async over an async Firestore client."""
+
+    def test_miss_reads_once_and_shares_cache(self, mock_db_with_session, async_db_with_session):
+        adb = async_db_with_session
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        with patch.object(session_ref, "get", wraps=session_ref.get) as spy:
+            first = asyncio.run(get_session_state_async(adb, "session-001"))
+            second = asyncio.run(get_session_state_async(adb, "session-001"))
+            third = get_session_state(mock_db_with_session, "session-001")
+        assert first["status"] == "Active"
+        assert second == first == third
+        assert spy.call_count == 1
+
+    def test_missing_session(self, async_db_with_session):
+        assert asyncio.run(get_session_state_async(async_db_with_session, "missing")) is None
+        assert "missing" not in session_state_cache
+
+
+class TestSessionRoutesUseCache:
+    """Integration checks that status-changing routes keep the cache coherent."""
+
+    def test_status_reflects_termination(self, client_with_session):
+        assert client_with_session.get("/api/sessions/session-001/status").json()["status"] == "Active"
+        client_with_session.post("/api/sessions/session-001/terminate", params={"reason": "Proctor"})
+        assert client_with_session.get("/api/sessions/session-001/status").json()["status"] == "Terminated"
+
+    def test_status_reflects_message(self, client_with_session):
+        client_with_session.get("/api/sessions/session-001/status")
+        client_with_session.post("/api/sessions/session-001/message", json={"message": "Eyes on screen"})
+        data = client_with_session.get("/api/sessions/session-001/status").json()
+        assert data["message"] == "Eyes on screen"
+        assert data["is_message_read"] is False
+
+    def test_consecutive_violations_accumulate(self, client_with_session, mock_db_with_session):
+        for _ in range(2):
+            client_with_session.post(
+                "/api/sessions/session-001/log",
+                json={"message": "Looking away", "timestamp": "2026-01-01T00:01:00"},
+            )
+        session_data = mock_db_with_session.collection("sessions").document("session-001")._data
+        assert session_data["trust_score"] == 80
+        assert client_with_session.get("/api/sessions/session-001/status").json()["trust_score"] == 80
+
+    def test_deleted_session_is_evicted(self, client_with_session):
+        client_with_session.get("/api/sessions/session-001/status")
+        client_with_session.delete("/api/sessions/session-001")
+        assert client_with_session.get("/api/sessions/session-001/status").status_code == 404
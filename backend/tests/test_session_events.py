@@ -0,0 +1,137 @@
+"""
+Tests for session change events and the status SSE stream.
+
+Covers: the in-process event broker, SSE encoding, keep-alives, and
+GET /api/sessions/{id}/events.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from backend.app.session_events import EventBroker, format_sse, session_events, stream_events
+
+
+def _read_events(response):
+    """Collect (event, data) pairs from an SSE response until the stream ends."""
+    events, name = [], None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            name = line[len("event: ") :]
+        elif line.startswith("data: "):
+            events.append((name, json.loads(line[len("data: ") :])))
+    return events
+
+
+class TestEventBroker:
+    """Tests for topic subscription and cross-thread publishing."""
+
+    def test_publish_from_another_thread(self):
+        broker = EventBroker()
+
+        async def scenario():
+            queue = broker.subscribe("s1")
+            thread = threading.Thread(target=broker.publish, args=("s1", {"status": "Terminated"}))
+            thread.start()
+            thread.join()
+            return await asyncio.wait_for(queue.get(), timeout=1)
+
+        assert asyncio.run(scenario()) == {"status": "Terminated"}
+
+    def test_other_topics_not_delivered(self):
+        broker = EventBroker()
+
+        async def scenario():
+            queue = broker.subscribe("s1")
+            broker.publish("s2", {"status": "Terminated"})
+            await asyncio.sleep(0)
+            return queue.empty()
+
+        assert asyncio.run(scenario())
+
+    def test_unsubscribe(self):
+        broker = EventBroker()
+
+        async def scenario():
+            queue = broker.subscribe("s1")
+            assert broker.subscriber_count("s1") == 1
+            broker.unsubscribe("s1", queue)
+            return broker.subscriber_count()
+
+        assert asyncio.run(scenario()) == 0
+
+    def test_keepalive_when_idle(self):
+        async def scenario():
+            queue: asyncio.Queue = asyncio.Queue()
+            events = stream_events(queue, keepalive_seconds=0.01)
+            return await anext(events)
+
+        assert asyncio.run(scenario()) is None
+
+    def test_format_sse(self):
+        assert format_sse("status", {"status": "Active"}) == 'event: status\ndata: {"status": "Active"}\n\n'
+
+
+class TestSessionStatusStream:
+    """Tests for GET /api/sessions/{id}/events"""
+
+    def test_unknown_session_404(self, client_with_session):
+        response = client_with_session.get("/api/sessions/missing/events")
+        assert response.status_code == 404
+
+    def test_finished_session_sends_snapshot_and_closes(self, client_with_session, mock_db_with_session):
+        mock_db_with_session.collection("sessions").document("session-001").update({"status": "Completed"})
+        with client_with_session.stream("GET", "/api/sessions/session-001/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = _read_events(response)
+        assert events == [
+            (
+                "status",
+                {
+                    "status": "Completed",
+                    "trust_score": 100,
+                    "score": None,
+                    "total_questions": None,
+                    "message": None,
+                    "is_message_read": None,
+                },
+            )
+        ]
+        assert session_events.subscriber_count() == 0
+
+    def test_pushes_changes_until_terminated(self, client_with_session):
+        def publish_once_subscribed():
+            # TestClient buffers the whole response, so changes are published from another thread
+            while session_events.subscriber_count("session-001") == 0:
+                time.sleep(0.01)
+            session_events.publish("session-001", {"current_message": "Eyes on screen", "is_message_read": False})
+            session_events.publish("session-001", {"status": "Terminated", "trust_score": 0})
+
+        publisher = threading.Thread(target=publish_once_subscribed, daemon=True)
+        publisher.start()
+        with client_with_session.stream("GET", "/api/sessions/session-001/events") as response:
+            events = _read_events(response)
+        publisher.join(timeout=1)
+
+        assert [event["status"] for _, event in events] == ["Active", "Active", "Terminated"]
+        assert events[1][1]["message"] == "Eyes on screen"
+        assert events[2][1]["trust_score"] == 0
+
+
+class TestRoutesPublishChanges:
+    """Tests that session routes publish to the status stream."""
+
+    def test_message_and_termination_published(self, client_with_session):
+        async def scenario():
+            queue = session_events.subscribe("session-001")
+            await asyncio.to_thread(
+                client_with_session.post, "/api/sessions/session-001/message", json={"message": "Hi"}
+            )
+            await asyncio.to_thread(client_with_session.post, "/api/sessions/session-001/terminate")
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        events = asyncio.run(scenario())
+        assert events[0] == {"current_message": "Hi", "is_message_read": False}
+        assert events[-1]["status"] == "Terminated"
@@ -5,6 +5,7 @@ Covers: create, get, list, submit, terminate, delete, logs, timing, messaging,
 and report generation.
 """
 
+import threading
 from unittest.mock import patch
 
 
@@ -142,6 +143,58 @@ class TestSubmitExam:
         assert data["message"] == "Exam submitted successfully"
         assert data["score"] == 1.0
 
+    def test_submit_counts_logs_with_aggregation(self, client, mock_db):
+        session_ref = mock_db.collection("sessions").document("sess-logs")
+        session_ref.set({"status": "Active", "trust_score": 70})
+        logs = session_ref.collection("logs")
+        for message in ("Tab switch", "Multiple faces", "Window blur"):
+            logs.add({"message": message})
+
+        with patch.object(logs, "stream", side_effect=AssertionError("logs must not be downloaded")):
+            response = client.post("/api/sessions/sess-logs/submit", json={"answers": {}})
+
+        assert response.status_code == 200
+        assert session_ref.get().to_dict()["cheat_score"] == 3
+
+    def test_submit_ignores_informational_logs(self, client, mock_db):
+        session_ref = mock_db.collection("sessions").document("sess-info")
+        session_ref.set({"status": "Active", "trust_score": 90})
+        logs = session_ref.collection("logs")
+        logs.add({"message": "Tab switch", "severity": "Medium"})
+        logs.add({"message": "Tab focus restored after 3.0s", "severity": "Info"})
+
+        client.post("/api/sessions/sess-info/submit", json={"answers": {}})
+        assert session_ref.get().to_dict()["cheat_score"] == 1
+
+    def test_submit_counts_logs_while_grading(self, client_with_exam, mock_db_with_session):
+        counted = threading.Event()
+        overlapped = []
+
+        def count_logs(db, session_id):
+            counted.set()
+            return 2
+
+        def grade(questions, answers):
+            # Grading only finishes early if the log count is already running alongside it
+            overlapped.append(counted.wait(timeout=5))
+            return {"score": 1, "total_questions": 2, "feedback": "ok"}
+
+        with (
+            patch("backend.app.routes.session_routes.count_session_logs", side_effect=count_logs),
+            patch("backend.app.ai_service.evaluate_exam_submission", side_effect=grade),
+        ):
+            response = client_with_exam.post("/api/sessions/session-001/submit", json={"answers": {"0": "1"}})
+
+        assert response.status_code == 200
+        assert overlapped == [True]
+        session = mock_db_with_session.collection("sessions").document("session-001").get().to_dict()
+        assert session["cheat_score"] == 2
+
+    def test_submit_log_count_failure(self, client_with_session):
+        with patch("backend.app.routes.session_routes.count_session_logs", side_effect=RuntimeError("unavailable")):
+            response = client_with_session.post("/api/sessions/session-001/submit", json={"answers": {}})
+        assert response.status_code == 500
+
 
 class TestTerminateExam:
     """Tests for POST /api/sessions/{session_id}/terminate"""
@@ -207,6 +260,81 @@ class TestSessionLogs:
         assert len(response.json()) >= 1
 
 
+class TestSessionLogPages:
+    """Pagination and filters for GET /api/sessions/{session_id}/logs"""
+
+    @staticmethod
+    def _seed_logs(mock_db):
+        logs = mock_db.collection("sessions").document("session-001").collection("logs")
+        for minute in range(1, 6):
+            logs.document(f"log-{minute}").set(
+                {
+                    "message": "Tab lost focus" if minute % 2 else "Multiple faces",
+                    "timestamp": f"2026-01-01T00:0{minute}:00",
+                    "severity": "Medium" if minute % 2 else "High",
+                }
+            )
+
+    def test_pages_newest_first(self, client_with_session, mock_db_with_session):
+        self._seed_logs(mock_db_with_session)
+
+        first = client_with_session.get("/api/sessions/session-001/logs?limit=2")
+        assert [log["id"] for log in first.json()] == ["log-5", "log-4"]
+
+        cursor = first.headers["X-Next-Cursor"]
+        second = client_with_session.get(f"/api/sessions/session-001/logs?limit=2&start_after={cursor}")
+        assert [log["id"] for log in second.json()] == ["log-3", "log-2"]
+
+        last = client_with_session.get(
+            f"/api/sessions/session-001/logs?limit=2&start_after={second.headers['X-Next-Cursor']}"
+        )
+        assert [log["id"] for log in last.json()] == ["log-1"]
+        assert "X-Next-Cursor" not in last.headers
+
+    def test_unpaginated_without_limit_or_cursor(self, client_with_session, mock_db_with_session):
+        from backend.app.routes.session_routes import LOGS_DEFAULT_PAGE_SIZE
+
+        logs = mock_db_with_session.collection("sessions").document("session-001").collection("logs")
+        for i in range(LOGS_DEFAULT_PAGE_SIZE + 5):
+            logs.document(f"log-{i:03d}").set({"message": "Tab switch", "timestamp": f"2026-01-01T00:00:{i:03d}"})
+
+        response = client_with_session.get("/api/sessions/session-001/logs")
+        assert len(response.json()) == LOGS_DEFAULT_PAGE_SIZE + 5
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_since_returns_only_newer_entries(self, client_with_session, mock_db_with_session):
+        self._seed_logs(mock_db_with_session)
+
+        response = client_with_session.get("/api/sessions/session-001/logs?since=2026-01-01T00:03:00")
+        assert [log["id"] for log in response.json()] == ["log-5", "log-4"]
+
+    def test_severity_filter(self, client_with_session, mock_db_with_session):
+        self._seed_logs(mock_db_with_session)
+
+        high = client_with_session.get("/api/sessions/session-001/logs?severity=High").json()
+        assert [log["id"] for log in high] == ["log-4", "log-2"]
+
+        both = client_with_session.get("/api/sessions/session-001/logs?severity=High&severity=Medium").json()
+        assert len(both) == 5
+
+    def test_severity_filter_includes_frame_terminations(self, client_with_session, mock_db_with_session):
+        from backend.app.routes.monitoring_routes import _apply_session_policy
+
+        self._seed_logs(mock_db_with_session)
+        verdict = _apply_session_policy("session-001", face_count=2, db=mock_db_with_session)
+        assert verdict["status"] == "Terminated"
+
+        high = client_with_session.get("/api/sessions/session-001/logs?severity=High").json()
+        assert [log["message"] for log in high if log["message"].startswith("Terminated:")] == [
+            "Terminated: Multiple faces detected (2)"
+        ]
+        assert all(log["severity"] == "High" for log in high)
+
+    def test_invalid_cursor(self, client_with_session):
+        response = client_with_session.get("/api/sessions/session-001/logs?start_after=bogus")
+        assert response.status_code == 422
+
+
 class TestSessionStatus:
     """Tests for GET /api/sessions/{session_id}/status"""
 
@@ -223,7 +351,7 @@ class TestSessionStatus:
 
 
 class TestQuestionTiming:
-    """Tests for POST /api/sessions/{session_id}/log-timing"""
+    """Tests for POST /api/sessions/{session_id}/log-timing and /log-timings"""
 
     def test_log_timing(self, client_with_session):
         response = client_with_session.post(
@@ -233,6 +361,60 @@ class TestQuestionTiming:
         assert response.status_code == 200
         assert response.json()["status"] == "saved"
 
+    def test_repeated_visits_accumulate(self, client_with_session, mock_db_with_session):
+        for duration in (45000, 15000):
+            client_with_session.post("/api/sessions/session-001/log-timing", json={"index": 2, "duration_ms": duration})
+
+        data = mock_db_with_session.collection("sessions").document("session-001").get().to_dict()
+        assert data["performance"] == {"2": 60000}
+        assert data["question_visits"] == {"2": 2}
+
+    def test_batch_merged_into_single_update(self, client_with_session, mock_db_with_session):
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        timings = [
+            {"index": 0, "duration_ms": 1000},
+            {"index": 1, "duration_ms": 2000},
+            {"index": 0, "duration_ms": 500},
+        ]
+
+        with patch.object(session_ref, "update", wraps=session_ref.update) as update:
+            response = client_with_session.post("/api/sessions/session-001/log-timings", json={"timings": timings})
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "saved", "questions": 2}
+        assert update.call_count == 1
+        data = session_ref.get().to_dict()
+        assert data["performance"] == {"0": 1500, "1": 2000}
+        assert data["question_visits"] == {"0": 2, "1": 1}
+
+    def test_buffered_timings_fold_into_one_write(self, mock_db_with_session):
+        from backend.app.routes.session_routes import QuestionTiming, _record_timings
+        from backend.app.write_buffer import session_write_buffer
+
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        with patch.object(session_write_buffer, "flush_interval", 60):
+            for index in (0, 1, 0):
+                _record_timings(mock_db_with_session, "session-001", [QuestionTiming(index=index, duration_ms=100)])
+            with patch.object(session_ref, "update", wraps=session_ref.update) as update:
+                session_write_buffer.flush(mock_db_with_session)
+        assert update.call_count == 1
+        assert session_ref.get().to_dict()["performance"] == {"0": 200, "1": 100}
+
+    def test_batch_validation(self, client_with_session):
+        assert (
+            client_with_session.post("/api/sessions/session-001/log-timings", json={"timings": []}).status_code == 422
+        )
+        too_many = [{"index": 0, "duration_ms": 1}] * 501
+        response = client_with_session.post("/api/sessions/session-001/log-timings", json={"timings": too_many})
+        assert response.status_code == 422
+        negative = [{"index": 0, "duration_ms": -5}]
+        response = client_with_session.post("/api/sessions/session-001/log-timings", json={"timings": negative})
+        assert response.status_code == 422
+
+    def test_timing_for_missing_session(self, client):
+        response = client.post("/api/sessions/missing/log-timings", json={"timings": [{"index": 0, "duration_ms": 1}]})
+        assert response.status_code == 404
+
 
 class TestMessaging:
     """Tests for session messaging endpoints."""
@@ -273,6 +455,57 @@ class TestBulkCreateSessions:
         data = response.json()
         assert "sessions" in data
         assert len(data["sessions"]) == 2
+        assert set(data["timing"]) == {"student_lookup_ms", "write_ms", "total_ms"}
+
+    def test_bulk_create_batches_student_lookups(self, client_with_students, mock_db_with_students, monkeypatch):
+        mock_db_with_students.collection("students").document("student-3").set({"full_name": "Carol", "course": "EE"})
+        lookups = []
+        original_get_all = mock_db_with_students.get_all
+
+        def recording_get_all(references, field_paths=None):
+            lookups.append(([ref.id for ref in references], field_paths))
+            return original_get_all(references, field_paths)
+
+        monkeypatch.setattr(mock_db_with_students, "get_all", recording_get_all)
+        response = client_with_students.post(
+            "/api/sessions/bulk",
+            json={
+                "studentIds": ["student-1", "student-2", "student-3", "ghost"],
+                "examId": "exam-001",
+                "examTitle": "Final Exam",
+                "exam_type": "University",
+            },
+        )
+
+        names = [s["student_name"] for s in response.json()["sessions"]]
+        assert names == ["Alice Smith", "Bob Jones", "Carol", "Unknown"]
+        assert [ids for ids, _ in lookups] == [["student-1", "student-2", "student-3", "ghost"], ["student-3", "ghost"]]
+        assert lookups[0][1] == ["full_name", "course", "class_name"]
+
+    def test_bulk_create_chunks_write_batches(self, client_with_students, mock_db_with_students, monkeypatch):
+        monkeypatch.setattr("backend.app.routes.session_routes.FIRESTORE_BATCH_LIMIT", 2)
+        batch_sizes = []
+        original_batch = mock_db_with_students.batch
+
+        def recording_batch():
+            batch = original_batch()
+            original_commit = batch.commit
+            batch.commit = lambda: batch_sizes.append(len(batch)) or original_commit()
+            return batch
+
+        monkeypatch.setattr(mock_db_with_students, "batch", recording_batch)
+        response = client_with_students.post(
+            "/api/sessions/bulk",
+            json={
+                "studentIds": ["student-1", "student-2", "student-1", "student-2", "student-1"],
+                "examId": "exam-001",
+                "examTitle": "Final Exam",
+                "exam_type": "University",
+            },
+        )
+        assert len(response.json()["sessions"]) == 5
+        assert batch_sizes == [2, 2, 1]
+        assert len(list(mock_db_with_students.collection("sessions").stream())) == 5
 
 
 class TestGenerateReport:
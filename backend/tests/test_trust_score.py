@@ -0,0 +1,132 @@
+"""
+Tests for atomic trust-score penalties.
+
+Covers: penalty/severity mapping, Increment-vs-clamp writes, reconciling negative
+scores, and concurrent violations through the session and frame analysis routes.
+"""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from google.cloud import firestore
+
+from backend.app.session_cache import invalidate_session_state
+from backend.app.trust_score import (
+    PENALTY_HIGH,
+    PENALTY_MEDIUM,
+    PENALTY_TERMINATION,
+    clamp_trust_score,
+    trust_penalty_update,
+    violation_penalty,
+    violation_severity,
+)
+
+
+def _log(client, message="Tab switch"):
+    return client.post("/api/sessions/session-001/log", json={"message": message, "timestamp": "2026-01-01T00:00:00"})
+
+
+class TestPenaltyMapping:
+    """Tests for violation message classification."""
+
+    def test_penalties(self):
+        assert violation_penalty("Tab switch") == PENALTY_MEDIUM
+        assert violation_penalty("Screen Locked") == PENALTY_HIGH
+        assert violation_penalty("Terminated by proctor") == PENALTY_TERMINATION
+
+    def test_severity(self):
+        assert violation_severity(PENALTY_MEDIUM) == "Medium"
+        assert violation_severity(PENALTY_HIGH) == "High"
+
+
+class TestTrustPenaltyUpdate:
+    """Tests for the Firestore write built for a penalty."""
+
+    def test_uses_increment(self):
+        value, expected = trust_penalty_update(100, 10)
+        assert value == firestore.Increment(-10)
+        assert expected == 90
+
+    def test_new_session_starts_full(self):
+        assert trust_penalty_update(None, 30)[1] == 70
+
+    def test_clamps_at_zero(self):
+        assert trust_penalty_update(20, 30) == (0, 0)
+
+    def test_reconciles_negative_score(self):
+        assert trust_penalty_update(-10, 10) == (0, 0)
+
+
+class TestClampTrustScore:
+    """Tests for the transactional reconciliation of negative scores."""
+
+    def test_clamps_negative_score(self, mock_db_with_session):
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        session_ref.update({"trust_score": -5})
+        assert clamp_trust_score(mock_db_with_session, "session-001") is True
+        assert session_ref._data["trust_score"] == 0
+
+    def test_leaves_valid_score(self, mock_db_with_session):
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        session_ref.update({"trust_score": 15})
+        assert clamp_trust_score(mock_db_with_session, "session-001") is False
+        assert session_ref._data["trust_score"] == 15
+
+    def test_missing_session(self, mock_db):
+        assert clamp_trust_score(mock_db, "missing") is False
+
+
+class TestAtomicPenaltiesThroughApi:
+    """End-to-end checks that penalties apply server-side."""
+
+    def test_penalty_applies_to_current_document_value(self, client_with_session, mock_db_with_session):
+        _log(client_with_session)
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        assert session_ref._data["trust_score"] == 90
+
+        # Another device lowers the score without this process seeing it
+        session_ref.update({"trust_score": 50})
+        _log(client_with_session)
+        assert session_ref._data["trust_score"] == 40
+
+    def test_penalty_clamps_at_zero(self, client_with_session, mock_db_with_session):
+        for _ in range(4):
+            _log(client_with_session, "Screen Locked")
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        assert session_ref._data["trust_score"] == 0
+        assert client_with_session.get("/api/sessions/session-001/status").json()["trust_score"] == 0
+
+    @pytest.mark.parametrize("flush_interval", [0, 60])
+    def test_concurrent_stale_penalties_never_go_negative(
+        self, client_with_session, mock_db_with_session, monkeypatch, flush_interval
+    ):
+        from backend.app.write_buffer import session_write_buffer
+
+        monkeypatch.setattr(session_write_buffer, "flush_interval", flush_interval)
+        session_ref = mock_db_with_session.collection("sessions").document("session-001")
+        session_ref.update({"trust_score": 15})
+        invalidate_session_state("session-001")
+
+        # Both requests miss the cache at the same moment and read a score of 15
+        arrived = []
+
+        async def racing_read(adb, session_id):
+            arrived.append(session_id)
+            for _ in range(500):
+                if len(arrived) >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            return {"status": "Active", "trust_score": 15}
+
+        with patch("backend.app.routes.session_routes.get_session_state_async", side_effect=racing_read):
+            threads = [threading.Thread(target=_log, args=(client_with_session,)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+        session_write_buffer.flush()
+
+        assert session_ref._data["trust_score"] == 0
+        assert len(list(session_ref.collection("logs").stream())) == 2
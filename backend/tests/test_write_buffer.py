@@ -0,0 +1,257 @@
+"""
+Unit tests for the write-behind session write buffer.
+
+Covers: write-through mode, batched flushing, size-triggered flushes, failure isolation,
+and buffered writes through the session routes.
+"""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from google.api_core.exceptions import DeadlineExceeded
+from google.cloud import firestore
+
+from backend.app.write_buffer import SessionWriteBuffer, session_write_buffer
+
+
+def _session(mock_db, session_id="session-001"):
+    return mock_db.collection("sessions").document(session_id)
+
+
+def _logs(mock_db, session_id="session-001"):
+    return [doc.to_dict() for doc in _session(mock_db, session_id).collection("logs").stream()]
+
+
+class TestWriteThrough:
+    """Tests for the disabled (interval 0) buffer."""
+
+    def test_writes_immediately(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=0)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "m"})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": 90})
+        assert _logs(mock_db_with_session) == [{"message": "m"}]
+        assert _session(mock_db_with_session)._data["trust_score"] == 90
+        assert buffer.pending == 0
+
+
+class TestAsyncWrites:
+    """Tests for add_log_async/update_async used by async routes."""
+
+    def test_write_through(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=0)
+
+        async def scenario():
+            await buffer.add_log_async(mock_db_with_session, "session-001", {"message": "m"})
+            await buffer.update_async(mock_db_with_session, "session-001", {"trust_score": 90})
+
+        asyncio.run(scenario())
+        assert _logs(mock_db_with_session) == [{"message": "m"}]
+        assert _session(mock_db_with_session)._data["trust_score"] == 90
+
+    def test_queued_until_full(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1, max_pending=2)
+
+        async def scenario():
+            await buffer.add_log_async(mock_db_with_session, "session-001", {"message": "a"})
+            assert buffer.pending == 1
+            assert _logs(mock_db_with_session) == []
+            await buffer.update_async(mock_db_with_session, "session-001", {"trust_score": 90})
+
+        asyncio.run(scenario())
+        assert buffer.pending == 0
+        assert _logs(mock_db_with_session) == [{"message": "a"}]
+        assert _session(mock_db_with_session)._data["trust_score"] == 90
+
+
+class TestBufferedWrites:
+    """Tests for queued writes and flushing."""
+
+    def test_writes_wait_for_flush(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": 90})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": 80, "latest_log": "b"})
+        assert _logs(mock_db_with_session) == []
+        assert buffer.pending == 2
+        assert buffer._updates["session-001"] == {"trust_score": 80, "latest_log": "b"}
+
+        assert buffer.flush() == 2
+        assert _logs(mock_db_with_session) == [{"message": "a"}]
+        assert _session(mock_db_with_session)._data["trust_score"] == 80
+        assert buffer.stats() == {
+            "enabled": True,
+            "pending_writes": 0,
+            "flushed_writes": 2,
+            "commits": 1,
+            "retried_writes": 0,
+            "dropped_writes": 0,
+        }
+
+    def test_increments_accumulate(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-10)})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-30)})
+        assert buffer._updates["session-001"] == {"trust_score": firestore.Increment(-40)}
+        buffer.flush()
+        assert _session(mock_db_with_session)._data["trust_score"] == 60
+
+    def test_increment_after_absolute_value(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": 50})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-10)})
+        assert buffer._updates["session-001"] == {"trust_score": 40}
+
+    def test_penalty_after_zero_score_stays_at_zero(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": 0})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-10)})
+        buffer.flush()
+        assert _session(mock_db_with_session)._data["trust_score"] == 0
+
+    def test_flush_single_session(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        buffer.add_log(mock_db_with_session, "session-002", {"message": "b"})
+        buffer.flush(mock_db_with_session, "session-001")
+        assert len(_logs(mock_db_with_session)) == 1
+        assert buffer.pending == 1
+
+    def test_size_threshold_triggers_flush(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=60, max_pending=3)
+        for i in range(3):
+            buffer.add_log(mock_db_with_session, "session-001", {"message": str(i)})
+        assert len(_logs(mock_db_with_session)) == 3
+        assert buffer.pending == 0
+
+    def test_failing_session_does_not_block_others(self, mock_db_with_session, monkeypatch):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.update(mock_db_with_session, "deleted-session", {"trust_score": 10})
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+
+        assert buffer.flush() == 1
+        assert _logs(mock_db_with_session) == [{"message": "a"}]
+        # Writes for a session that no longer exists are dropped, not retried
+        assert buffer.pending == 0
+        assert buffer.stats()["dropped_writes"] == 1
+
+    def test_discard(self, mock_db_with_session):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        buffer.discard("session-001")
+        assert buffer.flush() == 0
+
+
+def _failing_batches(mock_db, monkeypatch, failures, error=None):
+    """Make the next `failures` batch commits fail with a transient error."""
+    make_batch = mock_db.batch
+    remaining = [failures]
+
+    def batch():
+        created = make_batch()
+        if remaining[0]:
+            remaining[0] -= 1
+            created.commit = MagicMock(side_effect=error or DeadlineExceeded("deadline exceeded"))
+        return created
+
+    monkeypatch.setattr(mock_db, "batch", batch)
+
+
+class TestFailedCommits:
+    """Tests for re-queueing writes after transient commit failures."""
+
+    def test_transient_failure_is_retried(self, mock_db_with_session, monkeypatch):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-10)})
+        _failing_batches(mock_db_with_session, monkeypatch, failures=1)
+
+        assert buffer.flush() == 0
+        assert buffer.pending == 2
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "b"})
+        buffer.update(mock_db_with_session, "session-001", {"trust_score": firestore.Increment(-10)})
+
+        assert buffer.flush() == 3
+        assert _logs(mock_db_with_session) == [{"message": "a"}, {"message": "b"}]
+        assert _session(mock_db_with_session)._data["trust_score"] == 80
+        assert buffer.stats()["retried_writes"] == 2
+
+    def test_retries_are_bounded(self, mock_db_with_session, monkeypatch):
+        buffer = SessionWriteBuffer(flush_interval=1, max_retries=2)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        _failing_batches(mock_db_with_session, monkeypatch, failures=10)
+
+        for _ in range(3):
+            assert buffer.flush() == 0
+        assert buffer.pending == 0
+        assert buffer.stats()["dropped_writes"] == 1
+        assert _logs(mock_db_with_session) == []
+
+    def test_session_flush_waits_for_commit_in_flight(self, mock_db_with_session, monkeypatch):
+        buffer = SessionWriteBuffer(flush_interval=1)
+        buffer.add_log(mock_db_with_session, "session-001", {"message": "a"})
+        committing, release = threading.Event(), threading.Event()
+        make_batch = mock_db_with_session.batch
+
+        def slow_batch():
+            created = make_batch()
+            commit = created.commit
+
+            def slow_commit():
+                committing.set()
+                release.wait(timeout=5)
+                commit()
+
+            created.commit = slow_commit
+            return created
+
+        monkeypatch.setattr(mock_db_with_session, "batch", slow_batch)
+        background = threading.Thread(target=buffer.flush)
+        background.start()
+        assert committing.wait(timeout=5)
+
+        logs_seen = []
+        session_flush = threading.Thread(
+            target=lambda: (
+                buffer.flush(mock_db_with_session, "session-001"),
+                logs_seen.append(_logs(mock_db_with_session)),
+            )
+        )
+        session_flush.start()
+        session_flush.join(timeout=0.1)
+        assert session_flush.is_alive()
+
+        release.set()
+        background.join(timeout=5)
+        session_flush.join(timeout=5)
+        assert logs_seen == [[{"message": "a"}]]
+
+
+class TestBufferedSessionRoutes:
+    """End-to-end checks with the route-level buffer enabled."""
+
+    @pytest.fixture
+    def buffered(self, monkeypatch):
+        monkeypatch.setattr(session_write_buffer, "flush_interval", 60)
+
+    def test_violations_buffered_until_logs_read(self, client_with_session, mock_db_with_session, buffered):
+        for _ in range(2):
+            client_with_session.post(
+                "/api/sessions/session-001/log", json={"message": "Tab switch", "timestamp": "2026-01-01T00:00:00"}
+            )
+        assert _logs(mock_db_with_session) == []
+        assert client_with_session.get("/api/sessions/session-001/status").json()["trust_score"] == 80
+
+        logs = client_with_session.get("/api/sessions/session-001/logs").json()
+        assert len(logs) == 2
+        assert _session(mock_db_with_session)._data["trust_score"] == 80
+
+    def test_terminate_flushes_before_update(self, client_with_session, mock_db_with_session, buffered):
+        client_with_session.post(
+            "/api/sessions/session-001/log", json={"message": "Tab switch", "timestamp": "2026-01-01T00:00:00"}
+        )
+        client_with_session.post("/api/sessions/session-001/terminate")
+        session_write_buffer.flush()
+        assert _session(mock_db_with_session)._data["trust_score"] == 0
+        assert len(_logs(mock_db_with_session)) == 1